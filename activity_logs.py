@@ -0,0 +1,52 @@
+# activity_logs.py
+import pandas as pd
+
+from query_filters import apply_filters, contains_pattern, period_filters
+
+# ------------------------
+# CONFIG
+# ------------------------
+TABLE = "activity_logs"
+LOGS_PAGE_SIZE = 50
+
+
+# ------------------------
+# FILTRES
+# ------------------------
+def log_filters(username=None, action=None, start_date=None, end_date=None):
+    filters = ()
+    if username:
+        filters += (("eq", "username", username),)
+    if action:
+        filters += (("ilike", "action", contains_pattern(action)),)
+    if start_date and end_date:
+        filters += period_filters(start_date, end_date, column="timestamp")
+    return filters
+
+
+# ------------------------
+# PAGINATION PAR CLÉ (timestamp, id)
+# ------------------------
+def fetch_logs_page(client, filters=(), cursor=None, page_size=LOGS_PAGE_SIZE):
+    """Une page de journaux, du plus récent au plus ancien, après le curseur (timestamp, id).
+
+    Renvoie (DataFrame, curseur de la page suivante ou None). Le coût ne dépend que de
+    page_size grâce à l'index (timestamp desc, id desc).
+    """
+    query = apply_filters(client.table(TABLE).select("*"), filters)
+    if cursor is not None:
+        ts, last_id = cursor
+        query = query.or_(f'timestamp.lt."{ts}",and(timestamp.eq."{ts}",id.lt.{last_id})')
+    # Une ligne de plus pour savoir s'il existe une page suivante
+    rows = (
+        query.order("timestamp", desc=True)
+        .order("id", desc=True)
+        .limit(page_size + 1)
+        .execute()
+        .data
+    )
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = (rows[-1]["timestamp"], rows[-1]["id"])
+    return pd.DataFrame(rows), next_cursor
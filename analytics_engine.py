@@ -0,0 +1,245 @@
+# analytics_engine.py
+# Moteur SQL embarqué (DuckDB) sur la copie locale : vue d'ensemble, graphiques Statistics et KPI Objectifs.
+# La réplique (snapshot.py) est convertie une fois en table Arrow par version, puis lue sans copie ;
+# filtres et agrégations sont exécutés en une requête vectorisée et multi-thread, sans DataFrame
+# intermédiaire par masque.
+import threading
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from chart_data import COUNT, MAX_BINS, SATISFACTION_SCALE, histogram_bins, histogram_table
+from clinical_data import RAW_PAGE_SIZE, SNAPSHOT_COLUMNS, local_records, local_rollup
+from clinical_schema import TIME_COLUMN, apply_schema, normalize_times
+from kpi_engine import ROLLUP_SUMS, compute_kpis
+from query_filters import contains_pattern
+
+# Base en mémoire partagée par le process ; un curseur (connexion dupliquée) par requête
+_database = duckdb.connect()
+
+_SQL_OPERATORS = {"eq": "=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+# Table Arrow de chaque réplique, reconvertie seulement quand la réplique a changé
+_arrow_tables = {}
+_arrow_lock = threading.Lock()
+
+
+# ------------------------
+# TABLES
+# ------------------------
+def _records(client):
+    df = local_records.get(client)
+    if df is None:
+        df = apply_schema(pd.DataFrame(columns=SNAPSHOT_COLUMNS))
+    # Seules les colonnes de l'instantané sont exposées : un scan pandas analyserait toutes les autres
+    return _arrow("records", df, [c for c in SNAPSHOT_COLUMNS if c in df.columns])
+
+
+def _rollup(client):
+    df = local_rollup.get(client)
+    if df is None or df.empty:
+        df = pd.DataFrame({c: pd.Series(dtype="int64") for c in ROLLUP_SUMS})
+        df.insert(0, "patient_unite", pd.Series(dtype=str))
+        df.insert(0, "day", pd.Series(dtype="datetime64[s]"))
+    return _arrow("rollup", df, list(df.columns))
+
+
+def _arrow(name, df, columns):
+    with _arrow_lock:
+        source, table = _arrow_tables.get(name, (None, None))
+        if source is not df:
+            table = pa.Table.from_pandas(df[columns], preserve_index=False)
+            _arrow_tables[name] = (df, table)
+    return table
+
+
+def _forget(name):
+    with _arrow_lock:
+        _arrow_tables.pop(name, None)
+
+
+# Réplique libérée (inactivité, budget mémoire) : sa table Arrow aussi
+local_records.on_close(lambda: _forget("records"))
+local_rollup.on_close(lambda: _forget("rollup"))
+
+
+def query(sql, params=(), **tables):
+    """Exécute sql où chaque nom de tables désigne une table Arrow ou un DataFrame (lus sans copie)."""
+    cursor = _database.cursor()
+    try:
+        for name, df in tables.items():
+            cursor.register(name, df)
+        return cursor.execute(sql, list(params)).df()
+    finally:
+        cursor.close()
+
+
+def where(filters):
+    """Filtres PostgREST (op, colonne, valeur) -> (clause WHERE, paramètres)."""
+    clauses, params = [], []
+    for op, column, value in filters:
+        if column not in SNAPSHOT_COLUMNS:
+            raise ValueError(f"Colonne inconnue : {column!r}")
+        if op == "is_" and value == "null":
+            clauses.append(f'"{column}" IS NULL')
+            continue
+        if op not in _SQL_OPERATORS:
+            raise ValueError(f"Filtre non supporté : {op!r}")
+        if column == TIME_COLUMN:
+            value = normalize_times(pd.Series([value])).iloc[0].to_pydatetime()
+        clauses.append(f'"{column}" {_SQL_OPERATORS[op]} ?')
+        params.append(value)
+    return " AND ".join(clauses) or "TRUE", params
+
+
+# ------------------------
+# STATISTICS
+# ------------------------
+def date_bounds(client):
+    """(min, max) de registration_time, ou (None, None)."""
+    row = query("SELECT min(registration_time), max(registration_time) FROM records", records=_records(client))
+    lo, hi = row.iloc[0]
+    return (None, None) if pd.isna(lo) else (pd.Timestamp(lo), pd.Timestamp(hi))
+
+
+def overview(client, filters=()):
+    """Vue d'ensemble (patients, incidents, erreurs, réadmissions) et dernier id de la sélection."""
+    clause, params = where(filters)
+    df = query(
+        f"""
+        SELECT count(*) AS patients,
+               count(*) FILTER (WHERE incident) AS incidents,
+               count(*) FILTER (WHERE erreur_medicale) AS erreurs,
+               count(*) FILTER (WHERE readmission) AS readmissions,
+               max(id) AS last_id
+        FROM records WHERE {clause}
+        """,
+        params,
+        records=_records(client),
+    )
+    return df.iloc[0].to_dict()
+
+
+def chart_data(client, filters=()):
+    """Tables des graphiques Statistics (évolution, incidents, séjour, satisfaction), calculées par DuckDB."""
+    clause, params = where(filters)
+    records = _records(client)
+
+    evolution = query(
+        f"""
+        SELECT CAST(evolution_patient AS VARCHAR) AS "Évolution", count(*) AS "{COUNT}"
+        FROM records WHERE {clause} AND evolution_patient IS NOT NULL
+        GROUP BY 1 ORDER BY 2 DESC, 1
+        """,
+        params,
+        records=records,
+    )
+    incidents = query(
+        f"""
+        SELECT incident, erreur_medicale, count(*) AS "{COUNT}"
+        FROM records WHERE {clause}
+        GROUP BY 1, 2 ORDER BY 1, 2
+        """,
+        params,
+        records=records,
+    )
+    satisfaction = query(
+        f"""
+        SELECT CAST(satisfaction_patient AS INTEGER) AS "Satisfaction", count(*) AS "{COUNT}"
+        FROM records WHERE {clause} AND satisfaction_patient IS NOT NULL
+        GROUP BY 1
+        """,
+        params,
+        records=records,
+    )
+    satisfaction = (
+        satisfaction.set_index("Satisfaction")[COUNT]
+        .reindex(SATISFACTION_SCALE, fill_value=0)
+        .rename_axis("Satisfaction")
+        .reset_index()
+    )
+    return {
+        "evolution": evolution,
+        "incidents": incidents,
+        "sejour": _histogram(records, "duree_sejour", "Durée (jours)", clause, params),
+        "satisfaction": satisfaction,
+    }
+
+
+def _histogram(records, column, name, clause, params, max_bins=MAX_BINS):
+    # Bornes puis comptes par intervalle entier : deux agrégations, aucune valeur rapatriée
+    bounds = query(f'SELECT min("{column}"), max("{column}") FROM records WHERE {clause}', params, records=records)
+    lo, hi = bounds.iloc[0]
+    if pd.isna(lo):
+        return histogram_table(name, [])
+    lo, hi = int(lo), int(hi)
+    step, nbins = histogram_bins(lo, hi, max_bins)
+    bins = query(
+        f"""
+        SELECT ("{column}" - ?) // ? AS bin, count(*) AS n
+        FROM records WHERE {clause} AND "{column}" IS NOT NULL
+        GROUP BY 1
+        """,
+        [lo, step, *params],
+        records=records,
+    )
+    counts = np.zeros(nbins, dtype=np.int64)
+    counts[bins["bin"].to_numpy(dtype=np.int64)] = bins["n"].to_numpy()
+    return histogram_table(name, counts, lo, step)
+
+
+def records_page(client, columns, filters=(), sort_by="registration_time", descending=True, page=0,
+                 page_size=RAW_PAGE_SIZE):
+    """Une page triée de la copie locale et le nombre total de lignes filtrées."""
+    columns = [c for c in columns if c in SNAPSHOT_COLUMNS]
+    if sort_by not in SNAPSHOT_COLUMNS:
+        raise ValueError(f"Colonne inconnue : {sort_by!r}")
+    clause, params = where(filters)
+    order = "DESC" if descending else "ASC"
+    records = _records(client)
+    total = query(f"SELECT count(*) AS n FROM records WHERE {clause}", params, records=records)["n"].iloc[0]
+    df = query(
+        f"""
+        SELECT {", ".join(f'"{c}"' for c in columns)} FROM records WHERE {clause}
+        ORDER BY "{sort_by}" {order} NULLS LAST, id {order}
+        LIMIT ? OFFSET ?
+        """,
+        [*params, page_size, page * page_size],
+        records=records,
+    )
+    return apply_schema(df), int(total)
+
+
+# ------------------------
+# OBJECTIFS (rollup journalier)
+# ------------------------
+def _unite_clause(unite):
+    # Même sémantique que le filtre serveur ilike (objectifs_data.period_records)
+    return ("patient_unite ILIKE ? ESCAPE '\\'", [contains_pattern(unite)]) if unite else ("TRUE", [])
+
+
+def rollup_bounds(client):
+    """(premier jour, dernier jour) du rollup, ou (None, None)."""
+    row = query("SELECT min(day)::DATE, max(day)::DATE FROM rollup", rollup=_rollup(client))
+    lo, hi = row.iloc[0]
+    return (None, None) if pd.isna(lo) else (pd.Timestamp(lo).date(), pd.Timestamp(hi).date())
+
+
+def period_kpis(client, periods, unite=None):
+    """KPI (tidy) de chaque période {label: (début, fin inclus)} ; un jour compte dans la première période."""
+    cases = " ".join("WHEN day::DATE BETWEEN ? AND ? THEN ?" for _ in periods)
+    case_params = [v for label, (start, end) in periods.items() for v in (start, end, label)]
+    clause, params = _unite_clause(unite)
+    sums = query(
+        f"""
+        SELECT period, {", ".join(f"sum({c}) AS {c}" for c in ROLLUP_SUMS)}
+        FROM (SELECT *, CASE {cases} END AS period FROM rollup WHERE {clause})
+        WHERE period IS NOT NULL
+        GROUP BY period
+        """,
+        [*case_params, *params],
+        rollup=_rollup(client),
+    )
+    return compute_kpis(sums.set_index("period")[ROLLUP_SUMS], periods=list(periods))
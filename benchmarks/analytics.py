@@ -0,0 +1,210 @@
+# benchmarks/analytics.py
+# Temps et pic mémoire de chaque étape des analyses (Statistics, Objectifs, HDJ) sur données synthétiques.
+#
+#   python -m benchmarks.analytics                          # 10k, 100k, 1M lignes
+#   python -m benchmarks.analytics --sizes 10000 100000     # échelles choisies
+#   python -m benchmarks.analytics --repeat 7 --warmup 2    # plus de passes, médiane plus stable
+#   python -m benchmarks.analytics --json bench.json        # résultats pour suivi des régressions
+#
+# Toutes les étapes sont enchaînées en passes complètes : warmup passes non chronométrées, puis
+# repeat passes chronométrées (sans instrumentation) dont on garde la médiane et le minimum par
+# étape, enfin une passe sous tracemalloc pour le pic mémoire Python/NumPy. Les tampons natifs
+# d'Arrow et de DuckDB ne sont pas vus par tracemalloc : seules les copies rapatriées en pandas
+# sont comptées.
+#
+# Chaque étape appelle le code des pages ; l'API est remplacée par un client en mémoire
+# (benchmarks/memory_client.py) dont la sérialisation des pages tient lieu du JSON reçu.
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+
+import pandas as pd
+
+# Instantanés écrits dans un répertoire jetable, avant l'import de clinical_data / snapshot
+os.environ["SNAPSHOT_DIR"] = tempfile.mkdtemp(prefix="bench_snapshots_")
+
+import analytics_engine  # noqa: E402
+from benchmarks.memory_client import MemoryClient  # noqa: E402
+from benchmarks.synthetic import SCALES, daily_rollup, generate_hdj_sessions, generate_records  # noqa: E402
+from clinical_data import (  # noqa: E402
+    ROLLUP_TABLE, SNAPSHOT_COLUMNS, STATISTICS_COLUMNS, TABLE, local_records, local_rollup,
+)
+from clinical_schema import apply_schema  # noqa: E402
+from hdj_data import effect_stats  # noqa: E402
+from kpi_export import export_tables  # noqa: E402
+from objectifs_data import export_sheets, load_kpis  # noqa: E402
+from query_filters import period_filters  # noqa: E402
+from snapshot import Snapshot  # noqa: E402
+
+PERIOD_DAYS = 90
+SERVICE = "Hospitalisation"
+HDJ_SESSIONS_RATIO = 10  # une session HDJ pour 10 enregistrements
+REPEAT = 3
+WARMUP = 1
+
+
+# ------------------------
+# ÉTAPES
+# ------------------------
+def stages(raw, rollup, sessions):
+    """[(nom, étape, préparation non chronométrée ou None)] ; chaque étape lit l'état des précédentes.
+
+    Chaque étape est l'appel fait par la page : Statistics hors ligne (DuckDB sur la copie locale),
+    Objectifs (KPI sur le rollup local, export des enregistrements chargés page par page).
+    """
+    state = {}
+    end_date = pd.Timestamp(raw["registration_time"].max()).date()
+    start_date = end_date - timedelta(days=PERIOD_DAYS - 1)
+    # Statistics : période, sans patient sélectionné
+    filters = period_filters(start_date, end_date)
+    # Export Objectifs : lignes servies par l'API (sans réseau), comme fetch_records les reçoit
+    client = MemoryClient({TABLE: raw})
+
+    def write_snapshot():
+        # Ce qu'écrit LocalReplica après fetch_all : colonnes de la copie locale, typées
+        Snapshot(TABLE).replace(apply_schema(raw[SNAPSHOT_COLUMNS]))
+
+    def open_records():
+        local_records.close()
+        local_records.get(None)
+
+    def open_rollup():
+        Snapshot(ROLLUP_TABLE, key=["day", "patient_unite"]).replace(rollup)
+        local_rollup.close()
+        local_rollup.get(None)
+
+    # load + typing : ouverture de la copie locale (LocalReplica.get relit l'instantané puis prepare)
+    def load():
+        state["df"] = Snapshot(TABLE).read()
+
+    def typing():
+        state["df"] = apply_schema(state["df"])
+
+    def overview():
+        state["overview"] = analytics_engine.overview(None, filters)
+
+    def charts():
+        state["charts"] = analytics_engine.chart_data(None, filters)
+
+    def raw_page():
+        state["raw_page"] = analytics_engine.records_page(None, STATISTICS_COLUMNS, filters)
+
+    def kpi():
+        state["kpi"] = load_kpis(None, start_date, end_date, SERVICE)
+
+    def export_records():
+        # objectifs.build_export : feuilles (enregistrements chargés page par page), puis classeur
+        state["sheets"] = export_sheets(client, start_date, end_date, SERVICE, state["kpi"])
+
+    def export_xlsx():
+        state["xlsx"] = export_tables(state["sheets"], "xlsx")
+
+    def hdj():
+        state["hdj"] = effect_stats(sessions)
+
+    return [
+        ("load (parquet)", load, write_snapshot),
+        ("typing", typing, None),
+        ("overview (duckdb)", overview, open_records),
+        ("chart data (duckdb)", charts, None),
+        ("raw page (duckdb)", raw_page, None),
+        ("kpi (duckdb)", kpi, open_rollup),
+        ("export sheets (paged fetch)", export_records, None),
+        ("xlsx export", export_xlsx, None),
+        ("hdj stats", hdj, None),
+    ]
+
+
+# ------------------------
+# MESURE
+# ------------------------
+def measure(n, seed=0, repeat=REPEAT, warmup=WARMUP):
+    """[{stage, seconds, min_seconds, peak_mib}] pour n enregistrements (et n / 10 sessions HDJ).
+
+    seconds : médiane des repeat passes chronométrées ; min_seconds : la plus rapide.
+    """
+    raw = generate_records(n, seed)
+    # kpi_daily_rollup est maintenu par un trigger SQL : calculé une fois, hors mesure
+    rollup = daily_rollup(apply_schema(raw.copy()))
+    sessions = generate_hdj_sessions(max(1, n // HDJ_SESSIONS_RATIO), seed)
+
+    # Une passe rejoue toutes les étapes depuis les données brutes : chaque étape lit l'état des précédentes
+    seconds = {}
+    for i in range(warmup + repeat):
+        for name, run, setup in stages(raw, rollup, sessions):
+            if setup:
+                setup()
+            start = time.perf_counter()
+            run()
+            if i >= warmup:
+                seconds.setdefault(name, []).append(time.perf_counter() - start)
+
+    results = []
+    for name, run, setup in stages(raw, rollup, sessions):
+        if setup:
+            setup()
+        tracemalloc.start()
+        try:
+            run()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        results.append({
+            "stage": name,
+            "seconds": statistics.median(seconds[name]),
+            "min_seconds": min(seconds[name]),
+            "peak_mib": peak / 2 ** 20,
+        })
+    return results
+
+
+# ------------------------
+# RAPPORT
+# ------------------------
+def report(sizes, seed, repeat=REPEAT, warmup=WARMUP):
+    all_results = {}
+    for n in sizes:
+        print(f"\n{n:,} enregistrements ({max(1, n // HDJ_SESSIONS_RATIO):,} sessions HDJ)".replace(",", " "))
+        print(f"    {'étape':<32} {'médiane':>10} {'min':>10} {'pic mémoire':>14}")
+        results = measure(n, seed, repeat, warmup)
+        for r in results:
+            print(
+                f"    {r['stage']:<32} {r['seconds'] * 1000:7.0f} ms {r['min_seconds'] * 1000:7.0f} ms"
+                f" {r['peak_mib']:10.1f} MiB"
+            )
+        total = sum(r["seconds"] for r in results)
+        print(f"    {'total':<32} {total * 1000:7.0f} ms")
+        all_results[n] = results
+    return all_results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark des analyses sur données synthétiques")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SCALES), help="nombres d'enregistrements")
+    parser.add_argument("--seed", type=int, default=0, help="graine du générateur")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="passes chronométrées par échelle")
+    parser.add_argument("--warmup", type=int, default=WARMUP, help="passes d'échauffement non chronométrées")
+    parser.add_argument("--json", help="fichier où écrire les résultats")
+    args = parser.parse_args()
+    if args.repeat < 1:
+        parser.error("--repeat doit être >= 1")
+    results = report(args.sizes, args.seed, args.repeat, args.warmup)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                {
+                    "python": sys.version.split()[0],
+                    "seed": args.seed,
+                    "repeat": args.repeat,
+                    "warmup": args.warmup,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
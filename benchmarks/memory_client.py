@@ -0,0 +1,119 @@
+# benchmarks/memory_client.py
+# Client Supabase minimal servant des tables en mémoire : le code de production (fetch_records, pagination
+# .range, construction des DataFrame depuis le JSON) est chronométré sans réseau.
+import re
+
+import pandas as pd
+
+from clinical_schema import TIME_COLUMN, normalize_times
+
+# Opérateurs PostgREST utilisés par clinical_data et objectifs_data
+_OPERATORS = {"eq": "eq", "gt": "gt", "gte": "ge", "lt": "lt", "lte": "le"}
+
+
+class MemoryClient:
+    """tables : {nom: DataFrame de lignes telles que renvoyées par l'API (None, bool, str ISO)}.
+
+    Le résultat filtré et trié d'une requête est gardé en cache : seule la première page paie le
+    travail du serveur, les suivantes ne coûtent que la sérialisation des lignes.
+    """
+
+    def __init__(self, tables):
+        self.tables = tables
+        self._results = {}
+
+    def table(self, name):
+        return _Query(self, name)
+
+    def _result(self, name, filters, orders):
+        key = (name, filters, orders)
+        if key not in self._results:
+            df = self.tables[name]
+            df = df[_mask(df, filters)]
+            if orders:
+                df = df.sort_values(
+                    [c for c, _ in orders], ascending=[not desc for _, desc in orders], na_position="last"
+                )
+            self._results[key] = df
+        return self._results[key]
+
+
+class _Query:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self.columns = None
+        self.filters = ()
+        self.orders = ()
+        self.bounds = None
+
+    def select(self, columns, count=None):
+        self.columns = None if columns == "*" else columns.split(",")
+        return self
+
+    def __getattr__(self, op):
+        if op not in _OPERATORS and op not in ("ilike", "is_"):
+            raise AttributeError(op)
+
+        def add(column, value):
+            self.filters += ((op, column, value),)
+            return self
+
+        return add
+
+    def order(self, column, desc=False, nullsfirst=False):
+        self.orders += ((column, desc),)
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end + 1)
+        return self
+
+    def execute(self):
+        df = self.client._result(self.name, self.filters, self.orders)
+        count = len(df)
+        if self.bounds:
+            df = df.iloc[slice(*self.bounds)]
+        if self.columns:
+            df = df[self.columns]
+        # NaN des colonnes numériques incomplètes : null côté JSON
+        rows = df.astype(object).where(df.notna(), None).to_dict("records")
+        return _Response(rows, count)
+
+
+class _Response:
+    def __init__(self, data, count):
+        self.data = data
+        self.count = count
+
+
+def _mask(df, filters):
+    mask = pd.Series(True, index=df.index)
+    for op, column, value in filters:
+        values = df[column]
+        if op == "is_" and value == "null":
+            mask &= values.isna()
+            continue
+        if op == "ilike":
+            pattern = _like_pattern(value)
+            mask &= values.astype("string").str.fullmatch(pattern, case=False).fillna(False).astype(bool)
+            continue
+        if op not in _OPERATORS:
+            raise ValueError(f"Filtre non supporté : {op!r}")
+        if column == TIME_COLUMN:
+            values = normalize_times(values)
+            value = normalize_times(pd.Series([value])).iloc[0]
+        mask &= getattr(values, _OPERATORS[op])(value).fillna(False).astype(bool)
+    return mask
+
+
+def _like_pattern(value):
+    """Motif LIKE en regex : % n'importe quelle suite, _ un caractère, \\ échappe le caractère suivant."""
+    parts = []
+    chars = iter(value)
+    for c in chars:
+        if c == "\\":
+            parts.append(re.escape(next(chars, "\\")))
+        else:
+            parts.append(".*" if c == "%" else "." if c == "_" else re.escape(c))
+    return "".join(parts)
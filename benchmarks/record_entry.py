@@ -0,0 +1,289 @@
+# benchmarks/record_entry.py
+# Coût d'une saisie complète sur le Dashboard : reruns (script complet / fragment) et requêtes HTTP.
+#
+#   python benchmarks/record_entry.py                         # arbre courant, sans pause puis 5 s par widget
+#   python benchmarks/record_entry.py --app ../avant --app .  # comparaison de deux arbres (git worktree)
+#   python benchmarks/record_entry.py --think 0 10            # pauses choisies entre deux widgets
+#   python benchmarks/record_entry.py --json entry.json       # résultats pour suivi des régressions
+#
+# La saisie est rejouée sous streamlit AppTest, Supabase remplacé par un transport HTTP qui compte
+# les requêtes. AppTest relance toujours le script entier : un changement de widget dans un
+# fragment est rejoué en rerun de fragment, comme l'envoie le navigateur. Les caches à durée de
+# vie (sonde de connexion, profil) suivent une horloge avancée de la pause à chaque widget.
+# Le chargement de la page (sonde + profil) n'est pas compté. Chaque mesure tourne dans un
+# interpréteur neuf, depuis un répertoire temporaire (file hors ligne, instantanés).
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+THINK_SECONDS = (0, 5)
+SECRETS = {"SUPABASE": {"URL": "http://supabase.test", "KEY": "anon", "SERVICE_ROLE_KEY": "service"}}
+PROFILE = {"id": 1, "auth_user_id": "u1", "username": "tester", "name": "Test", "role": "user",
+           "active": True, "is_temp_pass": False}
+
+
+# ------------------------
+# SAISIE (une mesure, dans le process courant)
+# ------------------------
+class EntryRun:
+    """Saisie scriptée d'un enregistrement Hospitalisation sur l'app de app_dir."""
+
+    def __init__(self, app_dir, think):
+        self.app_dir = app_dir
+        self.think = think
+        self.requests = []  # (thread, méthode, chemin)
+        self.runs = Counter()
+        self.messages = []
+        self.offset = 0.0  # avance de l'horloge des caches à durée de vie
+        self.fragments = {}  # clé ou ("label", libellé) -> id du fragment
+        self.next_fragment = None
+        self._patch()
+        from streamlit.testing.v1 import AppTest
+
+        self.at = AppTest.from_file(os.path.join(app_dir, "run_app.py"), default_timeout=30)
+        self.at.secrets.update(SECRETS)
+        self.at.session_state["user"] = types.SimpleNamespace(id="u1", email="tester@example.com")
+
+    # ------------------------
+    # Environnement simulé
+    # ------------------------
+    def _patch(self):
+        import httpx
+
+        run = self
+
+        def handle_request(transport, request):
+            run.requests.append((threading.current_thread().name, request.method, request.url.path))
+            path = request.url.path
+            if path.endswith("/auth/v1/health"):
+                body, status = {}, 200
+            elif path.endswith("/rest/v1/users"):
+                body, status = PROFILE, 200
+            elif request.method == "POST":
+                body, status = [{}], 201
+            else:
+                body, status = [], 200
+            return httpx.Response(status, json=body, request=request)
+
+        httpx.HTTPTransport.handle_request = handle_request
+
+        # Horloge des caches (sonde de connexion, profil) : avancée de la pause à chaque widget
+        clock = types.SimpleNamespace(**{k: getattr(time, k) for k in dir(time) if not k.startswith("_")})
+        clock.monotonic = lambda: time.monotonic() + self.offset
+        import health
+        import session_cache
+
+        health.time = clock
+        session_cache.time = clock
+
+        from streamlit.runtime.scriptrunner_utils.script_requests import RerunData, ScriptRequests
+        from streamlit.testing.v1 import local_script_runner
+
+        full_run = local_script_runner.LocalScriptRunner.run
+
+        def fragment_run(runner, widget_state=None, query_params=None, timeout=3, page_hash=""):
+            if self.next_fragment is None:
+                return full_run(runner, widget_state, query_params, timeout, page_hash)
+            rerun = RerunData(widget_states=widget_state, page_script_hash=page_hash,
+                              fragment_id_queue=[self.next_fragment])
+            # Le runner est créé avec un rerun complet en attente, qui absorberait celui du fragment
+            runner._requests = ScriptRequests()
+            runner.request_rerun(rerun)
+            try:
+                if not runner._script_thread:
+                    runner.start()
+                local_script_runner.require_widgets_deltas(runner, timeout)
+            finally:
+                runner.join()
+            return local_script_runner.parse_tree_from_messages(runner.forward_msgs())
+
+        local_script_runner.LocalScriptRunner.run = fragment_run
+
+    def _uncounted(self, action):
+        mark = len(self.requests)
+        try:
+            return action()
+        finally:
+            del self.requests[mark:]
+
+    def _refresh_view(self):
+        """Rerun complet qui ne sert qu'à reconstruire l'arbre d'AppTest (un rerun de fragment ne renvoie
+        que le fragment). Le navigateur garde le reste de la page : ni sonde ni profil, rien n'est compté."""
+        import health
+        import session_cache
+
+        is_online, cached = health.HealthMonitor.is_online, session_cache.session_cached
+        health.HealthMonitor.is_online = lambda monitor: monitor.online
+        session_cache.session_cached = lambda key, ttl, loader, scope=None: self.at.session_state[key]["value"]
+        try:
+            self._uncounted(self.at.run)
+        finally:
+            health.HealthMonitor.is_online, session_cache.session_cached = is_online, cached
+
+    def _learn_fragments(self):
+        # Widgets de chaque fragment : ceux que son rerun seul enregistre
+        for fragment in list(self.at._fragment_storage._fragments):
+            self.next_fragment = fragment
+            tree = self._uncounted(self.at.run)
+            self.next_fragment = None
+            for widget in _widgets(tree):
+                if widget.key and not widget.key.startswith("$$"):
+                    self.fragments.setdefault(widget.key, fragment)
+                self.fragments.setdefault(("label", getattr(widget, "label", None)), fragment)
+        self._refresh_view()
+
+    def _has_fragments(self):
+        return bool(self.at._fragment_storage._fragments)
+
+    # ------------------------
+    # Interactions
+    # ------------------------
+    def interact(self, widget, value=None, rerun=True, key=None):
+        def fragment():
+            return self.fragments.get(key or widget.key) or self.fragments.get(("label", widget.label))
+
+        if self._has_fragments() and not fragment():
+            # Widget conditionnel apparu depuis le dernier relevé : relevé à refaire avant de le toucher
+            self._learn_fragments()
+            widget = self.find(widget)
+        if value is not None:
+            widget.set_value(value)
+        if not rerun:
+            return
+        self.offset += self.think
+        self.next_fragment = fragment()
+        self.runs["fragment" if self.next_fragment else "full"] += 1
+        self.at.run()
+        in_fragment, self.next_fragment = self.next_fragment, None
+        assert not self.at.exception, [e.value for e in self.at.exception]
+        self.messages.extend(m.value for m in self.at.success)
+        if in_fragment:
+            self._refresh_view()
+
+    def find(self, widget):
+        return self.by_label(_KINDS[type(widget).__name__], widget.label)
+
+    def by_key(self, kind, key):
+        return getattr(self.at, kind)(key=key)
+
+    def by_label(self, kind, label):
+        return next(w for w in getattr(self.at, kind) if w.label.startswith(label))
+
+    def _form_mode(self):
+        # Cases d'observance dans un st.form : cocher ne renvoie rien au serveur
+        return "obs_comp_80" in self.fragments and any(
+            b.label.endswith("Enregistrer") and b.proto.is_form_submitter for b in self.at.button
+        )
+
+    # ------------------------
+    # Scénario
+    # ------------------------
+    def run(self):
+        self.at.run()
+        assert not self.at.exception, self.at.exception
+        self.requests.clear()  # chargement de la page (session déjà ouverte) : hors mesure
+        if self._has_fragments():
+            self._learn_fragments()
+
+        self.interact(self.by_key("text_input", "first_name"), "ali")
+        self.interact(self.by_key("text_input", "last_name"), "CHARFI")
+        self.interact(self.by_key("number_input", "age"), 42)
+        self.interact(self.by_label("radio", "Sexe"), "Féminin")
+        self.interact(self.by_key("text_area", "motif"), "Poussée lupique")
+        self.interact(self.by_key("text_area", "diagnostic"), "Lupus systémique")
+        self.interact(self.by_key("radio", "incident"), "Oui")
+        self.interact(self.by_key("number_input", "nb_incidents"), 2)
+        self.interact(self.by_key("text_area", "incident_desc"), "Chute")
+        self.interact(self.by_key("number_input", "delai_adm"), 5)
+        self.interact(self.by_key("number_input", "duree_sej"), 12)
+        self.interact(self.by_key("text_area", "cause_long_sej"), "Bilan étendu")
+        self.interact(self.by_label("selectbox", "Évolution"), "Rechute")
+        for label in ("Rechute clinique", "3–6 mois", "Non-observance secondaire"):
+            self.interact(self.by_label("checkbox", label), True)
+        for key in ("obs_comp_80", "obs_indication", "obs_accord", "obs_dispo"):
+            self.interact(self.by_key("checkbox", key), True, rerun=not self._form_mode())
+        save = next(b for b in self.at.button if "Enregistrer" in b.label)
+        save.click()
+        self.interact(save, key="__save__")
+
+        foreground = Counter((m, p) for t, m, p in self.requests if "sync" not in t.lower())
+        return {
+            "full_reruns": self.runs["full"],
+            "fragment_reruns": self.runs["fragment"],
+            "http_requests": sum(foreground.values()),
+            "by_endpoint": {f"{m} {p}": n for (m, p), n in sorted(foreground.items())},
+            "background_requests": sum(1 for t, _, _ in self.requests if "sync" in t.lower()),
+            "saved": any(m == "POST" and "indicateur" in p for _, m, p in self.requests),
+        }
+
+
+_KINDS = {"TextInput": "text_input", "NumberInput": "number_input", "Radio": "radio", "Selectbox": "selectbox",
+          "TextArea": "text_area", "Checkbox": "checkbox", "Button": "button", "DateInput": "date_input"}
+
+
+def _widgets(tree):
+    return [w for kind in _KINDS.values() for w in getattr(tree, kind)]
+
+
+def run_single(app_dir, think):
+    """Résultat d'une saisie sur l'app de app_dir (à appeler dans un interpréteur neuf)."""
+    app_dir = os.path.abspath(app_dir)
+    sys.path.insert(0, app_dir)
+    os.chdir(tempfile.mkdtemp(prefix="record_entry_"))
+    os.environ["SNAPSHOT_DIR"] = os.path.join(os.getcwd(), "snapshots")
+    return EntryRun(app_dir, think).run()
+
+
+# ------------------------
+# RAPPORT
+# ------------------------
+def measure(app_dir, think):
+    """Une saisie dans un interpréteur neuf : caches Streamlit et modules de l'app repartent de zéro."""
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--single", "--app", app_dir, "--think", str(think)],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def report(apps, thinks):
+    results = {app: {think: measure(app, think) for think in thinks} for app in apps}
+    rows = [("full script reruns", lambda r: r["full_reruns"]),
+            ("fragment reruns", lambda r: r["fragment_reruns"])]
+    rows += [(f"HTTP requests, {think:g} s/widget", lambda r, t=think: r[t]["http_requests"]) for think in thinks]
+    print(f"{'':<28}" + "".join(f"{os.path.basename(os.path.abspath(app)) or app:>14}" for app in apps))
+    for label, value in rows:
+        cells = [value(results[app] if label.startswith("HTTP") else results[app][thinks[0]]) for app in apps]
+        print(f"{label:<28}" + "".join(f"{c:>14}" for c in cells))
+    for app in apps:
+        for think in thinks:
+            r = results[app][think]
+            print(f"\n{app} ({think:g} s/widget) : {r['by_endpoint']}, arrière-plan {r['background_requests']},"
+                  f" enregistré {r['saved']}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reruns et requêtes HTTP d'une saisie Dashboard")
+    parser.add_argument("--app", action="append", help="répertoire de l'app (répétable ; défaut : ce dépôt)")
+    parser.add_argument("--think", type=float, nargs="+", default=list(THINK_SECONDS),
+                        help="pause simulée entre deux widgets (secondes)")
+    parser.add_argument("--json", help="fichier où écrire les résultats")
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    apps = args.app or [ROOT]
+    if args.single:
+        print(json.dumps(run_single(apps[0], args.think[0]), ensure_ascii=False))
+        sys.exit()
+    results = report(apps, args.think)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=2, ensure_ascii=False)
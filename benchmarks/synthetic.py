@@ -0,0 +1,210 @@
+# benchmarks/synthetic.py
+# Données synthétiques réalistes : indicateurs_cliniques (champs du Dashboard) et hdj_sessions (catalogue HDJ).
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from clinical_data import RECORD_COLUMNS
+from hdj_catalog import load_catalog
+from kpi_engine import ROLLUP_SUMS, count_records
+
+# ------------------------
+# VALEURS DES WIDGETS DU DASHBOARD (run_app.py)
+# ------------------------
+SEXES = ["Masculin", "Féminin"]
+UNITES = ["Hospitalisation", "HDJ"]
+EVOLUTIONS = ["Rémission", "Échec de traitement", "Rechute", "Mortalité", None]
+EVOLUTION_WEIGHTS = [0.70, 0.10, 0.12, 0.03, 0.05]
+READMISSION_TYPES = ["PEC incomplète", "Complication"]
+TYPES_ECHEC = ["Clinique", "Biologique", "Radiologique", "Thérapeutique", "Composite"]
+CAUSES_ECHEC = [
+    "Mauvais diagnostic initial",
+    "Retard thérapeutique",
+    "Résistance / inefficacité pharmacologique",
+    "Comorbidité intercurrente",
+    "Non-observance",
+    "Effet indésirable limitant",
+]
+TYPES_RECHUTE = ["Clinique", "Biologique", "Radiologique", "Thérapeutique", "Composite"]
+DELAIS_RECHUTE = ["<3 mois", "3–6 mois", "6–12 mois", ">12 mois"]
+CAUSES_RECHUTE = [
+    "Non-observance secondaire",
+    "Sevrage ou dégression trop rapide",
+    "Maladie active sous-jacente",
+    "Traitement de fond insuffisant",
+    "Facteur déclenchant intercurrent",
+]
+OBSERVANCE = [
+    "obs_comp_80", "obs_indication", "obs_effets",
+    "obs_accord", "obs_refus", "obs_crainte",
+    "obs_dispo", "obs_cout", "obs_schema", "obs_barriere",
+]
+
+FIRST_NAMES = ["ali", "sara", "youssef", "fatima", "omar", "khadija", "mehdi", "salma", "hamza", "imane",
+               "karim", "nadia", "rachid", "amina", "said", "laila", "anas", "hiba", "reda", "zineb"]
+LAST_NAMES = ["ALAOUI", "BENNANI", "CHARFI", "IDRISSI", "TAZI", "BERRADA", "FASSI", "CHRAIBI", "SEBTI",
+              "LAHLOU", "KETTANI", "SQALLI", "BENJELLOUN", "OUAZZANI", "AMRANI", "ZAHIRI", "NACIRI"]
+MOTIFS = ["Poussée lupique", "Vascularite", "Fièvre prolongée", "Bilan d'AEG", "Sclérodermie", "Sarcoïdose"]
+DIAGNOSES = ["Lupus systémique", "Maladie de Behçet", "Vascularite à ANCA", "Sarcoïdose", "Myosite", None]
+FREE_TEXT = ["Voir dossier", "Signalé au cadre", "Déclaration faite", "Analyse en cours"]
+
+HISTORY_DAYS = 2 * 365
+SCALES = (10_000, 100_000, 1_000_000)
+
+
+# ------------------------
+# INDICATEURS CLINIQUES
+# ------------------------
+def generate_records(n, seed=0, end=None):
+    """n lignes d'indicateurs_cliniques telles que renvoyées par l'API (JSON : None, bool, str ISO).
+
+    Mêmes colonnes que l'enregistrement du Dashboard (build_record) plus id ; les champs
+    conditionnels ne sont renseignés que lorsque la question parente l'est, comme à la saisie.
+    """
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp(end or "2026-10-18", tz="UTC")
+    offsets = np.sort(rng.integers(0, HISTORY_DAYS * 86400, n))[::-1]
+    registration = end - pd.to_timedelta(offsets, unit="s")
+
+    incident = rng.random(n) < 0.02
+    erreur = rng.random(n) < 0.01
+    readmission = rng.random(n) < 0.08
+    infection = rng.random(n) < 0.03
+    effets = rng.random(n) < 0.02
+    dossier = rng.random(n) < 0.95
+    plaintes = rng.random(n) < 0.03
+    bio = rng.random(n) < 0.85
+    duree = rng.integers(1, 41, n)
+    evolution = _pick(rng, EVOLUTIONS, n, EVOLUTION_WEIGHTS)
+    echec = (evolution == "Échec de traitement") & (rng.random(n) < 0.8)
+    is_rechute = evolution == "Rechute"
+    rechute = is_rechute & (rng.random(n) < 0.8)
+
+    df = pd.DataFrame({
+        "id": np.arange(1, n + 1),
+        "registration_time": registration.strftime("%Y-%m-%dT%H:%M:%S+00:00").to_numpy(dtype=object),
+        "patient_first_name": _pick(rng, FIRST_NAMES, n),
+        "patient_last_name": _pick(rng, LAST_NAMES, n),
+        "patient_age": rng.integers(16, 95, n),
+        "patient_sex": _pick(rng, SEXES, n),
+        "patient_unite": _pick(rng, UNITES, n, [0.7, 0.3]),
+        "date_hospitalisation": (registration - pd.to_timedelta(duree, unit="D")).strftime("%Y-%m-%d").to_numpy(dtype=object),
+        "patient_motif": _pick(rng, MOTIFS, n),
+        "patient_diagnosis": _pick(rng, DIAGNOSES, n),
+        "incident": incident,
+        "nb_incidents": _when(incident, rng.integers(1, 4, n)),
+        "incident_description": _when(incident, _pick(rng, FREE_TEXT, n)),
+        "erreur_medicale": erreur,
+        "nb_erreurs": _when(erreur, rng.integers(1, 3, n)),
+        "erreur_description": _when(erreur, _pick(rng, FREE_TEXT, n)),
+        "readmission": readmission,
+        "readmission_type": _when(readmission, _pick(rng, READMISSION_TYPES, n)),
+        "infection_soins": infection,
+        "infection_description": _when(infection, _pick(rng, FREE_TEXT, n)),
+        "effets_graves": effets,
+        "effets_graves_description": _when(effets, _pick(rng, FREE_TEXT, n)),
+        "delai_admission": _when(rng.random(n) < 0.9, rng.integers(1, 61, n)),
+        "duree_sejour": duree,
+        "cause_long_sejour": _when(duree > 10, _pick(rng, FREE_TEXT, n)),
+        "diagnostic_etabli": rng.random(n) < 0.92,
+        "dossier_complet": dossier,
+        "cause_dossier_incomplet": _when(~dossier, _pick(rng, FREE_TEXT, n)),
+        "evolution_patient": evolution,
+        "types_echec": _checked(rng, TYPES_ECHEC, echec),
+        "causes_echec": _checked(rng, CAUSES_ECHEC, echec),
+        "rechute": np.where(is_rechute, rechute, None),
+        "types_rechute": _checked(rng, TYPES_RECHUTE, rechute),
+        "delai_survenue": _checked(rng, DELAIS_RECHUTE, rechute),
+        "cause_principale_rechute": _checked(rng, CAUSES_RECHUTE, rechute),
+        "autres_rechute": _when(rechute & (rng.random(n) < 0.1), _pick(rng, FREE_TEXT, n)),
+        "cause_rechute": None,
+        "mortalite_cause": _when(evolution == "Mortalité", _pick(rng, FREE_TEXT, n)),
+        "pertinence_bio": bio,
+        "examens_bio_redondants": ~bio & (rng.random(n) < 0.5),
+        "examens_bio_non_pertinents": ~bio & (rng.random(n) < 0.5),
+        "pertinence_imagerie": rng.random(n) < 0.9,
+        "satisfaction_patient": _pick(rng, [1, 2, 3, 4, 5], n, [0.03, 0.07, 0.25, 0.40, 0.25]).astype(np.int64),
+        "plaintes_reclamations": plaintes,
+        "plaintes_description": _when(plaintes, _pick(rng, FREE_TEXT, n)),
+        **{key: rng.random(n) < 0.8 for key in OBSERVANCE},
+        "telemedecine": rng.random(n) < 0.2,
+        "client_uuid": _uuids(rng, n),
+    })
+    return df[RECORD_COLUMNS]
+
+
+def daily_rollup(records):
+    """kpi_daily_rollup recalculé depuis des enregistrements typés (apply_schema), comme le trigger SQL."""
+    records = records.assign(day=records["registration_time"].dt.floor("D"))
+    units = records["patient_unite"].astype(object).fillna("")
+    frames = [
+        count_records(records[units == unite], by="day").reset_index().assign(patient_unite=unite)
+        for unite in units.unique()
+    ]
+    rollup = pd.concat(frames, ignore_index=True)
+    rollup["day"] = rollup["day"].dt.date
+    return rollup[["day", "patient_unite", *ROLLUP_SUMS]].sort_values(["day", "patient_unite"], ignore_index=True)
+
+
+# ------------------------
+# SESSIONS HDJ
+# ------------------------
+def generate_hdj_sessions(n, seed=0, end=None, max_selections=6):
+    """n sessions hdj_sessions (id, medicament, selections, created_at) tirées du catalogue HDJ."""
+    rng = np.random.default_rng(seed)
+    catalog = load_catalog()
+    end = pd.Timestamp(end or "2026-10-18", tz="UTC")
+    drugs = catalog.drugs()
+    effects = {drug: catalog.effects(drug) for drug in drugs}
+    created = end - pd.to_timedelta(np.sort(rng.integers(0, HISTORY_DAYS * 86400, n))[::-1], unit="s")
+
+    rows = []
+    for i, drug_index in enumerate(rng.integers(0, len(drugs), n)):
+        drug = drugs[drug_index]
+        candidates = effects[drug]
+        count = min(len(candidates), int(rng.integers(0, max_selections + 1)))
+        selections = []
+        for j in rng.choice(len(candidates), count, replace=False):
+            effect = candidates[j]
+            selections.append({
+                "periode": effect.period,
+                "gravite": effect.severity,
+                "effet": effect.label,
+                "detail": effect.details[rng.integers(len(effect.details))] if effect.details else None,
+                "effet_id": effect.id,
+            })
+        rows.append((i + 1, drug, selections, created[i].isoformat()))
+    return pd.DataFrame(rows, columns=["id", "medicament", "selections", "created_at"])
+
+
+# ------------------------
+# UTILS
+# ------------------------
+def _pick(rng, values, n, p=None):
+    choices = np.empty(len(values), dtype=object)
+    choices[:] = values
+    return choices[rng.choice(len(values), n, p=p)]
+
+
+def _when(mask, values):
+    # Champ conditionnel : None quand la question parente n'est pas cochée
+    out = np.asarray(values).astype(object)
+    out[~mask] = None
+    return out
+
+
+def _checked(rng, options, mask):
+    # Cases cochées jointes par ", " (checked() du Dashboard) ; None si aucune ou si non applicable
+    out = np.full(len(mask), None, dtype=object)
+    rows = np.flatnonzero(mask)
+    ticks = rng.random((len(rows), len(options))) < 0.35
+    for row, tick in zip(rows, ticks):
+        if tick.any():
+            out[row] = ", ".join(option for option, on in zip(options, tick) if on)
+    return out
+
+
+def _uuids(rng, n):
+    raw = rng.bytes(16 * n)
+    return [str(uuid.UUID(bytes=raw[i:i + 16], version=4)) for i in range(0, 16 * n, 16)]
@@ -0,0 +1,24 @@
+# chart_data.py
+# Mise en forme des graphiques Statistics (histogrammes à bornes entières), importable sans Streamlit.
+# Les comptes sont calculés par analytics_engine (DuckDB).
+# Seuls les comptes sont envoyés au navigateur : la taille du JSON Plotly ne dépend plus du nombre de lignes.
+import numpy as np
+import pandas as pd
+
+COUNT = "Nombre"
+MAX_BINS = 20
+SATISFACTION_SCALE = range(1, 6)
+
+
+def histogram_bins(lo, hi, max_bins=MAX_BINS):
+    """(largeur, nombre) des intervalles entiers couvrant [lo, hi]."""
+    step = max(1, -(-(hi - lo + 1) // max_bins))
+    return step, (hi - lo) // step + 1
+
+
+def histogram_table(name, counts, lo=0, step=1):
+    """Comptes par intervalle (le i-ème commence à lo + i * step) -> table du graphique."""
+    starts = lo + step * np.arange(len(counts), dtype=np.int64)
+    labels = starts.astype(str) if step == 1 else [f"{a}–{a + step - 1}" for a in starts]
+    return pd.DataFrame({name: pd.Series(labels, dtype=str), COUNT: np.asarray(counts, dtype=np.int64)})
+
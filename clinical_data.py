@@ -0,0 +1,306 @@
+# clinical_data.py
+import threading
+from datetime import datetime
+
+import pandas as pd
+from postgrest.exceptions import APIError
+from postgrest.types import CountMethod
+
+from clinical_schema import apply_schema
+from patient_index import PATIENT_COLUMNS, SEARCH_LIMIT, build_patient_index
+from query_filters import apply_filters
+from snapshot import LocalReplica, Snapshot
+
+# ------------------------
+# CONFIG
+# ------------------------
+TABLE = "indicateurs_cliniques"
+ROLLUP_TABLE = "kpi_daily_rollup"
+SEARCH_PATIENTS_RPC = "search_patients"
+
+# PostgREST : fonction absente du cache de schéma (migration non appliquée)
+MISSING_FUNCTION = "PGRST202"
+
+# Taille d'une page : alignée sur le plafond "max-rows" de PostgREST (1000 par défaut)
+PAGE_SIZE = 1000
+
+# Grille "Données brutes" : lignes par page affichée
+RAW_PAGE_SIZE = 100
+
+# Copie locale partagée entre sessions : au-delà, rafraîchissement incrémental (>= watermark)
+CACHE_REFRESH_SECONDS = 30
+
+# Rollup : marge du delta sous le dernier updated_at vu (transactions longues validées en retard)
+ROLLUP_WATERMARK_OVERLAP = pd.Timedelta(minutes=5)
+
+# Colonnes réellement utilisées par chaque page
+STATISTICS_COLUMNS = [
+    "id",
+    "registration_time",
+    "patient_first_name",
+    "patient_last_name",
+    "patient_age",
+    "patient_sex",
+    "patient_unite",
+    "incident",
+    "erreur_medicale",
+    "readmission",
+    "evolution_patient",
+    "duree_sejour",
+    "satisfaction_patient",
+]
+
+# Colonnes répliquées dans l'instantané local (snapshot.py) : Statistics et recherche patient
+SNAPSHOT_COLUMNS = STATISTICS_COLUMNS
+
+# Toutes les colonnes d'un enregistrement (choix de colonnes de la grille brute)
+RECORD_COLUMNS = [
+    "id",
+    "registration_time",
+    "patient_first_name",
+    "patient_last_name",
+    "patient_age",
+    "patient_sex",
+    "patient_unite",
+    "date_hospitalisation",
+    "patient_motif",
+    "patient_diagnosis",
+    "incident",
+    "nb_incidents",
+    "incident_description",
+    "erreur_medicale",
+    "nb_erreurs",
+    "erreur_description",
+    "readmission",
+    "readmission_type",
+    "infection_soins",
+    "infection_description",
+    "effets_graves",
+    "effets_graves_description",
+    "delai_admission",
+    "duree_sejour",
+    "cause_long_sejour",
+    "diagnostic_etabli",
+    "dossier_complet",
+    "cause_dossier_incomplet",
+    "evolution_patient",
+    "types_echec",
+    "causes_echec",
+    "rechute",
+    "types_rechute",
+    "delai_survenue",
+    "cause_principale_rechute",
+    "autres_rechute",
+    "cause_rechute",
+    "mortalite_cause",
+    "pertinence_bio",
+    "examens_bio_redondants",
+    "examens_bio_non_pertinents",
+    "pertinence_imagerie",
+    "satisfaction_patient",
+    "plaintes_reclamations",
+    "plaintes_description",
+    "obs_comp_80",
+    "obs_indication",
+    "obs_effets",
+    "obs_accord",
+    "obs_refus",
+    "obs_crainte",
+    "obs_dispo",
+    "obs_cout",
+    "obs_schema",
+    "obs_barriere",
+    "telemedecine",
+    "client_uuid",
+]
+
+
+# ------------------------
+# CHARGEMENT PAGINÉ
+# ------------------------
+def fetch_records(client, columns, filters=(), page_size=PAGE_SIZE):
+    """Charge la table page par page (tri stable sur id) et renvoie un seul DataFrame."""
+    return _fetch_paged(client, TABLE, columns, filters, ("id",), page_size)
+
+
+def fetch_records_page(client, columns, filters=(), sort_by="registration_time", descending=True,
+                       page=0, page_size=RAW_PAGE_SIZE):
+    """Une page de la table triée côté serveur, et le nombre total de lignes filtrées.
+
+    Pagination par décalage (.range) : le tri porte sur une colonne au choix de l'utilisateur,
+    id départage les ex aequo pour un ordre stable. La charge utile ne dépend que de page_size.
+    """
+    response = (
+        apply_filters(client.table(TABLE).select(",".join(columns), count=CountMethod.exact), filters)
+        .order(sort_by, desc=descending, nullsfirst=False)
+        .order("id", desc=descending)
+        .range(page * page_size, (page + 1) * page_size - 1)
+        .execute()
+    )
+    df = pd.DataFrame(response.data, columns=columns)
+    return apply_schema(df), response.count or 0
+
+
+def _fetch_paged(client, table, columns, filters, order_by, page_size=PAGE_SIZE):
+    select = ",".join(columns)
+    pages = []
+    start = 0
+    while True:
+        query = apply_filters(client.table(table).select(select), filters)
+        for column in order_by:
+            query = query.order(column)
+        rows = (
+            query
+            .range(start, start + page_size - 1)
+            .execute()
+            .data
+        )
+        if rows:
+            pages.append(pd.DataFrame(rows))
+        if len(rows) < page_size:
+            break
+        start += page_size
+
+    if not pages:
+        return pd.DataFrame(columns=[] if columns == ["*"] else columns)
+    return pd.concat(pages, ignore_index=True)
+
+
+def _watermark(df):
+    # id est attribué par le serveur : un enregistrement tardif (file hors ligne, renvoi d'un refusé)
+    # reçoit un id plus grand que tous les précédents, quel que soit son registration_time
+    latest = df["id"].max()
+    return None if pd.isna(latest) else int(latest)
+
+
+# ------------------------
+# INSTANTANÉ LOCAL (démarrage à froid, lecture hors ligne)
+# ------------------------
+def _prepare_rollup(df):
+    if "day" in df.columns:
+        df["day"] = pd.to_datetime(df["day"]).dt.date
+    if "updated_at" in df.columns:
+        df["updated_at"] = pd.to_datetime(df["updated_at"], utc=True, format="ISO8601")
+    return df
+
+
+def _rollup_watermark(df):
+    if df.empty or "updated_at" not in df.columns:
+        return None
+    # now() du trigger est l'heure de début de transaction : marge pour celles validées plus tard
+    return (df["updated_at"].max() - ROLLUP_WATERMARK_OVERLAP).isoformat()
+
+
+# Delta par id (attribué par le serveur) ; resynchronisation complète quotidienne ou après
+# invalidate_records(full=True)
+local_records = LocalReplica(
+    Snapshot(TABLE),
+    fetch_all=lambda client: fetch_records(client, SNAPSHOT_COLUMNS),
+    fetch_since=lambda client, watermark: fetch_records(client, SNAPSHOT_COLUMNS, (("gte", "id", watermark),)),
+    watermark=_watermark,
+    watermark_key="watermark_id",
+    prepare=apply_schema,
+    refresh_seconds=CACHE_REFRESH_SECONDS,
+)
+
+# Le rollup est mis à jour en place, y compris pour des jours passés (enregistrements tardifs) :
+# le delta recharge les lignes modifiées depuis le dernier updated_at connu (horloge du serveur)
+local_rollup = LocalReplica(
+    Snapshot(ROLLUP_TABLE, key=["day", "patient_unite"]),
+    fetch_all=lambda client: _fetch_paged(client, ROLLUP_TABLE, ["*"], (), ("day", "patient_unite")),
+    fetch_since=lambda client, watermark: _fetch_paged(
+        client, ROLLUP_TABLE, ["*"], (("gte", "updated_at", watermark),), ("day", "patient_unite")
+    ),
+    watermark=_rollup_watermark,
+    watermark_key="watermark_updated_at",
+    prepare=_prepare_rollup,
+    refresh_seconds=CACHE_REFRESH_SECONDS,
+)
+
+
+def snapshot_age(client, replica=local_records):
+    """Date de la dernière synchronisation si la copie servie à client (None : hors ligne) est périmée, sinon None."""
+    _, stale = replica.get_with_status(client)
+    synced_at = replica.synced_at()
+    if not stale or synced_at is None:
+        return None
+    return datetime.fromtimestamp(synced_at)
+
+
+def invalidate_records(full=False):
+    local_records.invalidate(full)
+    local_rollup.invalidate(full)
+
+
+# ------------------------
+# RECHERCHE PATIENT
+# ------------------------
+def search_patients(client, query, limit=SEARCH_LIMIT):
+    """Patients (nom, prénom, âge, sexe) dont "nom prénom" ou "prénom nom" contient query, sans tenir
+    compte des accents ni de la casse, meilleurs résultats d'abord.
+
+    Recherche serveur (index trigramme) ; à défaut de la rpc ou hors ligne (client=None),
+    index en mémoire sur la copie locale (mêmes correspondances, celles en début de clé d'abord).
+    """
+    if client is None:
+        return patient_index(None).search(query, limit)
+    try:
+        rows = client.rpc(SEARCH_PATIENTS_RPC, {"query": query, "max_results": limit}).execute().data
+        return pd.DataFrame(rows, columns=[*PATIENT_COLUMNS, "nb_records", "last_seen"])
+    except APIError as e:
+        if e.code != MISSING_FUNCTION:
+            raise
+    return patient_index(client).search(query, limit)
+
+
+_patient_index = (None, None)
+_patient_index_lock = threading.Lock()
+
+
+def _forget_patient_index():
+    global _patient_index
+    with _patient_index_lock:
+        _patient_index = (None, None)
+
+
+local_records.on_close(_forget_patient_index)
+
+
+def patient_index(client):
+    """Index en mémoire, reconstruit seulement quand la copie locale a changé."""
+    global _patient_index
+    records = local_records.get(client)
+    if records is None:
+        records = apply_schema(pd.DataFrame(columns=SNAPSHOT_COLUMNS))
+    with _patient_index_lock:
+        source, index = _patient_index
+        if source is not records:
+            index = build_patient_index(records)
+            _patient_index = (records, index)
+    return index
+
+
+def patient_filters(patient):
+    """Filtres serveur d'un patient choisi (ligne renvoyée par search_patients)."""
+    filters = ()
+    for column in PATIENT_COLUMNS:
+        value = patient[column]
+        if pd.isna(value):
+            filters += (("is_", column, "null"),)
+        elif column == "patient_age":
+            # Un âge manquant dans les résultats fait passer la colonne en float (35.0)
+            filters += (("eq", column, int(value)),)
+        else:
+            filters += (("eq", column, str(value)),)
+    return filters
+
+
+def patient_label(patient):
+    parts = [str(patient[c]) for c in ("patient_last_name", "patient_first_name") if not pd.isna(patient[c])]
+    details = []
+    if not pd.isna(patient["patient_age"]):
+        details.append(f"{int(patient['patient_age'])} ans")
+    if not pd.isna(patient["patient_sex"]):
+        details.append(str(patient["patient_sex"]))
+    label = " ".join(parts) or "(sans nom)"
+    return f"{label} — {', '.join(details)}" if details else label
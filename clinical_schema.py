@@ -0,0 +1,88 @@
+# clinical_schema.py
+# Types mémoire des enregistrements indicateurs_cliniques, appliqués une fois au chargement.
+import pandas as pd
+
+# ------------------------
+# SCHÉMA
+# ------------------------
+# Drapeaux Oui/Non du Dashboard (valeur absente -> False)
+BOOL_COLUMNS = [
+    "incident",
+    "erreur_medicale",
+    "readmission",
+    "infection_soins",
+    "effets_graves",
+    "diagnostic_etabli",
+    "dossier_complet",
+    "rechute",
+    "pertinence_bio",
+    "examens_bio_redondants",
+    "examens_bio_non_pertinents",
+    "pertinence_imagerie",
+    "plaintes_reclamations",
+    "obs_comp_80",
+    "obs_indication",
+    "obs_effets",
+    "obs_accord",
+    "obs_refus",
+    "obs_crainte",
+    "obs_dispo",
+    "obs_cout",
+    "obs_schema",
+    "obs_barriere",
+    "telemedecine",
+]
+
+# Listes fermées du Dashboard : l'ordre des catégories est celui des widgets
+CATEGORY_COLUMNS = {
+    "evolution_patient": ["Rémission", "Échec de traitement", "Rechute", "Mortalité"],
+    "patient_sex": ["Masculin", "Féminin"],
+    "patient_unite": ["Hospitalisation", "HDJ"],
+    "readmission_type": ["PEC incomplète", "Complication"],
+}
+
+# Entiers nullables de petite taille
+INT_COLUMNS = {
+    "patient_age": "Int8",
+    "satisfaction_patient": "Int8",
+    # Saisies sans max_value dans le Dashboard : Int16 déborderait au-delà de 32 767
+    "nb_incidents": "Int32",
+    "nb_erreurs": "Int32",
+    "delai_admission": "Int32",
+    "duree_sejour": "Int32",
+}
+
+TIME_COLUMN = "registration_time"
+
+
+# ------------------------
+# APPLICATION
+# ------------------------
+def apply_schema(df):
+    """Convertit en place les colonnes connues présentes dans df et renvoie df."""
+    for col in BOOL_COLUMNS:
+        if col in df.columns and df[col].dtype != bool:
+            df[col] = df[col].fillna(False).astype(bool)
+
+    for col, categories in CATEGORY_COLUMNS.items():
+        if col in df.columns:
+            values = df[col].astype("object")
+            # Valeurs hors liste (saisies historiques) conservées comme catégories supplémentaires
+            extra = sorted(set(values.dropna()) - set(categories))
+            df[col] = pd.Categorical(values, categories=categories + extra)
+
+    for col, dtype in INT_COLUMNS.items():
+        if col in df.columns and df[col].dtype != dtype:
+            df[col] = pd.to_numeric(df[col], errors="coerce").round().astype(dtype)
+
+    if TIME_COLUMN in df.columns:
+        df[TIME_COLUMN] = normalize_times(df[TIME_COLUMN])
+    return df
+
+
+def normalize_times(values):
+    # Horodatages naïfs considérés UTC ; tout est ramené en UTC naïf pour des comparaisons homogènes
+    if pd.api.types.is_datetime64_any_dtype(values) and getattr(values.dt, "tz", None) is None:
+        return values
+    parsed = pd.to_datetime(values, errors="coerce", utc=True, format="ISO8601")
+    return parsed.dt.tz_localize(None)
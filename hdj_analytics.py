@@ -0,0 +1,101 @@
+import streamlit as st
+import plotly.express as px
+from datetime import date, timedelta
+from supabase_client import get_client, get_health_monitor
+from hdj_catalog import load_catalog
+from hdj_data import effect_frequencies, fetch_effect_stats, period_distribution, severity_mix
+
+ALL_DRUGS = "Tous les médicaments"
+TOP_EFFECTS = 20
+
+
+# ------------------------
+# MAIN FUNCTION
+# ------------------------
+def run_hdj_analytics():
+    st.subheader("💉 Analyse des effets secondaires HDJ")
+
+    # Statistiques agrégées côté serveur, sans copie locale
+    if not get_health_monitor().is_online():
+        st.info("💉 Analyse HDJ indisponible hors ligne")
+        return
+
+    supabase = get_client()
+    catalog = load_catalog()
+
+    # ------------------------
+    # FILTERS
+    # ------------------------
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        start_date = st.date_input("Date début", date.today() - timedelta(days=365), key="hdj_start")
+    with col2:
+        end_date = st.date_input("Date fin", date.today(), key="hdj_end")
+    with col3:
+        drug = st.selectbox("Médicament", [ALL_DRUGS, *catalog.drugs()], key="hdj_drug")
+    drug = None if drug == ALL_DRUGS else drug
+
+    # ------------------------
+    # LOAD DATA (agrégé côté serveur : quelques centaines de lignes quel que soit le nombre de sessions)
+    # ------------------------
+    stats = fetch_effect_stats(supabase, start_date, end_date, drug)
+    if stats.empty:
+        st.info("Aucune session HDJ sur la période.")
+        return
+
+    sessions = stats.drop_duplicates("medicament")[["medicament", "sessions_medicament"]]
+    cols = st.columns(min(len(sessions), 5))
+    for i, (name, count) in enumerate(sessions.itertuples(index=False)):
+        with cols[i % len(cols)]:
+            st.metric(name, f"{count} sessions")
+
+    st.divider()
+
+    # ------------------------
+    # FRÉQUENCE DES EFFETS
+    # ------------------------
+    st.subheader("📊 Effets les plus fréquents")
+    freq = effect_frequencies(stats)
+    top = freq.nlargest(TOP_EFFECTS, "frequence")
+    fig = px.bar(
+        top,
+        x="frequence",
+        y="libelle",
+        color="gravite" if drug else "medicament",
+        orientation="h",
+        category_orders={"gravite": list(catalog.severities)},
+        labels={"frequence": "% des sessions", "libelle": "Effet", "gravite": "Gravité", "medicament": "Médicament"},
+        title=f"Top {TOP_EFFECTS} des effets (% des sessions du médicament)",
+    )
+    fig.update_yaxes(autorange="reversed")
+    st.plotly_chart(fig, use_container_width=True)
+
+    st.dataframe(
+        freq[["medicament", "periode", "gravite", "libelle", "nb_sessions", "sessions_medicament", "frequence"]].round(
+            {"frequence": 1}
+        ),
+        use_container_width=True,
+    )
+
+    # ------------------------
+    # RÉPARTITION PAR GRAVITÉ / PÉRIODE
+    # ------------------------
+    col1, col2 = st.columns(2)
+    with col1:
+        mix = severity_mix(stats, catalog.severities)
+        fig = px.bar(
+            mix, x="medicament", y="part", color="gravite",
+            category_orders={"gravite": list(catalog.severities)},
+            labels={"part": "% des sélections", "medicament": "Médicament", "gravite": "Gravité"},
+            title="Répartition par gravité",
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    with col2:
+        periods = period_distribution(stats, catalog.periods(drug) if drug else ())
+        fig = px.bar(
+            periods, x="medicament", y="part", color="periode",
+            labels={"part": "% des sélections", "medicament": "Médicament", "periode": "Période"},
+            title="Répartition par période de survenue",
+        )
+        st.plotly_chart(fig, use_container_width=True)
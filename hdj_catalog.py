@@ -0,0 +1,140 @@
+# hdj_catalog.py
+# Catalogue HDJ des effets secondaires, chargé et validé une fois par process depuis data/hdj_drugs.json.
+import json
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+
+# ------------------------
+# CONFIG
+# ------------------------
+# Surcharge possible sans redéploiement du code (fichier maintenu par la pharmacie)
+CATALOG_PATH = os.environ.get(
+    "HDJ_CATALOG_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "hdj_drugs.json"),
+)
+SUPPORTED_VERSIONS = {1}
+
+
+class CatalogError(ValueError):
+    pass
+
+
+# ------------------------
+# STRUCTURE IMMUABLE
+# ------------------------
+@dataclass(frozen=True)
+class Effect:
+    id: str
+    drug: str
+    period: str
+    severity: str
+    label: str
+    details: tuple = ()
+
+
+class HDJCatalog:
+    """Index en lecture seule : médicament -> période -> gravité -> effets, et id -> effet."""
+
+    def __init__(self, version, severities, tree):
+        self.version = version
+        self.severities = tuple(severities)
+        self._tree = MappingProxyType({
+            drug: MappingProxyType({
+                period: MappingProxyType(dict(groups)) for period, groups in periods.items()
+            })
+            for drug, periods in tree.items()
+        })
+        self._by_id = MappingProxyType({
+            effect.id: effect
+            for periods in tree.values()
+            for groups in periods.values()
+            for effects in groups.values()
+            for effect in effects
+        })
+
+    def drugs(self):
+        return tuple(self._tree)
+
+    def periods(self, drug):
+        return tuple(self._tree[drug])
+
+    def effects(self, drug, period=None, severity=None):
+        """Effets d'un médicament, éventuellement restreints à une période et/ou une gravité."""
+        periods = [period] if period is not None else self._tree[drug]
+        return tuple(
+            effect
+            for p in periods
+            for s, effects in self._tree[drug][p].items()
+            if severity is None or s == severity
+            for effect in effects
+        )
+
+    def groups(self, drug):
+        """{période: {gravité: (effets, …)}} en lecture seule."""
+        return self._tree[drug]
+
+    def effect(self, effect_id):
+        return self._by_id[effect_id]
+
+    def __len__(self):
+        return len(self._by_id)
+
+
+# ------------------------
+# CHARGEMENT + VALIDATION
+# ------------------------
+@lru_cache(maxsize=None)
+def load_catalog(path=CATALOG_PATH):
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    return parse_catalog(raw)
+
+
+def parse_catalog(raw):
+    version = raw.get("version")
+    if version not in SUPPORTED_VERSIONS:
+        raise CatalogError(f"Version de catalogue non prise en charge : {version!r}")
+    severities = raw.get("severities") or []
+
+    tree = {}
+    seen_ids = set()
+    for drug in raw.get("drugs", []):
+        name = _require_text(drug, "name", "médicament")
+        if name in tree:
+            raise CatalogError(f"Médicament en double : {name}")
+        tree[name] = {}
+        for period in drug.get("periods", []):
+            period_name = _require_text(period, "name", f"période de {name}")
+            groups = {}
+            for severity, effects in period.get("effects", {}).items():
+                if severity not in severities:
+                    raise CatalogError(f"Gravité inconnue '{severity}' ({name} / {period_name})")
+                items = []
+                for item in effects:
+                    effect_id = _require_text(item, "id", f"effet de {name} / {period_name}")
+                    if effect_id in seen_ids:
+                        raise CatalogError(f"Identifiant d'effet en double : {effect_id}")
+                    seen_ids.add(effect_id)
+                    items.append(Effect(
+                        id=effect_id,
+                        drug=name,
+                        period=period_name,
+                        severity=severity,
+                        label=_require_text(item, "label", effect_id),
+                        details=tuple(item.get("details", ())),
+                    ))
+                groups[severity] = tuple(items)
+            # Ordre des gravités imposé par le catalogue, quel que soit l'ordre du fichier
+            tree[name][period_name] = {s: groups.get(s, ()) for s in severities}
+    if not tree:
+        raise CatalogError("Catalogue HDJ vide")
+    return HDJCatalog(version, severities, tree)
+
+
+def _require_text(obj, key, where):
+    value = obj.get(key)
+    if not isinstance(value, str) or not value.strip():
+        raise CatalogError(f"Champ '{key}' manquant ou vide ({where})")
+    return value
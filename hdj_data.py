@@ -0,0 +1,123 @@
+# hdj_data.py
+# Fréquences des effets secondaires HDJ : agrégation serveur (rpc hdj_effect_stats) ou locale vectorisée.
+import pandas as pd
+from postgrest.exceptions import APIError
+
+from clinical_data import MISSING_FUNCTION, PAGE_SIZE
+from query_filters import apply_filters, period_filters
+
+# ------------------------
+# CONFIG
+# ------------------------
+SESSIONS_TABLE = "hdj_sessions"
+STATS_RPC = "hdj_effect_stats"
+SELECTION_FIELDS = ["periode", "gravite", "effet_id", "effet", "detail"]
+# effet_id n'est pas une clé : les sessions antérieures au catalogue versionné n'en ont pas
+STATS_KEYS = ["medicament", "periode", "gravite", "effet", "detail"]
+STATS_COLUMNS = [*STATS_KEYS[:3], "effet_id", *STATS_KEYS[3:], "nb_selections", "nb_sessions", "sessions_medicament"]
+
+
+# ------------------------
+# AGRÉGATION SERVEUR
+# ------------------------
+def fetch_effect_stats(client, start_date=None, end_date=None, drug=None):
+    """Une ligne par médicament × effet (× détail), agrégée en SQL ; bascule en local si la rpc n'existe pas."""
+    params = {
+        "start_date": start_date.isoformat() if start_date else None,
+        "end_date": end_date.isoformat() if end_date else None,
+        "drug": drug or None,
+    }
+    try:
+        return _paged(lambda: client.rpc(STATS_RPC, params), STATS_COLUMNS)
+    except APIError as e:
+        if e.code != MISSING_FUNCTION:
+            raise
+    sessions = fetch_sessions(client, start_date, end_date, drug)
+    return effect_stats(sessions)
+
+
+def fetch_sessions(client, start_date=None, end_date=None, drug=None):
+    """Sessions HDJ brutes (id, medicament, selections), pour le chemin local."""
+    filters = ()
+    if start_date and end_date:
+        filters += period_filters(start_date, end_date, column="created_at")
+    if drug:
+        filters += (("eq", "medicament", drug),)
+    return _paged(
+        lambda: apply_filters(client.table(SESSIONS_TABLE).select("id,medicament,selections"), filters).order("id"),
+        ["id", "medicament", "selections"],
+    )
+
+
+def _paged(build_query, columns, page_size=PAGE_SIZE):
+    pages = []
+    start = 0
+    while True:
+        rows = build_query().range(start, start + page_size - 1).execute().data
+        if rows:
+            pages.append(pd.DataFrame(rows))
+        if len(rows) < page_size:
+            break
+        start += page_size
+    if not pages:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(pages, ignore_index=True)
+
+
+# ------------------------
+# AGRÉGATION LOCALE (vectorisée)
+# ------------------------
+def explode_selections(sessions):
+    """Une ligne par effet sélectionné : id et médicament de la session + champs de la sélection."""
+    exploded = (
+        sessions[["id", "medicament", "selections"]]
+        .explode("selections", ignore_index=True)
+        .dropna(subset=["selections"])
+    )
+    fields = pd.DataFrame.from_records(exploded["selections"].tolist(), columns=SELECTION_FIELDS)
+    return pd.concat([exploded[["id", "medicament"]].reset_index(drop=True), fields], axis=1)
+
+
+def effect_stats(sessions):
+    """Même résultat que la rpc hdj_effect_stats, calculé sur un DataFrame de sessions."""
+    if sessions.empty:
+        return pd.DataFrame(columns=STATS_COLUMNS)
+    selected = explode_selections(sessions)
+    stats = (
+        selected.groupby(STATS_KEYS, dropna=False, sort=True)
+        .agg(effet_id=("effet_id", "first"), nb_selections=("id", "size"), nb_sessions=("id", "nunique"))
+        .reset_index()
+    )
+    totals = sessions.groupby("medicament").size().rename("sessions_medicament")
+    return stats.join(totals, on="medicament")[STATS_COLUMNS]
+
+
+# ------------------------
+# VUES DÉRIVÉES (quelques centaines de lignes au plus)
+# ------------------------
+def effect_frequencies(stats):
+    """Part des sessions du médicament où l'effet (et son détail éventuel) a été relevé, en %."""
+    freq = stats.copy()
+    freq["libelle"] = freq["effet"].where(freq["detail"].isna(), freq["effet"] + " ↳ " + freq["detail"])
+    freq["frequence"] = 100 * freq["nb_sessions"] / freq["sessions_medicament"]
+    return freq.sort_values(["medicament", "frequence"], ascending=[True, False], ignore_index=True)
+
+
+def severity_mix(stats, severities=()):
+    """Sélections par médicament × gravité, en % du total du médicament."""
+    return _share(stats, "gravite", severities)
+
+
+def period_distribution(stats, periods=()):
+    """Sélections par médicament × période de survenue, en % du total du médicament."""
+    return _share(stats, "periode", periods)
+
+
+def _share(stats, column, order):
+    mix = stats.groupby(["medicament", column], sort=False)["nb_selections"].sum().reset_index()
+    mix["part"] = 100 * mix["nb_selections"] / mix.groupby("medicament")["nb_selections"].transform("sum")
+    if order:
+        # Ordre du catalogue ; les libellés inconnus (anciennes sessions) viennent à la fin
+        known = list(order) + sorted(set(mix[column].dropna()) - set(order))
+        mix[column] = pd.Categorical(mix[column], categories=known, ordered=True)
+    return mix.sort_values(["medicament", column], ignore_index=True)
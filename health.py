@@ -0,0 +1,98 @@
+# health.py
+import threading
+import time
+
+import httpx
+
+# ------------------------
+# CONFIG
+# ------------------------
+PROBE_TIMEOUT = 2.0      # secondes : une sonde lente compte comme un échec
+CACHE_TTL = 15           # durée de validité d'un résultat de sonde
+FAILURE_THRESHOLD = 3    # échecs consécutifs avant ouverture du circuit
+OPEN_SECONDS = 30        # durée pendant laquelle on bascule hors ligne sans sonder
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+# ------------------------
+# MONITEUR DE SANTÉ + DISJONCTEUR
+# ------------------------
+class HealthMonitor:
+    """État de connexion à Supabase partagé par tout le process.
+
+    - fermé : résultat de sonde mis en cache CACHE_TTL secondes ;
+    - ouvert : après FAILURE_THRESHOLD échecs, hors ligne immédiat pendant OPEN_SECONDS ;
+    - semi-ouvert : ensuite, une seule sonde décide de la fermeture ou de la réouverture.
+    Les appels réels (sauvegarde, lecture) peuvent signaler leurs succès/échecs ; un échec isolé
+    ne fait pas basculer hors ligne, seul le seuil FAILURE_THRESHOLD ouvre le circuit.
+    """
+
+    def __init__(self, probe, cache_ttl=CACHE_TTL, failure_threshold=FAILURE_THRESHOLD,
+                 open_seconds=OPEN_SECONDS):
+        self.probe = probe
+        self.cache_ttl = cache_ttl
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.checked_at = None
+        self.online = True
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def is_online(self):
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN:
+                if now - self.opened_at < self.open_seconds:
+                    return False
+                self.state = HALF_OPEN
+            elif self.checked_at is not None and now - self.checked_at < self.cache_ttl:
+                return self.online
+            if self._probing:
+                # Une sonde est déjà en cours : les autres sessions lisent l'état courant
+                return self.online and self.state == CLOSED
+            self._probing = True
+        try:
+            ok = bool(self.probe())
+        except Exception:
+            ok = False
+        finally:
+            self._probing = False
+        if ok:
+            self.record_success()
+        else:
+            self.record_failure()
+        # Sous le seuil, un échec renvoie l'état en cache (en ligne), comme les autres sessions
+        return self.online
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.online = True
+            self.checked_at = time.monotonic()
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            # Sous le seuil, l'état en cache est conservé (et resservi CACHE_TTL secondes, sans nouvelle
+            # sonde) : un échec isolé ne coupe pas toutes les sessions
+            self.checked_at = time.monotonic()
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.online = False
+                self.opened_at = self.checked_at
+
+
+def is_connection_error(error):
+    """Panne réseau (transport, délai dépassé) : seules ces erreurs sont signalées au moniteur.
+
+    Une erreur HTTP renvoyée par le serveur (APIError 4xx : enregistrement invalide, rpc absente)
+    prouve au contraire que Supabase est joignable.
+    """
+    return isinstance(error, httpx.TransportError)
@@ -0,0 +1,153 @@
+# kpi_engine.py
+# Calcul des KPI Objectifs en pandas pur (importable sans Streamlit).
+import numpy as np
+import pandas as pd
+
+# ------------------------
+# COMPTES NÉCESSAIRES AUX KPI
+# ------------------------
+# Même schéma que la table kpi_daily_rollup (voir supabase/migrations/*_kpi_daily_rollup.sql)
+ROLLUP_SUMS = [
+    "nb_records",
+    "sum_incidents",
+    "nb_ias",
+    "nb_readmissions",
+    "nb_dossiers_complets",
+    "nb_effets_graves",
+    "sum_delai_admission",
+    "nb_delai_admission",
+    "nb_diagnostic_etabli",
+    "nb_plaintes",
+    "nb_remission",
+    "nb_echec",
+    "nb_rechute",
+    "nb_mortalite",
+]
+
+EVOLUTION_COUNTS = {
+    "nb_remission": "Rémission",
+    "nb_echec": "Échec de traitement",
+    "nb_rechute": "Rechute",
+    "nb_mortalite": "Mortalité",
+}
+
+# ------------------------
+# DÉFINITION DES KPI
+# ------------------------
+# (libellé, numérateur, dénominateur, objectif affiché, seuil, sens) ; sens "lt" : valeur < seuil
+KPI_TARGETS = [
+    ("Taux d'incidents (%)", "sum_incidents", "nb_records", "< 2 %", 2, "lt"),
+    ("Taux IAS (%)", "nb_ias", "nb_records", "< 3 %", 3, "lt"),
+    ("Taux de réadmission (%)", "nb_readmissions", "nb_records", "< 10 %", 10, "lt"),
+    ("Traçabilité dossiers (%)", "nb_dossiers_complets", "nb_records", "> 95 %", 95, "gt"),
+    ("Délai moyen admission (jours)", "sum_delai_admission", "nb_delai_admission", "< 30", 30, "lt"),
+    ("Dossiers complets avec diagnostic (%)", "nb_diagnostic_etabli", "nb_records", "> 90 %", 90, "gt"),
+    ("Taux Échec thérapeutique (%)", "nb_echec", "nb_records", "< 10 %", 10, "lt"),
+]
+
+# KPI suivis en tendance, sans objectif chiffré
+KPI_TRENDS = [
+    ("Effets indésirables graves (%)", "nb_effets_graves"),
+    ("Rémission (%)", "nb_remission"),
+    ("Échec (%)", "nb_echec"),
+    ("Rechute (%)", "nb_rechute"),
+    ("Mortalité (%)", "nb_mortalite"),
+    ("Taux de plaintes (%)", "nb_plaintes"),
+]
+
+CONFORME = "🟢 Conforme"
+NON_CONFORME = "🔴 Non conforme"
+
+
+# ------------------------
+# UTILS
+# ------------------------
+def trend(current, previous):
+    if previous == 0:
+        return "➡️ Stable"
+    diff = current - previous
+    if diff > 0:
+        return "🔺 En hausse"
+    elif diff < 0:
+        return "🔻 En baisse"
+    return "➡️ Stable"
+
+
+# ------------------------
+# AGRÉGATION (un seul groupby)
+# ------------------------
+def count_records(df, by="period"):
+    """Lignes brutes d'indicateurs_cliniques -> comptes ROLLUP_SUMS par groupe, en une passe."""
+    codes, groups = pd.factorize(df[by], sort=True)
+    keep = codes >= 0  # lignes hors période (NaN) ignorées
+    codes = codes[keep]
+    n = len(groups)
+
+    def total(values):
+        return np.bincount(codes, weights=np.asarray(values, dtype="float64")[keep], minlength=n)
+
+    delai = pd.to_numeric(df["delai_admission"], errors="coerce")
+    sums = {
+        "nb_records": np.bincount(codes, minlength=n),
+        "sum_incidents": total(pd.to_numeric(df["nb_incidents"], errors="coerce").fillna(0)),
+        "nb_ias": total(_flag(df["infection_soins"])),
+        "nb_readmissions": total(_flag(df["readmission"])),
+        "nb_dossiers_complets": total(_flag(df["dossier_complet"])),
+        "nb_effets_graves": total(_flag(df["effets_graves"])),
+        "sum_delai_admission": total(delai.fillna(0)),
+        "nb_delai_admission": total(delai.notna()),
+        "nb_diagnostic_etabli": total(_flag(df["diagnostic_etabli"])),
+        "nb_plaintes": total(_flag(df["plaintes_reclamations"])),
+    }
+
+    # Évolutions : un seul bincount sur (groupe × évolution)
+    evolutions = list(EVOLUTION_COUNTS.values())
+    evo_codes = pd.Categorical(df["evolution_patient"], categories=evolutions).codes[keep]
+    known = evo_codes >= 0
+    grid = np.bincount(codes[known] * len(evolutions) + evo_codes[known], minlength=n * len(evolutions))
+    grid = grid.reshape(n, len(evolutions))
+    for i, col in enumerate(EVOLUTION_COUNTS):
+        sums[col] = grid[:, i]
+
+    return pd.DataFrame(sums, index=pd.Index(groups, name=by))[ROLLUP_SUMS]
+
+
+def _flag(col):
+    return col.fillna(False).astype(bool).astype("int64")
+
+
+# ------------------------
+# KPI
+# ------------------------
+def compute_kpis(sums, periods=None):
+    """Comptes par période (index) -> tableau long (period, kpi, value, target, status)."""
+    if periods is not None:
+        sums = sums.reindex(periods, fill_value=0)
+    sums = sums.astype("float64")
+
+    frames = []
+    for name, num, den, target, threshold, mode in KPI_TARGETS:
+        value = _ratio(sums[num], sums[den], pct=den == "nb_records")
+        ok = value < threshold if mode == "lt" else value > threshold
+        frames.append(pd.DataFrame({
+            "period": sums.index,
+            "kpi": name,
+            "value": value.to_numpy(),
+            "target": target,
+            "status": np.where(ok, CONFORME, NON_CONFORME),
+        }))
+    for name, num in KPI_TRENDS:
+        frames.append(pd.DataFrame({
+            "period": sums.index,
+            "kpi": name,
+            "value": _ratio(sums[num], sums["nb_records"], pct=True).to_numpy(),
+            "target": None,
+            "status": None,
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _ratio(num, den, pct):
+    # % : 0 si dénominateur nul (comme safe_pct) ; moyenne : NaN si aucune valeur
+    ratio = num / den.where(den != 0)
+    return (ratio * 100).fillna(0) if pct else ratio
@@ -0,0 +1,80 @@
+# kpi_export.py
+# Export des tables KPI (xlsx en streaming, ou archive zip de CSV / Parquet), sans dépendance à Streamlit.
+import io
+import zipfile
+
+# ------------------------
+# CONFIG
+# ------------------------
+# format -> (extension du fichier téléchargé, type MIME)
+EXPORT_FORMATS = {
+    "xlsx": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": ("zip", "application/zip"),
+    "parquet": ("zip", "application/zip"),
+}
+
+# Lignes converties à la fois avant écriture (borne la mémoire de conversion)
+CHUNK_ROWS = 10_000
+
+
+def export_tables(sheets, fmt):
+    """sheets : {nom: DataFrame}. Renvoie le contenu du fichier (bytes) au format demandé."""
+    if fmt == "xlsx":
+        return write_xlsx(sheets)
+    if fmt in ("csv", "parquet"):
+        return write_zip(sheets, fmt)
+    raise ValueError(f"Format d'export inconnu : {fmt!r}")
+
+
+# ------------------------
+# XLSX (constant_memory)
+# ------------------------
+def write_xlsx(sheets):
+    """Classeur écrit ligne par ligne en mode constant_memory de xlsxwriter.
+
+    Chaque ligne est vidée sur disque dès que la suivante commence : la mémoire ne dépend pas
+    du nombre de lignes. DataFrame.to_excel écrit colonne par colonne, ce qui est incompatible
+    avec ce mode (les cellules des lignes déjà vidées seraient perdues), d'où write_row.
+    """
+    from xlsxwriter import Workbook
+
+    output = io.BytesIO()
+    workbook = Workbook(output, {"constant_memory": True, "default_date_format": "yyyy-mm-dd"})
+    try:
+        for name, df in sheets.items():
+            worksheet = workbook.add_worksheet(name)
+            worksheet.write_row(0, 0, [str(c) for c in df.columns])
+            row = 1
+            for rows in _chunks(df):
+                for values in rows:
+                    worksheet.write_row(row, 0, values)
+                    row += 1
+    finally:
+        workbook.close()
+    return output.getvalue()
+
+
+def _chunks(df):
+    # Valeurs Python natives, manquants -> None (cellule vide) ; NaN / pd.NA sont refusés par xlsxwriter
+    for start in range(0, len(df), CHUNK_ROWS):
+        chunk = df.iloc[start:start + CHUNK_ROWS]
+        yield chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None)
+
+
+# ------------------------
+# CSV / PARQUET (une entrée par table dans une archive zip)
+# ------------------------
+def write_zip(sheets, fmt):
+    output = io.BytesIO()
+    # Parquet est déjà compressé : inutile de le recompresser
+    compression = zipfile.ZIP_DEFLATED if fmt == "csv" else zipfile.ZIP_STORED
+    with zipfile.ZipFile(output, "w", compression) as archive:
+        for name, df in sheets.items():
+            with archive.open(f"{name}.{fmt}", "w") as f:
+                if fmt == "csv":
+                    with io.TextIOWrapper(f, encoding="utf-8-sig", newline="") as text:
+                        df.to_csv(text, index=False, chunksize=CHUNK_ROWS)
+                else:
+                    df.to_parquet(f, index=False, engine="pyarrow")
+    return output.getvalue()
+
@@ -1,41 +1,26 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
-from supabase import create_client
-from io import BytesIO
-from datetime import timedelta
+from supabase_client import get_client, get_health_monitor
+from clinical_data import local_rollup, snapshot_age
+from analytics_engine import rollup_bounds
+from kpi_export import EXPORT_FORMATS, export_tables
+from objectifs_data import CURRENT, export_sheets, load_kpis, trend_table
 
-# ------------------------
-# SUPABASE CLIENT
-# ------------------------
-SUPABASE_URL = st.secrets["SUPABASE"]["URL"]
-SUPABASE_KEY = st.secrets["SUPABASE"]["KEY"]
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Exports gardés en cache (clé : période, service, format, version de la copie du rollup)
+EXPORT_TTL = 10 * 60
+EXPORT_MAX_ENTRIES = 8
 
 
 # ------------------------
-# UTILS
+# EXPORT
 # ------------------------
-def safe_pct(num, den):
-    return (num / den * 100) if den else 0
-
-
-def trend(current, previous):
-    if previous == 0:
-        return "➡️ Stable"
-    diff = current - previous
-    if diff > 0:
-        return "🔺 En hausse"
-    elif diff < 0:
-        return "🔻 En baisse"
-    return "➡️ Stable"
-
-
-def status_threshold(value, target, mode="lt"):
-    if mode == "lt":  # value < target
-        return "🟢 Conforme" if value < target else "🔴 Non conforme"
-    else:  # value > target
-        return "🟢 Conforme" if value > target else "🔴 Non conforme"
+# Construit seulement à la demande ; bytes immuables partagés sans copie (cache_resource).
+# rollup_version (LocalReplica.version) change à chaque synchronisation qui apporte des données :
+# un export n'est jamais servi depuis une copie plus ancienne que celle affichée.
+@st.cache_resource(ttl=EXPORT_TTL, max_entries=EXPORT_MAX_ENTRIES, show_spinner="Préparation de l'export…")
+def build_export(_supabase, start_date, end_date, service, fmt, rollup_version):
+    df_kpi = load_kpis(_supabase, start_date, end_date, service)
+    return export_tables(export_sheets(_supabase, start_date, end_date, service, df_kpi), fmt)
 
 
 # ------------------------
@@ -44,97 +29,39 @@ def status_threshold(value, target, mode="lt"):
 def run_objectifs():
     st.subheader("🎯 Objectifs & Indicateurs Cliniques")
 
+    # Hors ligne : copie locale du rollup, sans synchronisation
+    supabase = get_client() if get_health_monitor().is_online() else None
+
     # ------------------------
-    # LOAD DATA
+    # LOAD DATA (rollup journalier jour × unité, maintenu côté serveur, répliqué localement)
     # ------------------------
-    records = supabase.table("indicateurs_cliniques").select("*").execute().data
-    if not records:
+    day_min, day_max = rollup_bounds(supabase)
+    synced_at = snapshot_age(supabase, local_rollup)
+    if synced_at is not None:
+        st.warning(f"🕒 Données non synchronisées — instantané local du {synced_at:%d/%m/%Y %H:%M}")
+    if day_min is None:
         st.info("Aucune donnée disponible.")
         return
 
-    df = pd.DataFrame(records)
-    df["registration_time"] = pd.to_datetime(df["registration_time"], errors="coerce")
-
     # ------------------------
     # FILTERS
     # ------------------------
     col1, col2, col3 = st.columns(3)
 
     with col1:
-        start_date = st.date_input(
-            "Date début", df["registration_time"].min().date()
-        )
+        start_date = st.date_input("Date début", day_min)
     with col2:
-        end_date = st.date_input(
-            "Date fin", df["registration_time"].max().date()
-        )
+        end_date = st.date_input("Date fin", day_max)
     with col3:
         service = st.text_input("Service (optionnel)")
 
-    df_period = df[
-        (df["registration_time"].dt.date >= start_date)
-        & (df["registration_time"].dt.date <= end_date)
-    ]
-
-    if service and "patient_service" in df_period.columns:
-        df_period = df_period[
-            df_period["patient_service"].str.contains(service, case=False, na=False)
-        ]
-
-    # période précédente (pour tendance)
-    delta = (end_date - start_date).days or 1
-    prev_start = start_date - timedelta(days=delta)
-    prev_end = start_date
-
-    df_prev = df[
-        (df["registration_time"].dt.date >= prev_start)
-        & (df["registration_time"].dt.date < prev_end)
-    ]
-
-    # ------------------------
-    # COUNTS
-    # ------------------------
-    total = len(df_period)
-
-    nb_incidents = df_period["nb_incidents"].fillna(0).sum()
-    nb_ias = df_period["infection_soins"].sum() if "infection_soins" in df_period.columns else 0
-    nb_readm = df_period["readmission"].sum() if "readmission" in df_period.columns else 0
-    nb_dossiers_ok = df_period["dossier_complet"].sum()
-    nb_effets_graves = df_period["effets_graves"].sum() if "effets_graves" in df_period.columns else 0
-    delai_moyen = df_period["delai_admission"].mean()
-    nb_diag_ok = df_period["diagnostic_etabli"].sum()
-    nb_plaintes = df_period["plaintes_reclamations"].sum() if "plaintes_reclamations" in df_period.columns else 0
-    nb_echec = (df_period["evolution_patient"] == "Échec de traitement").sum()
-
-    evol = df_period["evolution_patient"].value_counts()
-
-    # période précédente
-    total_prev = len(df_prev)
-    prev_vals = {
-        "effets": df_prev["effets_graves"].sum() if "effets_graves" in df_prev.columns else 0,
-        "plaintes": df_prev["plaintes_reclamations"].sum() if "plaintes_reclamations" in df_prev.columns else 0,
-        "remission": (df_prev["evolution_patient"] == "Rémission").sum(),
-        "echec": (df_prev["evolution_patient"] == "Échec de traitement").sum(),
-        "rechute": (df_prev["evolution_patient"] == "Rechute").sum(),
-        "mort": (df_prev["evolution_patient"] == "Mortalité").sum(),
-    }
-
-    # ------------------------
-    # KPI VALUES
-    # ------------------------
-    kpis = [
-        ("Taux d'incidents (%)", safe_pct(nb_incidents, total), "< 2 %", status_threshold(safe_pct(nb_incidents, total), 2, "lt")),
-        ("Taux IAS (%)", safe_pct(nb_ias, total), "< 3 %", status_threshold(safe_pct(nb_ias, total), 3, "lt")),
-        ("Taux de réadmission (%)", safe_pct(nb_readm, total), "< 10 %", status_threshold(safe_pct(nb_readm, total), 10, "lt")),
-        ("Traçabilité dossiers (%)", safe_pct(nb_dossiers_ok, total), "> 95 %", status_threshold(safe_pct(nb_dossiers_ok, total), 95, "gt")),
-        ("Délai moyen admission (jours)", delai_moyen, "< 30", status_threshold(delai_moyen, 30, "lt")),
-        ("Dossiers complets avec diagnostic (%)", safe_pct(nb_diag_ok, total), "> 90 %", status_threshold(safe_pct(nb_diag_ok, total), 90, "gt")),
-        ("Taux Échec thérapeutique (%)", safe_pct(nb_echec, total), "< 10 %", status_threshold(safe_pct(nb_echec, total), 10, "lt")),
-    ]
+    df_kpi = load_kpis(supabase, start_date, end_date, service)
+    kpi_cur = df_kpi[df_kpi["period"] == CURRENT].set_index("kpi")
 
     st.subheader("📌 KPI avec objectifs")
     cols = st.columns(3)
-    for i, (name, val, target, status) in enumerate(kpis):
+    kpis = kpi_cur[kpi_cur["target"].notna()]
+    for i, (name, val, target, status) in enumerate(kpis[["value", "target", "status"]].itertuples()):
         with cols[i % 3]:
             st.metric(name, f"{val:.2f}", target)
             st.caption(status)
@@ -146,43 +73,7 @@ def run_objectifs():
     # ------------------------
     st.subheader("📈 KPI en tendance")
 
-    trend_data = {
-        "Effets indésirables graves (%)": (
-            safe_pct(nb_effets_graves, total),
-            safe_pct(prev_vals["effets"], total_prev),
-        ),
-        "Rémission (%)": (
-            safe_pct(evol.get("Rémission", 0), total),
-            safe_pct(prev_vals["remission"], total_prev),
-        ),
-        "Échec (%)": (
-            safe_pct(evol.get("Échec de traitement", 0), total),
-            safe_pct(prev_vals["echec"], total_prev),
-        ),
-        "Rechute (%)": (
-            safe_pct(evol.get("Rechute", 0), total),
-            safe_pct(prev_vals["rechute"], total_prev),
-        ),
-        "Mortalité (%)": (
-            safe_pct(evol.get("Mortalité", 0), total),
-            safe_pct(prev_vals["mort"], total_prev),
-        ),
-        "Taux de plaintes (%)": (
-            safe_pct(nb_plaintes, total),
-            safe_pct(prev_vals["plaintes"], total_prev),
-        ),
-    }
-
-    rows = []
-    for k, (cur, prev) in trend_data.items():
-        rows.append({
-            "KPI": k,
-            "Valeur actuelle": round(cur, 2),
-            "Valeur précédente": round(prev, 2),
-            "Tendance": trend(cur, prev)
-        })
-
-    df_trend = pd.DataFrame(rows)
+    df_trend = trend_table(df_kpi)
     st.dataframe(df_trend, use_container_width=True)
 
     fig = px.bar(df_trend, x="KPI", y="Valeur actuelle", title="Comparaison des KPI")
@@ -191,14 +82,22 @@ def run_objectifs():
     # ------------------------
     # EXPORT
     # ------------------------
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        df_period.to_excel(writer, index=False, sheet_name="Indicateurs")
-        df_trend.to_excel(writer, index=False, sheet_name="KPI_Objectifs")
-
-    st.download_button(
-        "⬇️ Télécharger les KPI",
-        data=output.getvalue(),
-        file_name="kpi_objectifs.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
+    # Les enregistrements patients ne sont pas répliqués en entier : l'export exige le serveur
+    if supabase is None:
+        st.info("📦 Export indisponible hors ligne")
+        return
+
+    fmt = st.radio("Format", list(EXPORT_FORMATS), horizontal=True, key="kpi_export_format")
+    export_key = (start_date, end_date, service, fmt)
+    if st.button("📦 Préparer l'export"):
+        st.session_state._kpi_export = export_key
+
+    # Rien n'est généré tant que l'export n'est pas demandé pour ces filtres
+    if st.session_state.get("_kpi_export") == export_key:
+        extension, mime = EXPORT_FORMATS[fmt]
+        st.download_button(
+            "⬇️ Télécharger les KPI",
+            data=build_export(supabase, *export_key, local_rollup.version),
+            file_name=f"kpi_objectifs_{start_date}_{end_date}.{extension}",
+            mime=mime,
+        )
@@ -0,0 +1,68 @@
+# objectifs_data.py
+# Données de la page Objectifs : KPI par période (rollup local), enregistrements de la période et feuilles d'export.
+from datetime import timedelta
+
+import pandas as pd
+
+from analytics_engine import period_kpis
+from clinical_data import RECORD_COLUMNS, fetch_records
+from clinical_schema import apply_schema
+from kpi_engine import KPI_TRENDS, trend
+from query_filters import contains_pattern, period_filters
+
+CURRENT = "Période actuelle"
+PREVIOUS = "Période précédente"
+
+
+# ------------------------
+# KPI
+# ------------------------
+def load_kpis(supabase, start_date, end_date, service):
+    """KPI (tidy) des périodes courante et précédente."""
+    # période précédente (pour tendance)
+    delta = (end_date - start_date).days or 1
+    prev_start = start_date - timedelta(days=delta)
+    prev_end = start_date
+
+    periods = {
+        CURRENT: (start_date, end_date),
+        PREVIOUS: (prev_start, prev_end - timedelta(days=1)),
+    }
+    # KPI VALUES (une requête DuckDB agrège les deux périodes sur la copie locale du rollup)
+    df_kpi = period_kpis(supabase, periods, service)
+    return df_kpi
+
+
+def trend_table(df_kpi):
+    kpi_cur = df_kpi[df_kpi["period"] == CURRENT].set_index("kpi")
+    kpi_prev = df_kpi[df_kpi["period"] == PREVIOUS].set_index("kpi")
+    rows = []
+    for k, _ in KPI_TRENDS:
+        cur, prev = kpi_cur.at[k, "value"], kpi_prev.at[k, "value"]
+        rows.append({
+            "KPI": k,
+            "Valeur actuelle": round(cur, 2),
+            "Valeur précédente": round(prev, 2),
+            "Tendance": trend(cur, prev)
+        })
+    return pd.DataFrame(rows)
+
+
+# ------------------------
+# EXPORT
+# ------------------------
+def period_records(supabase, start_date, end_date, service):
+    """Enregistrements patients de la période (feuille Indicateurs), chargés page par page côté serveur."""
+    filters = period_filters(start_date, end_date)
+    if service:
+        filters += (("ilike", "patient_unite", contains_pattern(service)),)
+    return apply_schema(fetch_records(supabase, RECORD_COLUMNS, filters))
+
+
+def export_sheets(supabase, start_date, end_date, service, df_kpi):
+    """Feuilles de l'export Objectifs ; les enregistrements patients exigent le serveur."""
+    return {
+        "Indicateurs": period_records(supabase, start_date, end_date, service),
+        "KPI_Objectifs": trend_table(df_kpi),
+        "KPI_Periodes": df_kpi,
+    }
@@ -0,0 +1,201 @@
+# offline_queue.py
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from functools import lru_cache
+
+from postgrest import ReturnMethod
+from postgrest.exceptions import APIError
+
+# ------------------------
+# CONFIG
+# ------------------------
+QUEUE_FILE = "offline_queue.sqlite3"
+LEGACY_FILE = "local_records.json"  # ancien format de save_locally()
+TABLE = "indicateurs_cliniques"
+IDEMPOTENCY_COLUMN = "client_uuid"
+FLUSH_CHUNK = 500
+
+# Erreurs propres au contenu d'un enregistrement (PostgREST 4xx) : le renvoyer tel quel échouera toujours.
+# 22 : donnée invalide (type, format) ; 23 : contrainte ; 42703 / 42804 : colonne inconnue / mauvais type ;
+# PGRST1xx : corps de requête invalide ; PGRST204 : colonne absente du cache de schéma
+RECORD_ERROR_CLASSES = ("22", "23")
+RECORD_ERROR_CODES = {"42703", "42804", "PGRST204"}
+
+
+# ------------------------
+# FILE D'ATTENTE DURABLE (SQLite WAL)
+# ------------------------
+class OfflineQueue:
+    """File d'attente locale des enregistrements non envoyés, partagée par toutes les sessions.
+
+    Chaque enregistrement porte une clé d'idempotence (client_uuid) : un renvoi après un crash
+    entre l'insertion serveur et l'acquittement local ne crée pas de doublon.
+    """
+
+    def __init__(self, path=QUEUE_FILE):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS queue ("
+                " key TEXT PRIMARY KEY,"
+                " payload TEXT NOT NULL,"
+                " enqueued_at REAL NOT NULL)"
+            )
+            # Enregistrements refusés par le serveur, conservés avec leur erreur (jamais renvoyés seuls)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS dead_letter ("
+                " key TEXT PRIMARY KEY,"
+                " payload TEXT NOT NULL,"
+                " error TEXT NOT NULL,"
+                " enqueued_at REAL NOT NULL,"
+                " failed_at REAL NOT NULL)"
+            )
+        self._import_legacy()
+
+    @contextmanager
+    def _connect(self):
+        # Une connexion par opération : sûr entre threads, WAL autorise lecteurs et écrivain simultanés
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA synchronous=FULL")  # fsync à chaque commit
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, record):
+        return self.enqueue_many([record])[0]
+
+    def enqueue_many(self, records):
+        keys = []
+        rows = []
+        now = time.time()
+        for record in records:
+            record = dict(record)
+            record.setdefault(IDEMPOTENCY_COLUMN, str(uuid.uuid4()))
+            keys.append(record[IDEMPOTENCY_COLUMN])
+            rows.append((record[IDEMPOTENCY_COLUMN], json.dumps(record), now))
+        with self._connect() as conn:
+            conn.executemany("INSERT OR IGNORE INTO queue (key, payload, enqueued_at) VALUES (?, ?, ?)", rows)
+        return keys
+
+    def peek(self, limit=FLUSH_CHUNK):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT key, payload FROM queue ORDER BY enqueued_at, key LIMIT ?", (limit,)
+            ).fetchall()
+        return [(key, json.loads(payload)) for key, payload in rows]
+
+    def ack(self, keys):
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM queue WHERE key = ?", [(k,) for k in keys])
+
+    def reject(self, key, error):
+        """Déplace un enregistrement refusé par le serveur vers dead_letter, avec son erreur."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO dead_letter (key, payload, error, enqueued_at, failed_at)"
+                " SELECT key, payload, ?, enqueued_at, ? FROM queue WHERE key = ?",
+                (error, time.time(), key),
+            )
+            conn.execute("DELETE FROM queue WHERE key = ?", (key,))
+
+    def requeue_rejected(self):
+        """Remet en file les enregistrements refusés (après correction du schéma serveur) ; renvoie leur nombre."""
+        with self._connect() as conn:
+            moved = conn.execute(
+                "INSERT OR IGNORE INTO queue (key, payload, enqueued_at)"
+                " SELECT key, payload, enqueued_at FROM dead_letter"
+            ).rowcount
+            conn.execute("DELETE FROM dead_letter")
+        return moved
+
+    def rejected(self):
+        """[(key, erreur, échec epoch)] des enregistrements refusés, du plus récent au plus ancien."""
+        with self._connect() as conn:
+            return conn.execute("SELECT key, error, failed_at FROM dead_letter ORDER BY failed_at DESC").fetchall()
+
+    def rejected_count(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM dead_letter").fetchone()[0]
+
+    def depth(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM queue").fetchone()[0]
+
+    def oldest_age(self):
+        """Âge en secondes du plus ancien enregistrement en attente, ou None si la file est vide."""
+        with self._connect() as conn:
+            oldest = conn.execute("SELECT MIN(enqueued_at) FROM queue").fetchone()[0]
+        return None if oldest is None else time.time() - oldest
+
+    def _import_legacy(self):
+        if not os.path.exists(LEGACY_FILE):
+            return
+        try:
+            with open(LEGACY_FILE, "r") as f:
+                records = json.load(f)
+        except json.JSONDecodeError:
+            records = []
+        self.enqueue_many(records)
+        os.replace(LEGACY_FILE, LEGACY_FILE + ".imported")
+
+
+@lru_cache(maxsize=None)
+def get_queue():
+    # Une seule instance par process (l'import de l'ancien fichier JSON n'a lieu qu'une fois)
+    return OfflineQueue()
+
+
+# ------------------------
+# ENVOI PAR LOTS
+# ------------------------
+def flush(client, queue, chunk=FLUSH_CHUNK):
+    """Envoie la file par insertions groupées idempotentes ; renvoie le nombre d'enregistrements acquittés.
+
+    Un lot n'est retiré de la file qu'après succès de son insertion : une erreur réseau laisse
+    le reste de la file intact pour un prochain essai. Un lot refusé pour son contenu est coupé
+    en deux jusqu'à isoler les enregistrements fautifs, déplacés en dead_letter : le reste passe.
+    """
+    sent = 0
+    while True:
+        batch = queue.peek(chunk)
+        if not batch:
+            return sent
+        sent += _send(client, queue, batch)
+
+
+def _send(client, queue, batch):
+    try:
+        (
+            client.table(TABLE)
+            .upsert(
+                [record for _, record in batch],
+                on_conflict=IDEMPOTENCY_COLUMN,
+                ignore_duplicates=True,
+                default_to_null=True,
+                returning=ReturnMethod.minimal,
+            )
+            .execute()
+        )
+    except APIError as e:
+        if not is_record_error(e):
+            raise
+        if len(batch) == 1:
+            queue.reject(batch[0][0], repr(e))
+            return 0
+        middle = len(batch) // 2
+        return _send(client, queue, batch[:middle]) + _send(client, queue, batch[middle:])
+    queue.ack([key for key, _ in batch])
+    return len(batch)
+
+
+def is_record_error(error):
+    """APIError due au contenu des enregistrements (et non au serveur, au réseau ou aux droits)."""
+    code = error.code if isinstance(error.code, str) else ""
+    return code[:2] in RECORD_ERROR_CLASSES or code in RECORD_ERROR_CODES or code.startswith("PGRST1")
@@ -0,0 +1,76 @@
+# patient_index.py
+# Index en mémoire des patients (nom, prénom, âge, sexe) : recherche par sous-chaîne comme la rpc serveur, sans Streamlit.
+import unicodedata
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, chain
+
+import pandas as pd
+
+PATIENT_COLUMNS = ["patient_last_name", "patient_first_name", "patient_age", "patient_sex"]
+SEARCH_LIMIT = 20
+
+
+def normalize(text):
+    """Minuscules, sans accents, espaces simples : "  Benaïssa  ALI " -> "benaissa ali"."""
+    if text is None or text is pd.NA or text != text:
+        return ""
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode()
+    return " ".join(text.lower().split())
+
+
+class PatientIndex:
+    """Patients distincts triés par clé normalisée "nom prénom" et "prénom nom".
+
+    Une clé contenant la recherche correspond, comme pour search_patients côté serveur. Les clés
+    qui commencent par la recherche viennent d'abord (deux bisect), puis les autres, trouvées par
+    str.find sur toutes les clés mises bout à bout : un seul parcours en C, arrêté à limit résultats.
+    """
+
+    def __init__(self, patients):
+        self.patients = patients.reset_index(drop=True)
+        entries = []
+        for row, (last, first) in enumerate(zip(self.patients["patient_last_name"], self.patients["patient_first_name"])):
+            last, first = normalize(last), normalize(first)
+            entries.append((f"{last} {first}".strip(), row))
+            entries.append((f"{first} {last}".strip(), row))
+        entries.sort()
+        self._keys = [key for key, _ in entries]
+        self._rows = [row for _, row in entries]
+        # Clés séparées par "\n" (absent d'une clé normalisée) ; position -> clé par bisect sur les débuts
+        self._text = "\n".join(self._keys)
+        self._starts = list(accumulate((len(key) + 1 for key in self._keys[:-1]), initial=0))
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        term = normalize(query)
+        if not term:
+            return self.patients.iloc[:0]
+        lo = bisect_left(self._keys, term)
+        hi = bisect_left(self._keys, term + "\uffff")
+        rows = {}  # dict : lignes distinctes dans l'ordre de découverte
+        for i in chain(range(lo, hi), self._containing(term)):
+            rows.setdefault(self._rows[i])
+            if len(rows) == limit:
+                break
+        return self.patients.iloc[list(rows)]
+
+    def _containing(self, term):
+        """Indices des clés contenant term, dans l'ordre de tri."""
+        pos = self._text.find(term)
+        while pos != -1:
+            i = bisect_right(self._starts, pos) - 1
+            yield i
+            # Une seule occurrence par clé : reprise à la clé suivante
+            pos = self._text.find(term, self._starts[i] + len(self._keys[i]) + 1)
+
+    def __len__(self):
+        return len(self.patients)
+
+
+def build_patient_index(records):
+    """Un patient = un quadruplet (nom, prénom, âge, sexe) ; nb_records et last_seen par patient."""
+    patients = (
+        records.groupby(PATIENT_COLUMNS, dropna=False, observed=True)
+        .agg(nb_records=("id", "size"), last_seen=("registration_time", "max"))
+        .reset_index()
+    )
+    return PatientIndex(patients)
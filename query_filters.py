@@ -0,0 +1,23 @@
+# query_filters.py
+# Filtres PostgREST partagés par les pages (sans pandas) : période, motif ilike, application à une requête.
+from datetime import datetime, time
+
+
+# Un filtre est un tuple (opérateur PostgREST, colonne, valeur), ex. ("eq", "patient_first_name", "ali")
+def period_filters(start_date, end_date, column="registration_time"):
+    return (
+        ("gte", column, datetime.combine(start_date, time.min).isoformat()),
+        ("lte", column, datetime.combine(end_date, time.max).isoformat()),
+    )
+
+
+def contains_pattern(text):
+    """Motif (i)like "contient text" ; \\, % et _ saisis par l'utilisateur sont cherchés littéralement."""
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def apply_filters(query, filters):
+    for op, column, value in filters:
+        query = getattr(query, op)(column, value)
+    return query
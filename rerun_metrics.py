@@ -0,0 +1,35 @@
+# rerun_metrics.py
+# Compteurs par session : reruns complets, reruns de fragment et appels réseau, pour mesurer le coût d'une saisie.
+import threading
+
+FULL = "full_reruns"
+FRAGMENT = "fragment_reruns"
+NETWORK = "network_calls"
+
+_local = threading.local()
+
+
+def new_counters():
+    return {FULL: 0, FRAGMENT: 0, NETWORK: 0}
+
+
+def bind(counters, kind):
+    """Compte un rerun de type kind et rattache le thread du script aux compteurs de la session.
+
+    Appelé en tête de chaque exécution (script complet ou fragment) : les appels réseau faits
+    ensuite par ce thread sont imputés à la session, ceux du worker de fond ne le sont pas.
+    """
+    counters[kind] += 1
+    _local.counters = counters
+
+
+def count_request(request):
+    # Hook httpx "request" du pool partagé
+    counters = getattr(_local, "counters", None)
+    if counters is not None:
+        counters[NETWORK] += 1
+
+
+def since(counters, mark):
+    """Différence entre les compteurs actuels et un relevé antérieur (copie de counters)."""
+    return {kind: counters[kind] - mark.get(kind, 0) for kind in counters}
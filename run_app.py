@@ -1,15 +1,32 @@
 # run_app.py
 import streamlit as st
-import pandas as pd
-from supabase import create_client, Client
+import sys
 from datetime import datetime
-from io import BytesIO
-import plotly.express as px
-import os
-import json
+import uuid
+from supabase_client import get_client, get_admin_client, get_health_monitor
+from session_cache import session_cached, invalidate
+from offline_queue import get_queue
+from sync_worker import start_sync_worker
+from health import is_connection_error
+from rerun_metrics import bind, since, new_counters, FULL, FRAGMENT, NETWORK
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+# pandas / plotly / clinical_data ne sont importés que par les pages qui en ont besoin (voir startup_timing.py)
 
 st.set_page_config(page_title="Indicateurs de Suivi", layout="wide")
 
+# ------------------------
+# MESURE DES RERUNS (avant tout appel réseau)
+# ------------------------
+metrics = st.session_state.setdefault("_metrics", new_counters())
+bind(metrics, FULL)
+
+
+def count_fragment_run():
+    # Rerun limité à un fragment : le préambule (sonde, profil) n'est pas réexécuté
+    ctx = get_script_run_ctx()
+    if ctx is not None and ctx.fragment_ids_this_run:
+        bind(st.session_state._metrics, FRAGMENT)
+
 # ------------------------
 # CSS pour cacher menu/header/footer
 # ------------------------
@@ -26,38 +43,32 @@ st.markdown(hide_streamlit_style, unsafe_allow_html=True)
 # ------------------------
 # SUPABASE CONFIG
 # ------------------------
-SUPABASE_URL = st.secrets["SUPABASE"]["URL"]
-SUPABASE_KEY = st.secrets["SUPABASE"]["KEY"]
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Client propre à la session, sur le pool HTTP partagé du process
+supabase = get_client()
+
+# État de connexion partagé par le process (sonde courte, cache, disjoncteur)
+health = get_health_monitor()
 
-SUPABASE_SERVICE_KEY = st.secrets["SUPABASE"]["SERVICE_ROLE_KEY"]
-supabase_admin: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
-SUPABASE_ONLINE = True
-LOCAL_FILE = "local_records.json"
+# Worker de fond (un par process) qui vide la file hors ligne
+sync_worker = start_sync_worker(get_admin_client(), health)
+
+# Durées de vie des caches de session (secondes)
+PROFILE_TTL = 60
+USERS_TTL = 60
+CHARTS_TTL = 5 * 60
 
 # ------------------------
-# Fonction pour sauvegarder localement
+# Fonction pour sauvegarder localement (file d'attente durable, voir offline_queue.py)
 # ------------------------
 def save_locally(record):
-    local_data = []
-    if os.path.exists(LOCAL_FILE):
-        with open(LOCAL_FILE, "r") as f:
-            try:
-                local_data = json.load(f)
-            except json.JSONDecodeError:
-                local_data = []
-    local_data.append(record)
-    with open(LOCAL_FILE, "w") as f:
-        json.dump(local_data, f, indent=4)
+    get_queue().enqueue(record)
     st.info("💾 Données enregistrées localement")
 
 # ------------------------
 # CHECK CONNECTION
 # ------------------------
-try:
-    supabase.auth.get_user()
-except Exception:
-    SUPABASE_ONLINE = False
+SUPABASE_ONLINE = health.is_online()
+if not SUPABASE_ONLINE:
     st.warning("⚠️ Mode hors ligne — certaines fonctionnalités sont désactivées")
 
 # ------------------------
@@ -71,21 +82,20 @@ if "user" not in st.session_state:
         try:
             res = supabase.auth.sign_in_with_password({"email": email, "password": password})
             st.session_state.user = res.user
-            st.session_state.session = res.session  
             st.rerun()
         except Exception:
             st.error("❌ Email ou mot de passe incorrect")
     st.stop()
 
+# La session d'auth vit dans le client de la session : plus de set_session partagé
 user = st.session_state.user
-if "session" in st.session_state:
-    supabase.auth.set_session(
-        st.session_state.session.access_token,
-        st.session_state.session.refresh_token
-    )
 try:
-    res = supabase.table("users").select("*").eq("auth_user_id", user.id).single().execute()
-    profile = res.data
+    profile = session_cached(
+        "_profile",
+        PROFILE_TTL,
+        lambda: supabase.table("users").select("*").eq("auth_user_id", user.id).single().execute().data,
+        scope=f"profile:{user.id}",
+    )
     if not profile:
         st.error(
             "❌ Aucun profil trouvé pour cet utilisateur.\n"
@@ -111,6 +121,7 @@ try:
 
                     # Mettre à jour le flag temporaire
                     supabase.table("users").update({"is_temp_pass": False}).eq("auth_user_id", user.id).execute()
+                    invalidate("_profile")
 
                     st.success("✅ Mot de passe changé avec succès ! Vous pouvez maintenant accéder à l'application.")
                     st.rerun()
@@ -136,6 +147,31 @@ name = profile["name"]
 role = profile["role"]
 
 st.sidebar.success(f"{name} ({role})")
+if role in ["admin", "super_admin"]:
+    sync_status = sync_worker.status()
+    if sync_status["depth"] or sync_status["rejected"] or sync_status["last_error"]:
+        expanded = bool(sync_status["last_error"] or sync_status["rejected"])
+        with st.sidebar.expander("📤 Synchronisation hors ligne", expanded=expanded):
+            st.write(f"En attente : {sync_status['depth']}")
+            if sync_status["oldest_age"] is not None:
+                st.write(f"Plus ancien : {sync_status['oldest_age'] / 60:.0f} min")
+            if sync_status["last_error"]:
+                st.caption(f"Dernière erreur ({sync_status['failures']} échecs) : {sync_status['last_error']}")
+            if sync_status["rejected"]:
+                # Refusés par le serveur (contrainte, type…) : écartés pour que le reste de la file passe
+                st.error(f"Refusés par le serveur : {sync_status['rejected']}")
+                for key, error, _ in get_queue().rejected()[:5]:
+                    st.caption(f"{key} — {error}")
+                if st.button("🔁 Renvoyer les refusés"):
+                    get_queue().requeue_rejected()
+                    sync_worker.notify()
+                    st.rerun()
+    record_cost = st.session_state.get("_record_cost")
+    if record_cost:
+        st.sidebar.caption(
+            f"Dernière saisie : {record_cost[FULL]} rerun(s) complet(s), "
+            f"{record_cost[FRAGMENT]} rerun(s) de section, {record_cost[NETWORK]} appel(s) réseau"
+        )
 if st.sidebar.button("Logout"):
     supabase.auth.sign_out()
     st.session_state.clear()
@@ -149,7 +185,7 @@ if "page" not in st.session_state:
 
 page_options = ["Dashboard"]
 if role in ["admin", "super_admin"]:
-    page_options += ["User Management", "Statistics", "Objectifs"]
+    page_options += ["User Management", "Statistics", "Objectifs", "HDJ Analytics"]
 
 st.session_state.page = st.sidebar.selectbox(
     "Menu",
@@ -165,13 +201,25 @@ if page == "Objectifs":
     from objectifs import run_objectifs
     run_objectifs()
 
+# ------------------------
+# HDJ ANALYTICS PAGE
+# ------------------------
+if page == "HDJ Analytics":
+    from hdj_analytics import run_hdj_analytics
+    run_hdj_analytics()
+
 # ------------------------
 # USER MANAGEMENT
 # ------------------------
 if page == "User Management":
+    import pandas as pd
+    from activity_logs import fetch_logs_page, log_filters, LOGS_PAGE_SIZE
+
     st.subheader("👥 Gestion des utilisateurs")
     if SUPABASE_ONLINE:
-        users_db = supabase.table("users").select("*").execute().data
+        users_db = session_cached(
+            "_users", USERS_TTL, lambda: supabase.table("users").select("*").execute().data, scope="users"
+        )
     else:
         users_db = []
         st.warning("⚠️ Supabase indisponible (mode dégradé)")
@@ -211,10 +259,12 @@ if page == "User Management":
                         "name": new_name,
                         "role": new_role
                     }).eq("username", new_username).execute()
+                    invalidate(scope="users")
+                    invalidate(scope=f"profile:{exists['auth_user_id']}")
                     st.success(f"Utilisateur {new_username} réactivé !")
             else:
                 try:
-                    auth_user = supabase_admin.auth.admin.create_user({
+                    auth_user = get_admin_client().auth.admin.create_user({
                                 "email": new_email,
                                 "password": "Tmp1234",
                                 "email_confirm": True
@@ -228,6 +278,7 @@ if page == "User Management":
                         "active": True,
                         "is_temp_pass": True
                     }).execute()
+                    invalidate(scope="users")
                     supabase.auth.reset_password_for_email(new_email,{"redirect_to": "https://chusmiapp-tu7anov8scbpmqjq4wyqrh.streamlit.app"}) 
                     st.success(f"Utilisateur {new_username} créé et un email avec mot de passe temporaire a été envoyé")
                 except Exception as e:
@@ -248,6 +299,10 @@ if page == "User Management":
                     st.error("❌ Impossible de désactiver un administrateur")
                 else:
                     supabase.table("users").update({"active": False}).eq("username", del_username).execute()
+                    invalidate(scope="users")
+                    # Le compte désactivé perd l'accès dès son prochain rerun
+                    deactivated = next(u for u in users_db if u["username"] == del_username)
+                    invalidate(scope=f"profile:{deactivated['auth_user_id']}")
                     st.success(f"Utilisateur {del_username} désactivé")
 
     # Reset password email
@@ -257,11 +312,37 @@ if page == "User Management":
         supabase.auth.reset_password_for_email(reset_email,{"redirect_to": "https://chusmiapp-tu7anov8scbpmqjq4wyqrh.streamlit.app"})
         st.success("📧 Email de réinitialisation envoyé")
 
-    # Journaux d'activité
+    # Journaux d'activité (pagination par clé, filtres côté serveur)
     st.markdown("### 📝 Journaux d'activité")
     if SUPABASE_ONLINE:
-        logs = supabase.table("activity_logs").select("*").order("timestamp", desc=True).execute()
-        df_logs = pd.DataFrame(logs.data)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            log_username = st.text_input("Utilisateur", key="log_username")
+        with col2:
+            log_action = st.text_input("Action contient", key="log_action")
+        with col3:
+            log_period = st.date_input("Période", [], key="log_period")
+        filters = log_filters(log_username, log_action, *(log_period if len(log_period) == 2 else (None, None)))
+
+        # Pile des curseurs : réinitialisée quand les filtres changent
+        if st.session_state.get("logs_filters") != filters:
+            st.session_state.logs_filters = filters
+            st.session_state.logs_cursors = [None]
+        cursors = st.session_state.logs_cursors
+
+        df_logs, next_cursor = fetch_logs_page(supabase, filters, cursors[-1])
+
+        col1, col2, col3 = st.columns([1, 1, 4])
+        with col1:
+            if st.button("◀ Précédent", disabled=len(cursors) == 1):
+                cursors.pop()
+                st.rerun()
+        with col2:
+            if st.button("Suivant ▶", disabled=next_cursor is None):
+                cursors.append(next_cursor)
+                st.rerun()
+        with col3:
+            st.caption(f"Page {len(cursors)} — {LOGS_PAGE_SIZE} entrées par page")
     else:
         df_logs = pd.DataFrame()
         st.info("📝 Journaux indisponibles hors ligne")
@@ -274,519 +355,603 @@ if page == "User Management":
 # STATISTICS PAGE
 # ------------------------
 if page == "Statistics":
-    st.subheader("📊 Statistiques Cliniques")
-    if not SUPABASE_ONLINE:
-        st.warning("📊 Statistiques indisponibles hors ligne")
-        st.stop()
+    import plotly.express as px
+    from clinical_data import (
+        fetch_records_page, patient_filters, patient_label, search_patients, snapshot_age,
+        RAW_PAGE_SIZE, RECORD_COLUMNS, SNAPSHOT_COLUMNS, STATISTICS_COLUMNS,
+    )
+    from query_filters import period_filters
+    import analytics_engine
 
-    records = supabase.table("indicateurs_cliniques").select("*").execute()
-    df = pd.DataFrame(records.data)
+    st.subheader("📊 Statistiques Cliniques")
 
-    if df.empty:
+    # Lecture dans la copie locale (instantané Parquet) ; hors ligne, sans synchronisation
+    client = supabase if SUPABASE_ONLINE else None
+    date_min, date_max = analytics_engine.date_bounds(client)
+    synced_at = snapshot_age(client)
+    if synced_at is not None:
+        st.warning(f"🕒 Données non synchronisées — instantané local du {synced_at:%d/%m/%Y %H:%M}")
+    if date_min is None:
         st.info("Aucune donnée clinique disponible pour le moment.")
         st.stop()
 
-    df["registration_time"] = pd.to_datetime(df["registration_time"])
-
     # Filters
     st.markdown("### Filtrer les données")
     col1, col2, col3 = st.columns(3)
     with col1:
-        date_min = df["registration_time"].min().date()
-        date_max = df["registration_time"].max().date()
-        date_range = st.date_input("Période", [date_min, date_max])
-        start_date, end_date = date_range
+        date_range = st.date_input("Période", [date_min.date(), date_max.date()])
         if len(date_range) != 2:
             st.warning("Veuillez sélectionner une période complète")
             st.stop()
     with col2:
-        patients = ["Tous"] + df["patient_first_name"].dropna().unique().tolist()
-        selected_patient = st.selectbox("Patient", patients)
+        # Recherche indexée (nom, prénom, âge, sexe) : seuls les meilleurs résultats sont transférés
+        patient_query = st.text_input("Patient", placeholder="Nom ou prénom (2 lettres min.)", key="patient_query")
+        selected_patient = None
+        if len(patient_query.strip()) >= 2:
+            matches = search_patients(client, patient_query)
+            if matches.empty:
+                st.caption("Aucun patient trouvé")
+            else:
+                by_label = {patient_label(p): p for _, p in matches.iterrows()}
+                picked = st.selectbox("Résultats", ["Tous", *by_label], key="patient_pick")
+                selected_patient = by_label.get(picked)
     with col3:
         metrics_options = ["Tous", "Incidents", "Erreurs", "Réadmissions"]
         selected_metric = st.selectbox("Métrique", metrics_options)
 
+    # Filtres traduits en clause WHERE et exécutés par DuckDB sur la copie locale (analytics_engine.py)
     start_date, end_date = date_range
-    mask = (df["registration_time"].dt.date >= start_date) & (df["registration_time"].dt.date <= end_date)
-    if selected_patient != "Tous":
-        mask &= df["patient_first_name"] == selected_patient
-    df_filtered = df[mask]
+    filters = period_filters(start_date, end_date)
+    if selected_patient is not None:
+        filters += patient_filters(selected_patient)
+    summary = analytics_engine.overview(client, filters)
 
-    if df_filtered.empty:
+    if summary["patients"] == 0:
         st.warning("Aucune donnée pour ce filtre.")
         st.stop()
 
     # Metrics overview
     st.markdown("### ✅ Vue d'ensemble")
     col1, col2, col3, col4 = st.columns(4)
-    with col1: st.metric("Nombre de patients", len(df_filtered))
-    with col2: st.metric("Incidents signalés", df_filtered["incident"].sum())
-    with col3: st.metric("Erreurs médicales", df_filtered["erreur_medicale"].sum())
-    with col4: st.metric("Réadmissions", df_filtered["readmission"].sum())
+    with col1: st.metric("Nombre de patients", summary["patients"])
+    with col2: st.metric("Incidents signalés", summary["incidents"])
+    with col3: st.metric("Erreurs médicales", summary["erreurs"])
+    with col4: st.metric("Réadmissions", summary["readmissions"])
 
     st.divider()
 
+    # Graphiques : comptes agrégés par requête DuckDB, figures mises en cache par filtre
+    # (la clé inclut le volume et le dernier id : un nouvel enregistrement invalide les figures)
+    @st.cache_data(ttl=CHARTS_TTL, max_entries=32, show_spinner=False)
+    def statistics_figures(filter_key, _client):
+        data = analytics_engine.chart_data(_client, filter_key[0])
+        figures = {
+            "evolution": px.pie(data["evolution"], names="Évolution", values="Nombre", title="Répartition par évolution des patients"),
+            "incidents": px.bar(
+                data["incidents"],
+                x="incident",
+                y="Nombre",
+                color="erreur_medicale",
+                labels={"incident": "Incident", "erreur_medicale": "Erreur médicale"},
+                title="Nombre d'incidents par erreurs médicales"
+            ),
+            "sejour": px.bar(data["sejour"], x="Durée (jours)", y="Nombre", title="Distribution des durées de séjour (jours)"),
+            "satisfaction": px.bar(data["satisfaction"], x="Satisfaction", y="Nombre", title="Distribution de la satisfaction patient"),
+        }
+        for name in ("sejour", "satisfaction"):
+            figures[name].update_layout(bargap=0.05)
+        return figures
+
+    figures = statistics_figures((filters, summary["patients"], summary["last_id"]), client)
+
     # Pie chart: evolution
     st.markdown("### Évolution des patients")
-    evolution_counts = df_filtered["evolution_patient"].value_counts().reset_index()
-    evolution_counts.columns = ["Évolution", "Nombre"]
-    fig_evolution = px.pie(evolution_counts, names="Évolution", values="Nombre", title="Répartition par évolution des patients")
-    st.plotly_chart(fig_evolution, use_container_width=True)
+    st.plotly_chart(figures["evolution"], use_container_width=True)
 
     # Bar chart: incidents vs errors
     st.markdown("### Incidents vs Erreurs médicales")
-    incidents_df = df_filtered.groupby(["incident", "erreur_medicale"]).size().reset_index(name="Nombre")
-    fig_incidents = px.bar(
-        incidents_df,
-        x="incident",
-        y="Nombre",
-        color="erreur_medicale",
-        labels={"incident": "Incident", "erreur_medicale": "Erreur médicale"},
-        title="Nombre d'incidents par erreurs médicales"
-    )
-    st.plotly_chart(fig_incidents, use_container_width=True)
+    st.plotly_chart(figures["incidents"], use_container_width=True)
 
     # Histogram: duration of stay
     st.markdown("### Durée de séjour")
-    fig_sejour = px.histogram(df_filtered, x="duree_sejour", nbins=20, title="Distribution des durées de séjour (jours)", labels={"duree_sejour": "Durée (jours)"})
-    st.plotly_chart(fig_sejour, use_container_width=True)
+    st.plotly_chart(figures["sejour"], use_container_width=True)
 
     # Histogram: satisfaction patient
     st.markdown("### Satisfaction des patients")
-    fig_satisfaction = px.histogram(df_filtered, x="satisfaction_patient", nbins=5, title="Distribution de la satisfaction patient", labels={"satisfaction_patient": "Satisfaction"})
-    st.plotly_chart(fig_satisfaction, use_container_width=True)
+    st.plotly_chart(figures["satisfaction"], use_container_width=True)
 
-    # Raw data
+    # Raw data : une page à la fois, triée et filtrée côté serveur (hors ligne : par DuckDB sur la copie locale)
     st.markdown("### Données brutes")
-    st.dataframe(df_filtered, use_container_width=True)# ------------------------
+    available_columns = RECORD_COLUMNS if client is not None else SNAPSHOT_COLUMNS
+    col1, col2, col3 = st.columns([4, 2, 1])
+    with col1:
+        raw_columns = st.multiselect("Colonnes", available_columns, default=STATISTICS_COLUMNS, key="raw_columns")
+    with col2:
+        sort_by = st.selectbox("Trier par", available_columns, index=available_columns.index("registration_time"), key="raw_sort")
+    with col3:
+        descending = st.toggle("Décroissant", value=True, key="raw_desc")
+    raw_columns = raw_columns or STATISTICS_COLUMNS
+
+    # Nouveau filtre ou nouveau tri : retour à la première page
+    raw_key = (filters, sort_by, descending)
+    if st.session_state.get("raw_key") != raw_key:
+        st.session_state.raw_key = raw_key
+        st.session_state.raw_page = 0
+    raw_page = st.session_state.raw_page
+
+    if client is not None:
+        df_raw, total = fetch_records_page(client, raw_columns, filters, sort_by, descending, raw_page)
+    else:
+        df_raw, total = analytics_engine.records_page(None, raw_columns, filters, sort_by, descending, raw_page)
+    last_page = max(0, (total - 1) // RAW_PAGE_SIZE)
+
+    col1, col2, col3 = st.columns([1, 1, 4])
+    with col1:
+        if st.button("◀ Précédent", disabled=raw_page == 0):
+            st.session_state.raw_page -= 1
+            st.rerun()
+    with col2:
+        if st.button("Suivant ▶", disabled=raw_page >= last_page):
+            st.session_state.raw_page += 1
+            st.rerun()
+    with col3:
+        st.caption(f"Page {raw_page + 1} / {last_page + 1} — {total} enregistrements, {RAW_PAGE_SIZE} par page")
+    st.dataframe(df_raw, use_container_width=True, hide_index=True)# ------------------------
 # DASHBOARD
 # ------------------------
 if page == "Dashboard":
     st.subheader("📊 Indicateurs de Suivi Clinique")
 
+    # Chaque section est un fragment : une interaction ne réexécute que sa section, jamais le
+    # préambule (sonde de connexion, profil). Seules les sous-questions conditionnelles réagissent
+    # en direct ; les cases sans dépendance sont regroupées dans le formulaire final.
+    # Toutes les valeurs sont relues dans st.session_state au moment de l'enregistrement.
+    st.session_state.setdefault("_record_mark", dict(metrics))
+
+    TYPES_ECHEC = [
+        ("echec_clinique", "Échec clinique", "Clinique"),
+        ("echec_biologique", "Échec biologique", "Biologique"),
+        ("echec_radiologique", "Échec radiologique", "Radiologique"),
+        ("echec_therapeutique", "Échec thérapeutique (changement ou intensification du traitement)", "Thérapeutique"),
+        ("echec_composite", "Échec composite (≥ 2 critères)", "Composite"),
+    ]
+    CAUSES_ECHEC = [
+        ("cause_echec_diagnostic", "Mauvais diagnostic initial", "Mauvais diagnostic initial"),
+        ("cause_echec_retard", "Retard thérapeutique", "Retard thérapeutique"),
+        ("cause_echec_resistance", "Résistance / inefficacité pharmacologique", "Résistance / inefficacité pharmacologique"),
+        ("cause_echec_comorbidite", "Comorbidité intercurrente", "Comorbidité intercurrente"),
+        ("cause_echec_observance", "Non-observance", "Non-observance"),
+        ("cause_echec_effet", "Effet indésirable limitant", "Effet indésirable limitant"),
+    ]
+    TYPES_RECHUTE = [
+        ("rechute_clinique", "Rechute clinique", "Clinique"),
+        ("rechute_biologique", "Rechute biologique", "Biologique"),
+        ("rechute_radiologique", "Rechute radiologique", "Radiologique"),
+        ("rechute_therapeutique", "Rechute thérapeutique (réintroduction / escalade)", "Thérapeutique"),
+        ("rechute_composite", "Rechute composite (≥ 2 critères)", "Composite"),
+    ]
+    DELAIS_RECHUTE = [
+        ("delai_3", "< 3 mois", "<3 mois"),
+        ("delai_3_6", "3–6 mois", "3–6 mois"),
+        ("delai_6_12", "6–12 mois", "6–12 mois"),
+        ("delai_12", "> 12 mois", ">12 mois"),
+    ]
+    CAUSES_RECHUTE = [
+        ("cause_rechute_observance", "Non-observance secondaire", "Non-observance secondaire"),
+        ("cause_rechute_sevrage", "Sevrage ou dégression trop rapide", "Sevrage ou dégression trop rapide"),
+        ("cause_rechute_maladie", "Maladie active sous-jacente", "Maladie active sous-jacente"),
+        ("cause_rechute_fond", "Traitement de fond insuffisant", "Traitement de fond insuffisant"),
+        ("cause_rechute_declenchant", "Facteur déclenchant intercurrent (infection, stress…)", "Facteur déclenchant intercurrent"),
+    ]
+    OBSERVANCE = [
+        ("**Compréhension du traitement**", [
+            ("obs_comp_80", "Le patient peut citer au moins 80 % de son traitement"),
+            ("obs_indication", "Il comprend l’indication et la durée"),
+            ("obs_effets", "Il connaît les principaux effets indésirables"),
+        ]),
+        ("---\n**Acceptation / adhésion**", [
+            ("obs_accord", "Le patient est d’accord avec le traitement"),
+            ("obs_refus", "Pas de refus exprimé"),
+            ("obs_crainte", "Pas de crainte majeure non levée"),
+        ]),
+        ("---\n**Faisabilité**", [
+            ("obs_dispo", "Traitement disponible / accessible"),
+            ("obs_cout", "Coût compatible"),
+            ("obs_schema", "Schéma thérapeutique compréhensible"),
+            ("obs_barriere", "Pas de barrière cognitive majeure"),
+        ]),
+    ]
+
+    def checkboxes(options):
+        for key, label, _ in options:
+            st.checkbox(label, key=key)
+
+    # Unité affichée au dernier rerun complet : passer à/depuis HDJ change toute la page
+    rendered_unite = st.session_state.get("unite", "Hospitalisation")
+
     # ------------------------
     # INFORMATIONS PATIENT
     # ------------------------
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        patient_first_name = st.text_input("Prénom du patient", key="first_name")
-    with col2:
-        patient_last_name = st.text_input("Nom du patient", key="last_name")
-    with col3:
-        patient_age = st.number_input("Âge", min_value=0, max_value=120, step=1, key="age")
+    @st.fragment
+    def section_patient(rendered_unite):
+        count_fragment_run()
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.text_input("Prénom du patient", key="first_name")
+        with col2:
+            st.text_input("Nom du patient", key="last_name")
+        with col3:
+            st.number_input("Âge", min_value=0, max_value=120, step=1, key="age")
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.radio(
+                "Sexe",
+                ["Masculin", "Féminin"],
+                horizontal=True,
+                key="sex"
+            )
+
+        with col2:
+            patient_unite = st.selectbox(
+                "Unité",
+                ["Hospitalisation", "HDJ"],
+                key="unite"
+            )
+
+        with col3:
+            st.date_input(
+                "Date d’hospitalisation",
+                value=datetime.now().date(),
+                key="date_hosp"
+            )
+
+        if patient_unite != rendered_unite:
+            st.rerun()
+        if patient_unite == "HDJ":
+            return
 
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        patient_sex = st.radio(
-            "Sexe",
-            ["Masculin", "Féminin"],
-            horizontal=True,
-            key="sex"
-        )
+        st.text_area("Motif d’admission / Consultation", key="motif")
+        st.text_area("Diagnostic principal", key="diagnostic")
 
-    with col2:
-        patient_unite = st.selectbox(
-            "Unité",
-            ["Hospitalisation", "HDJ"],
-            key="unite"
-        )
+        st.caption(f"Date de saisie : {datetime.now().strftime('%d/%m/%Y %H:%M')}")
+        st.divider()
 
-    with col3:
-        date_hospitalisation = st.date_input(
-            "Date d’hospitalisation",
-            value=datetime.now().date(),
-            key="date_hosp"
-        )
+    section_patient(rendered_unite)
 
-    if patient_unite == "HDJ":
+    if rendered_unite == "HDJ":
         from HDJ import run_HDJ
-        run_HDJ()
-        st.stop()
 
-    patient_motif = st.text_area("Motif d’admission / Consultation", key="motif")
-    patient_diagnosis = st.text_area("Diagnostic principal", key="diagnostic")
+        @st.fragment
+        def section_hdj():
+            count_fragment_run()
+            run_HDJ()
 
-    st.caption(f"Date de saisie : {datetime.now().strftime('%d/%m/%Y %H:%M')}")
-    st.divider()
+        section_hdj()
+        st.stop()
 
     # ------------------------
     # QUALITÉ ET SÉCURITÉ DES SOINS
     # ------------------------
-    st.subheader("🛡️ Qualité et sécurité des soins")
-
-    incident = st.radio("Incident", ["Non", "Oui"], horizontal=True, key="incident")
-    nb_incidents = None
-    incident_description = ""
-    if incident == "Oui":
-        nb_incidents = st.number_input("Nombre d’incidents", min_value=1, step=1, key="nb_incidents")
-        incident_description = st.text_area("Décrire l'incident", key="incident_desc")
-
-    erreur_medicale = st.radio("Erreur médicale", ["Non", "Oui"], horizontal=True, key="erreur_medicale")
-    nb_erreurs = None
-    erreur_description = ""
-    if erreur_medicale == "Oui":
-        st.warning(
-        "Une erreur médicale est l’échec d’une action planifiée à être menée comme prévu "
-        "(erreur d’exécution), ou l’utilisation d’un mauvais plan pour atteindre un objectif "
-        "(erreur de planification), pouvant entraîner ou non un préjudice pour le patient."
-        )
-        nb_erreurs = st.number_input("Nombre d’erreurs médicales", min_value=1, step=1, key="nb_erreurs")
-        erreur_description = st.text_area("Décrire l’erreur médicale", key="erreur_desc")
+    @st.fragment
+    def section_qualite():
+        count_fragment_run()
+        st.subheader("🛡️ Qualité et sécurité des soins")
+
+        incident = st.radio("Incident", ["Non", "Oui"], horizontal=True, key="incident")
+        if incident == "Oui":
+            st.number_input("Nombre d’incidents", min_value=1, step=1, key="nb_incidents")
+            st.text_area("Décrire l'incident", key="incident_desc")
+
+        erreur_medicale = st.radio("Erreur médicale", ["Non", "Oui"], horizontal=True, key="erreur_medicale")
+        if erreur_medicale == "Oui":
+            st.warning(
+            "Une erreur médicale est l’échec d’une action planifiée à être menée comme prévu "
+            "(erreur d’exécution), ou l’utilisation d’un mauvais plan pour atteindre un objectif "
+            "(erreur de planification), pouvant entraîner ou non un préjudice pour le patient."
+            )
+            st.number_input("Nombre d’erreurs médicales", min_value=1, step=1, key="nb_erreurs")
+            st.text_area("Décrire l’erreur médicale", key="erreur_desc")
 
-    # ------------------------
-    # Nouveaux indicateurs
-    # ------------------------
-    readmission = st.radio("Réadmission", ["Non", "Oui"], horizontal=True, key="readmission")
-    readmission_type = None
-    if readmission == "Oui":
-        readmission_type = st.radio("Cause de la réadmission", ["PEC incomplète", "Complication"], key="readmission_type")
-
-    infection_soins = st.radio("Infections liées aux soins", ["Non", "Oui"], horizontal=True, key="infection")
-    infection_description = ""
-    if infection_soins == "Oui":
-        infection_description = st.text_area("Préciser l’infection liée aux soins", key="infection_desc")
-
-    effets_graves = st.radio("Effets indésirables graves", ["Non", "Oui"], horizontal=True, key="effets")
-    effets_graves_description = ""
-    if effets_graves == "Oui":
-        st.warning(
-        "Un effet indésirable grave est un effet indésirable qui, quelle que soit la dose administrée, "
-        "entraîne la mort, met la vie en danger, nécessite une hospitalisation ou la prolonge, "
-        "provoque une incapacité ou un handicap significatif ou durable, "
-        "ou entraîne une anomalie congénitale ou une malformation."
-        )
-        effets_graves_description = st.text_area("Décrire les effets indésirables graves", key="effets_desc")
+        # ------------------------
+        # Nouveaux indicateurs
+        # ------------------------
+        readmission = st.radio("Réadmission", ["Non", "Oui"], horizontal=True, key="readmission")
+        if readmission == "Oui":
+            st.radio("Cause de la réadmission", ["PEC incomplète", "Complication"], key="readmission_type")
 
-    st.divider()
+        infection_soins = st.radio("Infections liées aux soins", ["Non", "Oui"], horizontal=True, key="infection")
+        if infection_soins == "Oui":
+            st.text_area("Préciser l’infection liée aux soins", key="infection_desc")
+
+        effets_graves = st.radio("Effets indésirables graves", ["Non", "Oui"], horizontal=True, key="effets")
+        if effets_graves == "Oui":
+            st.warning(
+            "Un effet indésirable grave est un effet indésirable qui, quelle que soit la dose administrée, "
+            "entraîne la mort, met la vie en danger, nécessite une hospitalisation ou la prolonge, "
+            "provoque une incapacité ou un handicap significatif ou durable, "
+            "ou entraîne une anomalie congénitale ou une malformation."
+            )
+            st.text_area("Décrire les effets indésirables graves", key="effets_desc")
+
+        st.divider()
+
+    section_qualite()
 
     # ------------------------
     # PERFORMANCE CLINIQUE
     # ------------------------
-    st.subheader("💊 Performance clinique")
+    @st.fragment
+    def section_performance():
+        count_fragment_run()
+        st.subheader("💊 Performance clinique")
 
-    delai_admission = st.number_input("Délai d’admission / prise en charge (jours)", min_value=0, step=1, key="delai_adm")
-    duree_sejour = st.number_input("Durée du séjour (jours)", min_value=0, step=1, key="duree_sej")
+        st.number_input("Délai d’admission / prise en charge (jours)", min_value=0, step=1, key="delai_adm")
+        duree_sejour = st.number_input("Durée du séjour (jours)", min_value=0, step=1, key="duree_sej")
 
-    cause_long_sejour = ""
-    if duree_sejour > 10:
-        cause_long_sejour = st.text_area("Cause du séjour > 10 jours", key="cause_long_sej")
+        if duree_sejour > 10:
+            st.text_area("Cause du séjour > 10 jours", key="cause_long_sej")
 
-    diagnostic_etabli = st.radio("Patient sorti avec diagnostic établi ?", ["Oui", "Non"], horizontal=True, key="diag_etabli")
-    dossier_complet = st.radio("Dossier complet avec diagnostic ?", ["Oui", "Non"], horizontal=True, key="dossier")
+        st.radio("Patient sorti avec diagnostic établi ?", ["Oui", "Non"], horizontal=True, key="diag_etabli")
+        dossier_complet = st.radio("Dossier complet avec diagnostic ?", ["Oui", "Non"], horizontal=True, key="dossier")
 
-    cause_dossier_incomplet = ""
-    if dossier_complet == "Non":
-        cause_dossier_incomplet = st.text_area("Si Non, indiquer les éléments manquants", key="dossier_cause")
+        if dossier_complet == "Non":
+            st.text_area("Si Non, indiquer les éléments manquants", key="dossier_cause")
 
-    evolution_patient = st.selectbox(
-        "Évolution du patient",
-        ["Rémission", "Échec de traitement", "Rechute", "Mortalité"],
-        key="evolution"
-    )
+        evolution_patient = st.selectbox(
+            "Évolution du patient",
+            ["Rémission", "Échec de traitement", "Rechute", "Mortalité"],
+            key="evolution"
+        )
 
-    remission_type = echec_traitement = cause_echec = rechute = cause_rechute = mortalite_cause = ""
-    types_echec = []
-    causes_echec = []
+        # ------------------------
+        # RÉMISSION
+        # ------------------------
+        if evolution_patient == "Rémission":
+            st.selectbox("Type de rémission", ["Complète", "Partielle"], key="rem_type")
 
-    # ------------------------
-    # RÉMISSION
-    # ------------------------
-    remission_type = ""
-    echec_traitement = ""
-    cause_echec = ""
-    rechute = ""
-    cause_rechute = ""
-    mortalite_cause = ""
-    types_echec = []
-    causes_echec = []
-    types_rechute = []
-    delai_survenue = []
-    cause_principale_rechute = []
-    autres_rechute = ""
-
-    if evolution_patient == "Rémission":
-        remission_type = st.selectbox("Type de rémission", ["Complète", "Partielle"], key="rem_type")
+        # ------------------------
+        # ÉCHEC DE TRAITEMENT
+        # ------------------------
+        elif evolution_patient == "Échec de traitement":
+            st.warning(
+                "Échec thérapeutique : absence d’amélioration clinique et/ou biologique attendue, "
+                "ou aggravation de la pathologie, après un traitement conforme aux recommandations, "
+                "administré à dose adéquate, sur une durée suffisante, avec une observance jugée correcte.\n\n"
+                "Attention : Un échec doit toujours faire analyser :\n"
+                "• Observance insuffisante\n"
+                "• Posologie inadaptée\n"
+                "• Résistance au traitement\n"
+                "• Mauvais diagnostic initial\n"
+                "• Comorbidités ou interactions médicamenteuses"
+            )
+
+            echec_traitement = st.radio("Échec confirmé ?", ["Oui", "Non"], horizontal=True, key="echec")
+
+            if echec_traitement == "Oui":
+                st.markdown("**Types d’échec retenus**")
+                checkboxes(TYPES_ECHEC)
+
+                st.markdown("**Causes de l’échec**")
+                checkboxes(CAUSES_ECHEC)
 
-    # ------------------------
-    # ÉCHEC DE TRAITEMENT
-    # ------------------------
-    elif evolution_patient == "Échec de traitement":
-        st.warning(
-            "Échec thérapeutique : absence d’amélioration clinique et/ou biologique attendue, "
-            "ou aggravation de la pathologie, après un traitement conforme aux recommandations, "
-            "administré à dose adéquate, sur une durée suffisante, avec une observance jugée correcte.\n\n"
-            "Attention : Un échec doit toujours faire analyser :\n"
-            "• Observance insuffisante\n"
-            "• Posologie inadaptée\n"
-            "• Résistance au traitement\n"
-            "• Mauvais diagnostic initial\n"
-            "• Comorbidités ou interactions médicamenteuses"
-        )
+        # ------------------------
+        # RECHUTE
+        # ------------------------
+        elif evolution_patient == "Rechute":
+            st.warning(
+                "Rechute :\n"
+                "Définition : réapparition de signes cliniques, biologiques et/ou radiologiques de la maladie après une réponse initiale complète ou partielle documentée, nécessitant une réintroduction, une intensification ou une modification du traitement.\n"
+                "Attention : La rechute se distingue de l’échec thérapeutique par l’existence obligatoire d’une phase d’amélioration préalable.\n"
+                "Conditions préalables (OBLIGATOIRES)\n"
+                "✔ Réponse thérapeutique initiale documentée\n"
+                "✔ Stabilisation clinique et/ou biologique\n"
+                "✔ Traitement de fond instauré ou suivi organisé"
+            )
+
+            rechute = st.radio("Rechute ?", ["Oui", "Non"], horizontal=True, key="rechute")
+
+            if rechute == "Oui":
+                st.markdown("**Types de rechute retenus**")
+                checkboxes(TYPES_RECHUTE)
+
+                st.markdown("**Délai de survenue**")
+                checkboxes(DELAIS_RECHUTE)
+
+                st.markdown("**Cause principale**")
+                checkboxes(CAUSES_RECHUTE)
+                st.text_area("Autres causes", key="autres_rechute")
+
+        # ------------------------
+        # MORTALITÉ
+        # ------------------------
+        elif evolution_patient == "Mortalité":
+            st.text_area("Préciser la cause du décès", key="mort_cause")
+
+        st.divider()
 
-        echec_traitement = st.radio("Échec confirmé ?", ["Oui", "Non"], horizontal=True, key="echec")
-
-        if echec_traitement == "Oui":
-            st.markdown("**Types d’échec retenus**")
-            if st.checkbox("Échec clinique"):
-                types_echec.append("Clinique")
-            if st.checkbox("Échec biologique"):
-                types_echec.append("Biologique")
-            if st.checkbox("Échec radiologique"):
-                types_echec.append("Radiologique")
-            if st.checkbox("Échec thérapeutique (changement ou intensification du traitement)"):
-                types_echec.append("Thérapeutique")
-            if st.checkbox("Échec composite (≥ 2 critères)"):
-                types_echec.append("Composite")
-
-            st.markdown("**Causes de l’échec**")
-            if st.checkbox("Mauvais diagnostic initial"):
-                causes_echec.append("Mauvais diagnostic initial")
-            if st.checkbox("Retard thérapeutique"):
-                causes_echec.append("Retard thérapeutique")
-            if st.checkbox("Résistance / inefficacité pharmacologique"):
-                causes_echec.append("Résistance / inefficacité pharmacologique")
-            if st.checkbox("Comorbidité intercurrente"):
-                causes_echec.append("Comorbidité intercurrente")
-            if st.checkbox("Non-observance"):
-                causes_echec.append("Non-observance")
-            if st.checkbox("Effet indésirable limitant"):
-                causes_echec.append("Effet indésirable limitant")
+    section_performance()
 
     # ------------------------
-    # RECHUTE
+    # PERTINENCE DES SOINS
     # ------------------------
-    elif evolution_patient == "Rechute":
-        st.warning(
-            "Rechute :\n"
-            "Définition : réapparition de signes cliniques, biologiques et/ou radiologiques de la maladie après une réponse initiale complète ou partielle documentée, nécessitant une réintroduction, une intensification ou une modification du traitement.\n"
-            "Attention : La rechute se distingue de l’échec thérapeutique par l’existence obligatoire d’une phase d’amélioration préalable.\n"
-            "Conditions préalables (OBLIGATOIRES)\n"
-            "✔ Réponse thérapeutique initiale documentée\n"
-            "✔ Stabilisation clinique et/ou biologique\n"
-            "✔ Traitement de fond instauré ou suivi organisé"
-        )
+    @st.fragment
+    def section_pertinence():
+        count_fragment_run()
+        st.subheader("📈 Pertinence des soins")
+        pertinence_bio = st.radio("Pertinence des examens biologiques ?", ["Non", "Oui"], horizontal=True, key="pert_bio")
+        if pertinence_bio == "Non":
+            st.checkbox("Examens redondants", key="bio_redond")
+            st.checkbox("Non pertinents", key="bio_nonpert")
+        st.radio("Pertinence des examens d’imagerie ?", ["Oui", "Non"], horizontal=True, key="pert_imag")
+
+        st.divider()
 
-        rechute = st.radio("Rechute ?", ["Oui", "Non"], horizontal=True, key="rechute")
-        types_rechute = []
-        delai_survenue = []
-        cause_principale_rechute = []
-        autres_rechute = ""
-
-        if rechute == "Oui":
-            st.markdown("**Types de rechute retenus**")
-            if st.checkbox("Rechute clinique"):
-                types_rechute.append("Clinique")
-            if st.checkbox("Rechute biologique"):
-                types_rechute.append("Biologique")
-            if st.checkbox("Rechute radiologique"):
-                types_rechute.append("Radiologique")
-            if st.checkbox("Rechute thérapeutique (réintroduction / escalade)"):
-                types_rechute.append("Thérapeutique")
-            if st.checkbox("Rechute composite (≥ 2 critères)"):
-                types_rechute.append("Composite")
-
-            st.markdown("**Délai de survenue**")
-            if st.checkbox("< 3 mois"):
-                delai_survenue.append("<3 mois")
-            if st.checkbox("3–6 mois"):
-                delai_survenue.append("3–6 mois")
-            if st.checkbox("6–12 mois"):
-                delai_survenue.append("6–12 mois")
-            if st.checkbox("> 12 mois"):
-                delai_survenue.append(">12 mois")
-
-            st.markdown("**Cause principale**")
-            if st.checkbox("Non-observance secondaire"):
-                cause_principale_rechute.append("Non-observance secondaire")
-            if st.checkbox("Sevrage ou dégression trop rapide"):
-                cause_principale_rechute.append("Sevrage ou dégression trop rapide")
-            if st.checkbox("Maladie active sous-jacente"):
-                cause_principale_rechute.append("Maladie active sous-jacente")
-            if st.checkbox("Traitement de fond insuffisant"):
-                cause_principale_rechute.append("Traitement de fond insuffisant")
-            if st.checkbox("Facteur déclenchant intercurrent (infection, stress…)"):
-                cause_principale_rechute.append("Facteur déclenchant intercurrent")
-            autres_rechute = st.text_area("Autres causes", key="autres_rechute")
+    section_pertinence()
 
     # ------------------------
-    # MORTALITÉ
+    # SATISFACTION DES PATIENTS
     # ------------------------
-    elif evolution_patient == "Mortalité":
-        mortalite_cause = st.text_area("Préciser la cause du décès", key="mort_cause")
+    @st.fragment
+    def section_satisfaction():
+        count_fragment_run()
+        st.subheader("😊 Satisfaction des Patients")
+        st.slider("Satisfaction patient", 1, 5, 3, key="satisf")
+
+        plaintes_reclamations = st.radio(
+            "Plaintes ou réclamations reçues résolues ?", ["Oui", "Non"], horizontal=True, key="plaintes"
+        )
 
-    st.divider()
+        if plaintes_reclamations == "Oui":
+            st.text_area(
+                "Préciser la/les plainte(s) ou réclamation(s)", key="plaintes_desc"
+            )
 
-# ------------------------
-# PERTINENCE DES SOINS
-# ------------------------
-    st.subheader("📈 Pertinence des soins")
-    pertinence_bio = st.radio("Pertinence des examens biologiques ?", ["Non", "Oui"], horizontal=True, key="pert_bio")
-    examens_bio_redondants = examens_bio_non_pertinents = False
-    if pertinence_bio == "Non":
-        examens_bio_redondants = st.checkbox("Examens redondants", key="bio_redond")
-        examens_bio_non_pertinents = st.checkbox("Non pertinents", key="bio_nonpert")
-    pertinence_imagerie = st.radio("Pertinence des examens d’imagerie ?", ["Oui", "Non"], horizontal=True, key="pert_imag")
-
-    st.divider()
+    section_satisfaction()
 
-# ------------------------
-# SATISFACTION DES PATIENTS
-# ------------------------
     # ------------------------
-# SATISFACTION DES PATIENTS
-# ------------------------
-    st.subheader("😊 Satisfaction des Patients")
-    satisfaction_patient = st.slider("Satisfaction patient", 1, 5, 3, key="satisf")
+    # CONSTRUCTION DE L'ENREGISTREMENT (depuis st.session_state)
+    # ------------------------
+    # Un champ conditionnel n'est retenu que si sa question parente l'appelle : l'état d'un
+    # widget masqué peut subsister entre deux reruns de section.
+    def yes(key):
+        return st.session_state.get(key) == "Oui"
 
-    plaintes_reclamations = st.radio(
-        "Plaintes ou réclamations reçues résolues ?", ["Oui", "Non"], horizontal=True, key="plaintes"
-    )
+    def text(key, when=True):
+        return (st.session_state.get(key) or None) if when else None
 
-    plaintes_description = ""
-    if plaintes_reclamations == "Oui":
-        plaintes_description = st.text_area(
-            "Préciser la/les plainte(s) ou réclamation(s)", key="plaintes_desc"
-        )
+    def number(key, when=True):
+        value = st.session_state.get(key) if when else None
+        return int(value) if value else None
 
-# ------------------------
-# OBSERVANCE THÉRAPEUTIQUE
-# ------------------------
-    st.subheader("💊 Observance thérapeutique")
+    def checked(options, when=True):
+        values = [value for key, _, value in options if st.session_state.get(key)] if when else []
+        # Convert lists to comma-separated strings
+        return ", ".join(values) if values else None
+
+    def build_record():
+        s = st.session_state
+        evolution_patient = s.get("evolution")
+        echec_confirme = evolution_patient == "Échec de traitement" and yes("echec")
+        rechute_confirmee = evolution_patient == "Rechute" and yes("rechute")
+        bio_non_pertinente = s.get("pert_bio") == "Non"
+        return {
+            "patient_first_name": (s.get("first_name") or "").lower() or None,
+            "patient_last_name": (s.get("last_name") or "").upper() or None,
+            "patient_age": number("age"),
+            "patient_sex": s.get("sex") or None,
+            "patient_unite": s.get("unite") or None,
+            "date_hospitalisation": s["date_hosp"].isoformat() if s.get("date_hosp") else None,
+            "patient_motif": text("motif"),
+            "patient_diagnosis": text("diagnostic"),
+            "incident": yes("incident"),
+            "nb_incidents": number("nb_incidents", yes("incident")),
+            "incident_description": text("incident_desc", yes("incident")),
+            "erreur_medicale": yes("erreur_medicale"),
+            "nb_erreurs": number("nb_erreurs", yes("erreur_medicale")),
+            "erreur_description": text("erreur_desc", yes("erreur_medicale")),
+            "readmission": yes("readmission"),
+            "readmission_type": text("readmission_type", yes("readmission")),
+            "infection_soins": yes("infection"),
+            "infection_description": text("infection_desc", yes("infection")),
+            "effets_graves": yes("effets"),
+            "effets_graves_description": text("effets_desc", yes("effets")),
+            "delai_admission": number("delai_adm"),
+            "duree_sejour": number("duree_sej"),
+            "cause_long_sejour": text("cause_long_sej", (s.get("duree_sej") or 0) > 10),
+            "diagnostic_etabli": yes("diag_etabli"),
+            "dossier_complet": yes("dossier"),
+            "cause_dossier_incomplet": text("dossier_cause", s.get("dossier") == "Non"),
+            "evolution_patient": evolution_patient or None,
+            "types_echec": checked(TYPES_ECHEC, echec_confirme),
+            "causes_echec": checked(CAUSES_ECHEC, echec_confirme),
+            "rechute": yes("rechute") if evolution_patient == "Rechute" else None,
+            "types_rechute": checked(TYPES_RECHUTE, rechute_confirmee),
+            "delai_survenue": checked(DELAIS_RECHUTE, rechute_confirmee),
+            "cause_principale_rechute": checked(CAUSES_RECHUTE, rechute_confirmee),
+            "autres_rechute": text("autres_rechute", rechute_confirmee),
+            "cause_rechute": None,
+            "mortalite_cause": text("mort_cause", evolution_patient == "Mortalité"),
+            "pertinence_bio": yes("pert_bio"),
+            "examens_bio_redondants": bio_non_pertinente and bool(s.get("bio_redond")),
+            "examens_bio_non_pertinents": bio_non_pertinente and bool(s.get("bio_nonpert")),
+            "pertinence_imagerie": yes("pert_imag"),
+            "satisfaction_patient": int(s.get("satisf", 3)),
+            "plaintes_reclamations": yes("plaintes"),
+            "plaintes_description": text("plaintes_desc", yes("plaintes")),
+            # Ensure booleans are real bool types
+            **{key: bool(s.get(key)) for _, boxes in OBSERVANCE for key, _ in boxes},
+            "telemedecine": yes("telemed"),
+            "registration_time": datetime.now().isoformat(),
+            # Clé d'idempotence : un renvoi depuis la file locale ne crée pas de doublon
+            "client_uuid": str(uuid.uuid4()),
+        }
 
-    st.markdown("**Compréhension du traitement**")
-    obs_comp_80 = st.checkbox("Le patient peut citer au moins 80 % de son traitement", key="obs_comp_80")
-    obs_indication = st.checkbox("Il comprend l’indication et la durée", key="obs_indication")
-    obs_effets = st.checkbox("Il connaît les principaux effets indésirables", key="obs_effets")
+    def record_done():
+        # Coût de la saisie qui vient d'être enregistrée (reruns et appels réseau depuis la précédente)
+        st.session_state._record_cost = since(st.session_state._metrics, st.session_state._record_mark)
+        st.session_state._record_mark = dict(st.session_state._metrics)
 
-    st.markdown("---\n**Acceptation / adhésion**")
-    obs_accord = st.checkbox("Le patient est d’accord avec le traitement", key="obs_accord")
-    obs_refus = st.checkbox("Pas de refus exprimé", key="obs_refus")
-    obs_crainte = st.checkbox("Pas de crainte majeure non levée", key="obs_crainte")
+    # ------------------------
+    # OBSERVANCE + INNOVATION + ENREGISTRER : cases sans dépendance, envoyées en une fois
+    # ------------------------
+    @st.fragment
+    def section_enregistrer():
+        count_fragment_run()
+        with st.form("dashboard_record", border=False):
+            st.subheader("💊 Observance thérapeutique")
+            for title, boxes in OBSERVANCE:
+                st.markdown(title)
+                for key, label in boxes:
+                    st.checkbox(label, key=key)
 
-    st.markdown("---\n**Faisabilité**")
-    obs_dispo = st.checkbox("Traitement disponible / accessible", key="obs_dispo")
-    obs_cout = st.checkbox("Coût compatible", key="obs_cout")
-    obs_schema = st.checkbox("Schéma thérapeutique compréhensible", key="obs_schema")
-    obs_barriere = st.checkbox("Pas de barrière cognitive majeure", key="obs_barriere")
+            st.subheader("🏥 Innovation et Humanisation")
+            st.radio("Patient ayant accès à la télémedecine ou suivi à distance ?", ["Oui", "Non"], horizontal=True, key="telemed")
+            st.divider()
 
+            submitted = st.form_submit_button("💾 Enregistrer")
 
-# ------------------------
-# INNOVATION ET HUMANISATION
-# ------------------------
-    st.subheader("🏥 Innovation et Humanisation")
-    telemedecine = st.radio("Patient ayant accès à la télémedecine ou suivi à distance ?", ["Oui", "Non"], horizontal=True, key="telemed")
-    st.divider()
+        if not submitted:
+            return
 
-# ------------------------
-# ENREGISTRER
-# ------------------------
-    if st.button("💾 Enregistrer"):
-        # Convert lists to comma-separated strings
-        types_echec_str = ", ".join(types_echec) if types_echec else None
-        causes_echec_str = ", ".join(causes_echec) if causes_echec else None
-        types_rechute_str = ", ".join(types_rechute) if types_rechute else None
-        delai_survenue_str = ", ".join(delai_survenue) if delai_survenue else None
-        cause_principale_rechute_str = ", ".join(cause_principale_rechute) if cause_principale_rechute else None
-
-        # Ensure booleans are real bool types
-        examens_bio_redondants = bool(examens_bio_redondants)
-        examens_bio_non_pertinents = bool(examens_bio_non_pertinents)
-        obs_comp_80 = bool(obs_comp_80)
-        obs_indication = bool(obs_indication)
-        obs_effets = bool(obs_effets)
-        obs_accord = bool(obs_accord)
-        obs_refus = bool(obs_refus)
-        obs_crainte = bool(obs_crainte)
-        obs_dispo = bool(obs_dispo)
-        obs_cout = bool(obs_cout)
-        obs_schema = bool(obs_schema)
-        obs_barriere = bool(obs_barriere)
-
-        record = {
-            "patient_first_name": patient_first_name.lower() or None,
-            "patient_last_name": patient_last_name.upper() or None,
-            "patient_age": int(patient_age) if patient_age else None,
-            "patient_sex": patient_sex or None,
-            "patient_unite": patient_unite or None,
-            "date_hospitalisation": date_hospitalisation.isoformat() if date_hospitalisation else None,
-            "patient_motif": patient_motif or None,
-            "patient_diagnosis": patient_diagnosis or None,
-            "incident": incident == "Oui",
-            "nb_incidents": int(nb_incidents) if nb_incidents else None,
-            "incident_description": incident_description or None,
-            "erreur_medicale": erreur_medicale == "Oui",
-            "nb_erreurs": int(nb_erreurs) if nb_erreurs else None,
-            "erreur_description": erreur_description or None,
-            "readmission": readmission == "Oui",
-            "readmission_type": readmission_type or None,
-            "infection_soins": infection_soins == "Oui",
-            "infection_description": infection_description or None,
-            "effets_graves": effets_graves == "Oui",
-            "effets_graves_description": effets_graves_description or None,
-            "delai_admission": int(delai_admission) if delai_admission else None,
-            "duree_sejour": int(duree_sejour) if duree_sejour else None,
-            "cause_long_sejour": cause_long_sejour or None,
-            "diagnostic_etabli": diagnostic_etabli == "Oui",
-            "dossier_complet": dossier_complet == "Oui",
-            "cause_dossier_incomplet": cause_dossier_incomplet or None,
-            "evolution_patient": evolution_patient or None,
-            "types_echec": types_echec_str,
-            "causes_echec": causes_echec_str,
-            "rechute": rechute == "Oui" if rechute else None,
-            "types_rechute": types_rechute_str,
-            "delai_survenue": delai_survenue_str,
-            "cause_principale_rechute": cause_principale_rechute_str,
-            "autres_rechute": autres_rechute or None,
-            "cause_rechute": cause_rechute or None,
-            "mortalite_cause": mortalite_cause or None,
-            "pertinence_bio": pertinence_bio == "Oui",
-            "examens_bio_redondants": examens_bio_redondants,
-            "examens_bio_non_pertinents": examens_bio_non_pertinents,
-            "pertinence_imagerie": pertinence_imagerie == "Oui",
-            "satisfaction_patient": int(satisfaction_patient),
-            "plaintes_reclamations": plaintes_reclamations == "Oui",
-            "plaintes_description": plaintes_description or None,
-            "obs_comp_80": obs_comp_80,
-            "obs_indication": obs_indication,
-            "obs_effets": obs_effets,
-            "obs_accord": obs_accord,
-            "obs_refus": obs_refus,
-            "obs_crainte": obs_crainte,
-            "obs_dispo": obs_dispo,
-            "obs_cout": obs_cout,
-            "obs_schema": obs_schema,
-            "obs_barriere": obs_barriere,
-            "telemedecine": telemedecine == "Oui",
-            "registration_time": datetime.now().isoformat()
-        }
+        record = build_record()
+        patient_first_name = st.session_state.get("first_name", "")
+        patient_last_name = st.session_state.get("last_name", "")
 
         # ------------------------
         # Try sending to Supabase if online
         # ------------------------
-        
+        if not health.is_online():
+            # Circuit ouvert : pas d'attente réseau, directement en file locale
+            st.warning("⚠️ Mode hors ligne, données stockées localement")
+            save_locally(record)
+            record_done()
+            return
+
         try:
-                # Insert main record
-                supabase.table("indicateurs_cliniques").insert(record).execute()
-                supabase.table("activity_logs").insert({
-                    "username": username,
-                    "action": f"Enregistrement patient {patient_first_name} {patient_last_name}",
-                    "timestamp": datetime.now().isoformat()
-                }).execute()
-
-                st.success(f"✅ Données envoyées pour {patient_first_name} {patient_last_name}")
-
-                # Sync any cached records
-                if os.path.exists(LOCAL_FILE):
-                    with open(LOCAL_FILE, "r") as f:
-                        cached_records = json.load(f)
-                    for r in cached_records:
-                        supabase.table("indicateurs_cliniques").insert(r).execute()
-                    os.remove(LOCAL_FILE)
-                    st.info("📤 Données locales synchronisées automatiquement")
+            # Enregistrement + journal d'activité : une seule transaction côté serveur (rpc)
+            supabase.rpc("save_indicateur", {
+                "record": record,
+                "log_username": username,
+                "log_action": f"Enregistrement patient {patient_first_name} {patient_last_name}",
+            }).execute()
+            # Le cache partagé n'existe que si une page d'analyse l'a déjà chargé
+            if "clinical_data" in sys.modules:
+                sys.modules["clinical_data"].invalidate_records()
+            health.record_success()
+
+            st.success(f"✅ Données envoyées pour {patient_first_name} {patient_last_name}")
+
+            # Connexion confirmée : le worker de fond vide la file sans bloquer l'utilisateur
+            sync_worker.notify()
         except Exception as e:
+            if is_connection_error(e):
+                health.record_failure()
                 st.warning("⚠️ Connexion perdue, données stockées localement")
-                save_locally(record)
-        
-
-
+            else:
+                # Serveur joignable mais requête refusée : ce n'est pas une panne de connexion
+                st.error(f"❌ Enregistrement refusé par le serveur ({type(e).__name__}), données conservées localement")
+            save_locally(record)
+        record_done()
 
+    section_enregistrer()
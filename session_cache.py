@@ -0,0 +1,35 @@
+# session_cache.py
+import threading
+import time
+
+import streamlit as st
+
+# ------------------------
+# CACHE PAR SESSION AVEC TTL
+# ------------------------
+# Époques partagées par le process : invalider un scope périme les entrées de toutes les sessions
+_epochs = {}
+_epochs_lock = threading.Lock()
+
+
+def session_cached(key, ttl, loader, scope=None):
+    """Valeur de loader() gardée dans st.session_state pendant ttl secondes.
+
+    scope : nom partagé (ex. "users") permettant une invalidation depuis n'importe quelle session.
+    Les exceptions de loader() ne sont pas mises en cache.
+    """
+    epoch = _epochs.get(scope, 0)
+    entry = st.session_state.get(key)
+    now = time.monotonic()
+    if entry is None or now - entry["at"] > ttl or entry["epoch"] != epoch:
+        entry = {"at": now, "epoch": epoch, "value": loader()}
+        st.session_state[key] = entry
+    return entry["value"]
+
+
+def invalidate(key=None, scope=None):
+    if key is not None:
+        st.session_state.pop(key, None)
+    if scope is not None:
+        with _epochs_lock:
+            _epochs[scope] = _epochs.get(scope, 0) + 1
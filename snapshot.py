@@ -0,0 +1,284 @@
+# snapshot.py
+# Instantané local en Parquet d'une table Supabase : démarrage à froid instantané et lecture hors ligne.
+import glob
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# ------------------------
+# CONFIG
+# ------------------------
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", "snapshots")
+MAX_PARTS = 16  # au-delà : compaction des deltas en un seul fichier
+REPLICA_IDLE_SECONDS = 15 * 60     # copie en mémoire non lue depuis ce délai : libérée (relue depuis le disque)
+REPLICA_MAX_BYTES = 256 * 1024 ** 2  # au-delà, les copies les moins récemment lues sont libérées
+
+
+# ------------------------
+# STOCKAGE (une base + des deltas Parquet)
+# ------------------------
+class Snapshot:
+    """Table stockée dans SNAPSHOT_DIR/<name>/part-*.parquet, relue entière en DataFrame (copie en mémoire).
+
+    Chaque écriture passe par un fichier temporaire + os.replace : un crash ne laisse jamais
+    de partie tronquée. Une ligne présente dans plusieurs parties (même key) est lue depuis
+    la plus récente.
+    """
+
+    def __init__(self, name, key="id", directory=SNAPSHOT_DIR):
+        self.path = os.path.join(directory, name)
+        self.key = key
+        self._lock = threading.Lock()
+
+    def parts(self):
+        return sorted(glob.glob(os.path.join(self.path, "part-*.parquet")))
+
+    def meta(self):
+        try:
+            with open(os.path.join(self.path, "meta.json")) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def read(self):
+        """DataFrame de l'instantané, ou None s'il n'existe pas encore."""
+        with self._lock:
+            return self._read(self.parts())
+
+    def append(self, df, **meta):
+        """Ajoute df comme nouvelle partie (delta) ; compacte au-delà de MAX_PARTS."""
+        with self._lock:
+            parts = self.parts()
+            if not df.empty:
+                self._write(df, parts)
+                parts = self.parts()
+            if len(parts) > MAX_PARTS:
+                self._write(self._read(parts), parts)
+                self._remove(parts)
+            self._write_meta(meta)
+
+    def replace(self, df, **meta):
+        """Remplace tout l'instantané par df (resynchronisation complète)."""
+        with self._lock:
+            parts = self.parts()
+            self._write(df, parts)
+            self._remove(parts)
+            self._write_meta(meta)
+
+    def _read(self, parts):
+        if not parts:
+            return None
+        tables = [pq.read_table(part, memory_map=True) for part in parts]
+        # permissive : une partie écrite avant un élargissement de type (int16 -> int32) reste lisible ;
+        # les types pandas sont ceux de la partie la plus récente
+        table = pa.concat_tables(tables, promote_options="permissive")
+        df = table.replace_schema_metadata(tables[-1].schema.metadata).to_pandas()
+        if len(parts) > 1 and self.key:
+            df = df.drop_duplicates(subset=self.key, keep="last", ignore_index=True)
+        return df
+
+    def _write(self, df, parts):
+        os.makedirs(self.path, exist_ok=True)
+        number = int(os.path.basename(parts[-1])[5:-8]) + 1 if parts else 0
+        target = os.path.join(self.path, f"part-{number:06d}.parquet")
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), target + ".tmp")
+        os.replace(target + ".tmp", target)
+
+    def _remove(self, parts):
+        for part in parts:
+            os.remove(part)
+
+    def _write_meta(self, meta):
+        merged = {**self.meta(), **meta}
+        target = os.path.join(self.path, "meta.json")
+        with open(target + ".tmp", "w") as f:
+            json.dump(merged, f)
+        os.replace(target + ".tmp", target)
+
+
+# ------------------------
+# RÉPLIQUE EN MÉMOIRE
+# ------------------------
+class LocalReplica:
+    """Copie locale d'une table : lue depuis l'instantané à la première demande, puis synchronisée.
+
+    - fetch_all(client) : chargement complet (création ou resynchronisation) ;
+    - fetch_since(client, watermark) : delta depuis le watermark, ou None pour toujours tout recharger ;
+    - watermark(df) : valeur à mémoriser pour le prochain delta, sous watermark_key dans les métadonnées
+      (un instantané écrit avec un autre watermark n'a pas cette clé : resynchronisation complète).
+    get(None) sert la copie locale sans réseau (mode hors ligne).
+
+    La copie en mémoire est libérée après idle_seconds sans lecture, ou quand l'ensemble des répliques
+    dépasse REPLICA_MAX_BYTES (voir evict_replicas) ; elle est relue depuis l'instantané au prochain accès.
+    """
+
+    def __init__(self, snapshot, fetch_all, fetch_since=None, watermark=None, watermark_key="watermark", prepare=None,
+                 refresh_seconds=30, resync_seconds=24 * 3600, idle_seconds=REPLICA_IDLE_SECONDS):
+        self.snapshot = snapshot
+        self.fetch_all = fetch_all
+        self.fetch_since = fetch_since
+        self.watermark = watermark
+        self.watermark_key = watermark_key
+        self.prepare = prepare or (lambda df: df)
+        self.refresh_seconds = refresh_seconds
+        self.resync_seconds = resync_seconds
+        self.idle_seconds = idle_seconds
+        self.df = None
+        self.nbytes = 0  # estimation (sans le contenu des chaînes) : calcul immédiat même sur 1M lignes
+        self.version = 0  # incrémenté à chaque nouvelle copie : clé de cache des données dérivées
+        self._sync_failed = False  # dernière tentative de synchronisation en échec : copie périmée
+        self._opened = False
+        self._checked_at = None
+        self._resync = False
+        self._used_at = None
+        self._on_close = []
+        self._lock = threading.Lock()
+        with _replicas_lock:
+            _replicas.append(self)
+
+    def get(self, client=None):
+        return self.get_with_status(client)[0]
+
+    def get_with_status(self, client=None):
+        """(copie locale, périmée) : périmée si servie hors ligne ou après un échec de synchronisation.
+
+        L'état est propre à cet appel : une session hors ligne ne marque pas périmée la copie
+        servie aux sessions en ligne.
+        """
+        result = self._get(client)
+        # Hors du verrou : l'éviction prend celui des autres répliques
+        evict_replicas(keep=self)
+        return result
+
+    def _get(self, client):
+        with self._lock:
+            self._used_at = time.monotonic()
+            if not self._opened:
+                df = self.snapshot.read()
+                self._set(None if df is None else self.prepare(df))
+                self.version += 1
+                self._opened = True
+            if client is None:
+                return self.df, True
+            if self._checked_at is None or time.monotonic() - self._checked_at > self.refresh_seconds:
+                try:
+                    self._sync(client)
+                    self._sync_failed = False
+                except Exception:
+                    # Panne réseau non encore détectée : la copie locale (périmée) reste servie
+                    if self.df is None:
+                        raise
+                    self._sync_failed = True
+                    self._checked_at = time.monotonic()
+            return self.df, self._sync_failed
+
+    def _set(self, df):
+        self.df = df
+        self.nbytes = 0 if df is None else int(df.memory_usage(index=True, deep=False).sum())
+
+    def _sync(self, client):
+        meta = self.snapshot.meta()
+        now = time.time()
+        full = (
+            self.df is None
+            or self.fetch_since is None
+            or meta.get(self.watermark_key) is None
+            or self._resync
+            or now - meta.get("resynced_at", 0) > self.resync_seconds
+        )
+        if full:
+            df = self.prepare(self.fetch_all(client))
+            self.snapshot.replace(df, synced_at=now, resynced_at=now, **{self.watermark_key: self._watermark(df)})
+        else:
+            delta = self._changed(self.prepare(self.fetch_since(client, meta[self.watermark_key])))
+            df = self.df
+            if delta.empty:
+                # Rien de nouveau : même DataFrame (les index dérivés restent valides), aucune partie écrite
+                self.snapshot.append(delta, synced_at=now)
+            else:
+                # concat peut élargir les catégories en object : prepare réapplique le schéma
+                merged = pd.concat([df, delta], ignore_index=True)
+                df = self.prepare(merged.drop_duplicates(subset=self.snapshot.key, keep="last", ignore_index=True))
+                self.snapshot.append(delta, synced_at=now, **{self.watermark_key: self._watermark(df)})
+        if df is not self.df:
+            self.version += 1
+            self._set(df)
+        self._resync = False
+        self._checked_at = time.monotonic()
+
+    def _changed(self, delta):
+        """Lignes du delta absentes de la copie ou modifiées.
+
+        Le delta est demandé avec >= watermark : il renvoie toujours au moins la ligne frontière,
+        déjà connue ; sans ce filtre, chaque rafraîchissement reconstruirait toute la copie.
+        """
+        key = self.snapshot.key
+        if delta.empty or self.df is None or key is None:
+            return delta
+        keys = [key] if isinstance(key, str) else list(key)
+        if len(keys) == 1:
+            known = self.df[self.df[keys[0]].isin(delta[keys[0]])]
+        else:
+            known = self.df[pd.MultiIndex.from_frame(self.df[keys]).isin(pd.MultiIndex.from_frame(delta[keys]))]
+        if known.empty:
+            return delta
+        columns = [c for c in delta.columns if c in known.columns]
+        unchanged = delta[columns].astype(object).merge(
+            known[columns].astype(object).drop_duplicates(), how="left", indicator=True
+        )["_merge"].eq("both")
+        return delta[~unchanged.to_numpy()]
+
+    def _watermark(self, df):
+        return self.watermark(df) if self.watermark else None
+
+    def synced_at(self):
+        """Horodatage (epoch) de la dernière synchronisation réussie, ou None."""
+        return self.snapshot.meta().get("synced_at")
+
+    def close(self):
+        """Oublie la copie en mémoire : elle sera relue depuis l'instantané au prochain accès."""
+        with self._lock:
+            self._set(None)
+            self._opened = False
+            self._checked_at = None
+        # Données dérivées (tables Arrow, index) : libérées avec la copie
+        for callback in self._on_close:
+            callback()
+
+    def on_close(self, callback):
+        """Enregistre callback(), appelé quand la copie en mémoire est libérée."""
+        self._on_close.append(callback)
+
+    def invalidate(self, full=False):
+        """full=False : synchronisation au prochain accès ; full=True : rechargement complet."""
+        with self._lock:
+            self._checked_at = None
+            self._resync = self._resync or full
+
+
+# ------------------------
+# BUDGET MÉMOIRE DES RÉPLIQUES
+# ------------------------
+_replicas = []
+_replicas_lock = threading.Lock()
+
+
+def evict_replicas(keep=None):
+    """Libère les copies non lues depuis leur idle_seconds, puis les moins récemment lues au-delà de
+    REPLICA_MAX_BYTES. keep (la réplique qui vient d'être servie) n'est jamais libérée.
+
+    Appelée à chaque lecture et périodiquement par le worker de synchronisation.
+    """
+    now = time.monotonic()
+    with _replicas_lock:
+        opened = sorted((r for r in _replicas if r.df is not None and r is not keep), key=lambda r: r._used_at)
+        total = sum(r.nbytes for r in _replicas if r.df is not None)
+    for replica in opened:
+        if now - replica._used_at > replica.idle_seconds or total > REPLICA_MAX_BYTES:
+            total -= replica.nbytes
+            replica.close()
@@ -0,0 +1,141 @@
+# startup_timing.py
+# Rapport des temps d'import à froid et contrôle du budget de démarrage.
+#
+#   python startup_timing.py                 # rapport
+#   python startup_timing.py --budget 2.5    # code retour 1 si le chemin Dashboard dépasse 2,5 s
+import argparse
+import os
+import subprocess
+import sys
+
+# ------------------------
+# CONFIG
+# ------------------------
+# Chemin à froid commun à tous les utilisateurs (Connexion + Dashboard)
+DASHBOARD_MODULES = [
+    "streamlit",
+    "supabase",
+    "httpx",
+    "supabase_client",
+    "health",
+    "session_cache",
+    "rerun_metrics",
+    "offline_queue",
+    "sync_worker",
+    "HDJ",
+    "hdj_catalog",
+]
+
+# Piles chargées seulement par Statistics / Objectifs / User Management
+ANALYTICS_MODULES = [
+    "numpy",
+    "pandas",
+    "plotly.express",
+    "xlsxwriter",
+    "duckdb",
+    "query_filters",
+    "clinical_data",
+    "patient_index",
+    "snapshot",
+    "kpi_engine",
+    "kpi_export",
+    "chart_data",
+    "analytics_engine",
+    "hdj_data",
+    "objectifs_data",
+    "activity_logs",
+]
+
+# Ne doivent jamais être importés sur le chemin Dashboard
+FORBIDDEN_ON_DASHBOARD = ["numpy", "pandas", "plotly", "xlsxwriter"]
+
+DEFAULT_BUDGET = 3.0
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+# ------------------------
+# MESURE
+# ------------------------
+def import_times(statement):
+    """Exécute statement dans un interpréteur neuf avec -X importtime.
+
+    Renvoie {module racine: cumul en secondes} pour les imports déclenchés par statement
+    (les imports du démarrage de Python sont exclus).
+    """
+    baseline = _parse(_run("pass"))
+    measured = _parse(_run(statement))
+    return {name: t for name, t in measured.items() if name not in baseline}
+
+
+def _run(statement):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Échec de `{statement}` :\n{result.stderr[-2000:]}")
+    return result.stderr
+
+
+def _parse(stderr):
+    # Ligne : "import time: self [us] | cumulative | imported package" ; indentation = profondeur
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.startswith(" ") and not name.startswith("  "):
+            times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+def loaded_modules(statement):
+    result = subprocess.run(
+        [sys.executable, "-c", f"{statement}\nimport sys\nprint('\\n'.join(sys.modules))"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    return set(result.stdout.split())
+
+
+# ------------------------
+# RAPPORT
+# ------------------------
+def report(budget):
+    ok = True
+
+    print("Temps d'import à froid par module (cumul, dépendances comprises)")
+    for title, modules in (("Dashboard", DASHBOARD_MODULES), ("Analyses", ANALYTICS_MODULES)):
+        print(f"\n  {title}")
+        for module in modules:
+            try:
+                total = sum(import_times(f"import {module}").values())
+                print(f"    {module:<20} {total * 1000:8.0f} ms")
+            except RuntimeError as e:
+                print(f"    {module:<20}     n/a  ({str(e).splitlines()[0]})")
+
+    statement = "import " + ", ".join(DASHBOARD_MODULES)
+    times = import_times(statement)
+    total = sum(times.values())
+    print(f"\nChemin Dashboard complet : {total:.2f} s (budget {budget:.2f} s)")
+    for name, t in sorted(times.items(), key=lambda item: -item[1])[:10]:
+        print(f"    {name:<30} {t * 1000:8.0f} ms")
+    if total > budget:
+        print("❌ Budget de démarrage dépassé")
+        ok = False
+
+    leaked = sorted(m for m in FORBIDDEN_ON_DASHBOARD if m in loaded_modules(statement))
+    if leaked:
+        print(f"❌ Piles d'analyse importées sur le chemin Dashboard : {', '.join(leaked)}")
+        ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Temps d'import à froid et budget de démarrage")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="budget du chemin Dashboard (s)")
+    args = parser.parse_args()
+    sys.exit(0 if report(args.budget) else 1)
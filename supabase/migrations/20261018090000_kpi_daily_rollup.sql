@@ -0,0 +1,146 @@
+-- ------------------------
+-- KPI DAILY ROLLUP
+-- Comptes et sommes nécessaires aux KPI de la page Objectifs, par jour et par unité.
+-- Maintenu de façon incrémentale par trigger à chaque insertion dans indicateurs_cliniques.
+-- updated_at (horloge du serveur) : watermark de la copie locale, y compris pour les jours passés
+-- modifiés par un enregistrement tardif (file hors ligne).
+-- ------------------------
+create table if not exists public.kpi_daily_rollup (
+    day                   date    not null,
+    patient_unite         text    not null default '',
+    nb_records            bigint  not null default 0,
+    sum_incidents         bigint  not null default 0,
+    nb_ias                bigint  not null default 0,
+    nb_readmissions       bigint  not null default 0,
+    nb_dossiers_complets  bigint  not null default 0,
+    nb_effets_graves      bigint  not null default 0,
+    sum_delai_admission   bigint  not null default 0,
+    nb_delai_admission    bigint  not null default 0,
+    nb_diagnostic_etabli  bigint  not null default 0,
+    nb_plaintes           bigint  not null default 0,
+    nb_remission          bigint  not null default 0,
+    nb_echec              bigint  not null default 0,
+    nb_rechute            bigint  not null default 0,
+    nb_mortalite          bigint  not null default 0,
+    primary key (day, patient_unite)
+);
+
+alter table public.kpi_daily_rollup
+    add column if not exists updated_at timestamptz not null default now();
+
+create index if not exists kpi_daily_rollup_updated_at_idx on public.kpi_daily_rollup (updated_at);
+
+alter table public.kpi_daily_rollup enable row level security;
+
+drop policy if exists "kpi_daily_rollup_read" on public.kpi_daily_rollup;
+create policy "kpi_daily_rollup_read" on public.kpi_daily_rollup
+    for select to authenticated using (true);
+
+-- Agrégation d'un ensemble de lignes (utilisée par la reconstruction)
+-- security_invoker : la vue applique la RLS d'indicateurs_cliniques de l'appelant ; non exposée à l'API
+create or replace view public.kpi_daily_rollup_source
+with (security_invoker = true) as
+select
+    registration_time::timestamp::date                              as day,
+    coalesce(patient_unite, '')                                     as patient_unite,
+    count(*)                                                        as nb_records,
+    coalesce(sum(nb_incidents), 0)                                  as sum_incidents,
+    count(*) filter (where infection_soins)                         as nb_ias,
+    count(*) filter (where readmission)                             as nb_readmissions,
+    count(*) filter (where dossier_complet)                         as nb_dossiers_complets,
+    count(*) filter (where effets_graves)                           as nb_effets_graves,
+    coalesce(sum(delai_admission), 0)                               as sum_delai_admission,
+    count(delai_admission)                                          as nb_delai_admission,
+    count(*) filter (where diagnostic_etabli)                       as nb_diagnostic_etabli,
+    count(*) filter (where plaintes_reclamations)                   as nb_plaintes,
+    count(*) filter (where evolution_patient = 'Rémission')         as nb_remission,
+    count(*) filter (where evolution_patient = 'Échec de traitement') as nb_echec,
+    count(*) filter (where evolution_patient = 'Rechute')           as nb_rechute,
+    count(*) filter (where evolution_patient = 'Mortalité')         as nb_mortalite
+from public.indicateurs_cliniques
+where registration_time is not null
+group by 1, 2;
+
+revoke all on public.kpi_daily_rollup_source from public, anon, authenticated;
+
+-- Trigger au niveau instruction : un insert groupé de N lignes = un seul upsert agrégé
+create or replace function public.kpi_daily_rollup_on_insert()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    insert into public.kpi_daily_rollup as r (
+        day, patient_unite, nb_records, sum_incidents, nb_ias, nb_readmissions, nb_dossiers_complets,
+        nb_effets_graves, sum_delai_admission, nb_delai_admission, nb_diagnostic_etabli, nb_plaintes,
+        nb_remission, nb_echec, nb_rechute, nb_mortalite
+    )
+    select
+        registration_time::timestamp::date,
+        coalesce(patient_unite, ''),
+        count(*),
+        coalesce(sum(nb_incidents), 0),
+        count(*) filter (where infection_soins),
+        count(*) filter (where readmission),
+        count(*) filter (where dossier_complet),
+        count(*) filter (where effets_graves),
+        coalesce(sum(delai_admission), 0),
+        count(delai_admission),
+        count(*) filter (where diagnostic_etabli),
+        count(*) filter (where plaintes_reclamations),
+        count(*) filter (where evolution_patient = 'Rémission'),
+        count(*) filter (where evolution_patient = 'Échec de traitement'),
+        count(*) filter (where evolution_patient = 'Rechute'),
+        count(*) filter (where evolution_patient = 'Mortalité')
+    from new_rows
+    where registration_time is not null
+    group by 1, 2
+    on conflict (day, patient_unite) do update set
+        nb_records           = r.nb_records           + excluded.nb_records,
+        sum_incidents        = r.sum_incidents        + excluded.sum_incidents,
+        nb_ias               = r.nb_ias               + excluded.nb_ias,
+        nb_readmissions      = r.nb_readmissions      + excluded.nb_readmissions,
+        nb_dossiers_complets = r.nb_dossiers_complets + excluded.nb_dossiers_complets,
+        nb_effets_graves     = r.nb_effets_graves     + excluded.nb_effets_graves,
+        sum_delai_admission  = r.sum_delai_admission  + excluded.sum_delai_admission,
+        nb_delai_admission   = r.nb_delai_admission   + excluded.nb_delai_admission,
+        nb_diagnostic_etabli = r.nb_diagnostic_etabli + excluded.nb_diagnostic_etabli,
+        nb_plaintes          = r.nb_plaintes          + excluded.nb_plaintes,
+        nb_remission         = r.nb_remission         + excluded.nb_remission,
+        nb_echec             = r.nb_echec             + excluded.nb_echec,
+        nb_rechute           = r.nb_rechute           + excluded.nb_rechute,
+        nb_mortalite         = r.nb_mortalite         + excluded.nb_mortalite,
+        updated_at           = now();
+    return null;
+end;
+$$;
+
+drop trigger if exists kpi_daily_rollup_after_insert on public.indicateurs_cliniques;
+create trigger kpi_daily_rollup_after_insert
+    after insert on public.indicateurs_cliniques
+    referencing new table as new_rows
+    for each statement
+    execute function public.kpi_daily_rollup_on_insert();
+
+-- Reconstruction complète (initialisation, ou après corrections manuelles de la table source)
+create or replace function public.rebuild_kpi_daily_rollup()
+returns void
+language sql
+security definer
+set search_path = public
+as $$
+    truncate public.kpi_daily_rollup;
+    -- updated_at prend sa valeur par défaut (now()) : les copies locales rechargent tout le rollup
+    insert into public.kpi_daily_rollup (
+        day, patient_unite, nb_records, sum_incidents, nb_ias, nb_readmissions, nb_dossiers_complets,
+        nb_effets_graves, sum_delai_admission, nb_delai_admission, nb_diagnostic_etabli, nb_plaintes,
+        nb_remission, nb_echec, nb_rechute, nb_mortalite
+    )
+    select * from public.kpi_daily_rollup_source;
+$$;
+
+-- security definer : réservée aux rôles d'administration, jamais appelable via /rest/v1/rpc
+revoke execute on function public.rebuild_kpi_daily_rollup() from public, anon, authenticated;
+
+select public.rebuild_kpi_daily_rollup();
@@ -0,0 +1,8 @@
+-- ------------------------
+-- ACTIVITY LOGS : index pour la pagination par clé (timestamp, id) et les filtres serveur
+-- ------------------------
+create index if not exists activity_logs_timestamp_id_idx
+    on public.activity_logs ("timestamp" desc, id desc);
+
+create index if not exists activity_logs_username_timestamp_idx
+    on public.activity_logs (username, "timestamp" desc, id desc);
@@ -0,0 +1,9 @@
+-- ------------------------
+-- INDICATEURS CLINIQUES : clé d'idempotence des enregistrements saisis sur le Dashboard
+-- Permet le renvoi sans doublon des enregistrements de la file hors ligne (offline_queue.py).
+-- ------------------------
+alter table public.indicateurs_cliniques
+    add column if not exists client_uuid uuid;
+
+create unique index if not exists indicateurs_cliniques_client_uuid_key
+    on public.indicateurs_cliniques (client_uuid);
@@ -0,0 +1,48 @@
+-- ------------------------
+-- SAVE INDICATEUR : enregistrement clinique + journal d'activité en une transaction
+-- Un seul aller-retour HTTP (rpc), pas d'écriture partielle ; renvoie l'id de l'enregistrement.
+-- Idempotent sur client_uuid : un renvoi ne crée ni doublon ni second journal.
+-- ------------------------
+create or replace function public.save_indicateur(record jsonb, log_username text, log_action text)
+returns bigint
+language plpgsql
+security invoker
+set search_path = public
+as $$
+declare
+    cols text;
+    new_id bigint;
+begin
+    -- Seules les clés correspondant à des colonnes existantes sont insérées ; les autres gardent leur défaut
+    select string_agg(quote_ident(a.attname), ', ')
+      into cols
+      from pg_attribute a
+     where a.attrelid = 'public.indicateurs_cliniques'::regclass
+       and a.attnum > 0
+       and not a.attisdropped
+       and record ? a.attname;
+
+    execute format(
+        'insert into public.indicateurs_cliniques (%1$s) '
+        'select %1$s from jsonb_populate_record(null::public.indicateurs_cliniques, $1) '
+        'on conflict (client_uuid) do nothing '
+        'returning id',
+        cols
+    ) using record into new_id;
+
+    if new_id is null then
+        -- Déjà enregistré (renvoi) : on renvoie l'id existant sans dupliquer le journal
+        select id into new_id
+          from public.indicateurs_cliniques
+         where client_uuid = (record ->> 'client_uuid')::uuid;
+        return new_id;
+    end if;
+
+    insert into public.activity_logs (username, action, "timestamp")
+    values (log_username, log_action, now());
+
+    return new_id;
+end;
+$$;
+
+grant execute on function public.save_indicateur(jsonb, text, text) to authenticated;
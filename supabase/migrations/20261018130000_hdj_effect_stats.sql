@@ -0,0 +1,74 @@
+-- ------------------------
+-- HDJ EFFECT STATS : agrégation des sélections d'effets secondaires côté serveur
+-- Les sessions HDJ stockent leurs sélections en tableau JSON ; la fonction les déplie
+-- (jsonb_array_elements) et renvoie une ligne par médicament × effet, déjà agrégée.
+-- ------------------------
+alter table public.hdj_sessions
+    add column if not exists created_at timestamptz not null default now();
+
+create index if not exists hdj_sessions_created_at_medicament_idx
+    on public.hdj_sessions (created_at, medicament);
+
+create or replace function public.hdj_effect_stats(
+    start_date date default null,
+    end_date   date default null,
+    drug       text default null
+)
+returns table (
+    medicament          text,
+    periode             text,
+    gravite             text,
+    effet_id            text,
+    effet               text,
+    detail              text,
+    nb_selections       bigint,
+    nb_sessions         bigint,
+    sessions_medicament bigint
+)
+language sql
+stable
+security invoker
+set search_path = public
+as $$
+    with sessions as (
+        select s.id, s.medicament, s.selections::jsonb as selections
+        from public.hdj_sessions s
+        where (start_date is null or s.created_at >= start_date)
+          and (end_date is null or s.created_at < end_date + 1)
+          and (drug is null or s.medicament = drug)
+    ),
+    totals as (
+        select sessions.medicament, count(*) as sessions_medicament
+        from sessions
+        group by 1
+    ),
+    selected as (
+        select
+            sessions.id,
+            sessions.medicament,
+            e ->> 'periode'  as periode,
+            e ->> 'gravite'  as gravite,
+            e ->> 'effet_id' as effet_id,   -- absent des sessions antérieures au catalogue versionné
+            e ->> 'effet'    as effet,
+            e ->> 'detail'   as detail
+        from sessions
+        cross join lateral jsonb_array_elements(coalesce(sessions.selections, '[]'::jsonb)) as e
+    )
+    select
+        selected.medicament,
+        selected.periode,
+        selected.gravite,
+        max(selected.effet_id)      as effet_id,
+        selected.effet,
+        selected.detail,
+        count(*)                    as nb_selections,
+        count(distinct selected.id) as nb_sessions,
+        totals.sessions_medicament
+    from selected
+    join totals using (medicament)
+    group by selected.medicament, selected.periode, selected.gravite, selected.effet, selected.detail,
+             totals.sessions_medicament
+    order by 1, 2, 3, 5, 6;
+$$;
+
+grant execute on function public.hdj_effect_stats(date, date, text) to authenticated;
@@ -0,0 +1,6 @@
+-- ------------------------
+-- INDICATEURS CLINIQUES : index du filtre de période et du tri par défaut de la grille brute
+-- (registration_time desc, id desc) : la page demandée et le count(*) filtré restent des parcours d'index
+-- ------------------------
+create index if not exists indicateurs_cliniques_registration_time_id_idx
+    on public.indicateurs_cliniques (registration_time desc, id desc);
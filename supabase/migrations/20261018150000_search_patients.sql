@@ -0,0 +1,77 @@
+-- ------------------------
+-- RECHERCHE PATIENT : index trigramme sur "nom prénom" et "prénom nom" normalisés + rpc search_patients
+-- Un patient = (nom, prénom, âge, sexe) ; la recherche ne renvoie que les meilleurs résultats.
+-- Normalisation identique à patient_index.normalize (recherche locale hors ligne) :
+-- minuscules, sans accents, espaces simples.
+-- ------------------------
+create extension if not exists pg_trgm;
+create extension if not exists unaccent;
+
+-- unaccent() n'est que stable (dictionnaire résolu par search_path) : enveloppe immutable,
+-- dictionnaire qualifié, utilisable dans un index d'expression
+create or replace function public.search_normalize(value text)
+returns text
+language sql
+immutable
+parallel safe
+set search_path = public
+as $$
+    select btrim(regexp_replace(lower(public.unaccent('public.unaccent'::regdictionary, coalesce(value, ''))), '\s+', ' ', 'g'));
+$$;
+
+drop index if exists public.indicateurs_cliniques_patient_trgm_idx;
+
+create index if not exists indicateurs_cliniques_patient_nom_prenom_trgm_idx
+    on public.indicateurs_cliniques
+    using gin ((public.search_normalize(coalesce(patient_last_name, '') || ' ' || coalesce(patient_first_name, ''))) gin_trgm_ops);
+
+create index if not exists indicateurs_cliniques_patient_prenom_nom_trgm_idx
+    on public.indicateurs_cliniques
+    using gin ((public.search_normalize(coalesce(patient_first_name, '') || ' ' || coalesce(patient_last_name, ''))) gin_trgm_ops);
+
+-- Filtre exact sur le patient choisi (page Statistics)
+create index if not exists indicateurs_cliniques_patient_idx
+    on public.indicateurs_cliniques (patient_last_name, patient_first_name, patient_age, patient_sex);
+
+create or replace function public.search_patients(query text, max_results int default 20)
+returns table (
+    patient_last_name  text,
+    patient_first_name text,
+    patient_age        int,
+    patient_sex        text,
+    nb_records         bigint,
+    last_seen          timestamptz
+)
+language sql
+stable
+security invoker
+set search_path = public
+as $$
+    with q as (
+        -- % et _ saisis par l'utilisateur sont cherchés littéralement
+        select public.search_normalize(query) as term,
+               replace(replace(replace(public.search_normalize(query), '\', '\\'), '%', '\%'), '_', '\_') as pattern
+    ),
+    p as (
+        select i.*,
+               public.search_normalize(coalesce(i.patient_last_name, '') || ' ' || coalesce(i.patient_first_name, '')) as nom_prenom,
+               public.search_normalize(coalesce(i.patient_first_name, '') || ' ' || coalesce(i.patient_last_name, '')) as prenom_nom
+        from public.indicateurs_cliniques i
+    )
+    select
+        p.patient_last_name::text,
+        p.patient_first_name::text,
+        p.patient_age::int,
+        p.patient_sex::text,
+        count(*)                               as nb_records,
+        max(p.registration_time)::timestamptz  as last_seen
+    from p, q
+    where q.term <> ''
+      and (p.nom_prenom like '%' || q.pattern || '%' or p.prenom_nom like '%' || q.pattern || '%')
+    group by 1, 2, 3, 4
+    order by max(greatest(similarity(p.nom_prenom, q.term), similarity(p.prenom_nom, q.term))) desc,
+             1, 2, 3
+    limit least(coalesce(max_results, 20), 100);
+$$;
+
+grant execute on function public.search_patients(text, int) to authenticated;
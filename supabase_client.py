@@ -0,0 +1,62 @@
+# supabase_client.py
+import httpx
+import streamlit as st
+from supabase import create_client, Client, ClientOptions
+
+from health import HealthMonitor, PROBE_TIMEOUT
+from rerun_metrics import count_request
+
+# ------------------------
+# SUPABASE CONFIG
+# ------------------------
+SUPABASE_URL = st.secrets["SUPABASE"]["URL"]
+SUPABASE_KEY = st.secrets["SUPABASE"]["KEY"]
+
+# Pool HTTP partagé : connexions keep-alive bornées, délais explicites
+HTTP_TIMEOUT = httpx.Timeout(15.0, connect=5.0)
+HTTP_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60)
+
+
+@st.cache_resource
+def get_http_pool() -> httpx.Client:
+    # Un seul pool par process : les reruns réutilisent les connexions TLS déjà ouvertes
+    return httpx.Client(
+        timeout=HTTP_TIMEOUT,
+        limits=HTTP_LIMITS,
+        http2=True,
+        follow_redirects=True,
+        # Compte les appels réseau de la session courante (voir rerun_metrics.py)
+        event_hooks={"request": [count_request]},
+    )
+
+
+def _new_client(key) -> Client:
+    # Les en-têtes d'auth sont envoyés par requête : partager le pool ne partage pas le jeton
+    return create_client(SUPABASE_URL, key, ClientOptions(httpx_client=get_http_pool()))
+
+
+def get_client() -> Client:
+    """Client propre à la session Streamlit (auth isolée), construit sur le pool partagé."""
+    if "_supabase" not in st.session_state:
+        st.session_state._supabase = _new_client(SUPABASE_KEY)
+    return st.session_state._supabase
+
+
+@st.cache_resource
+def get_admin_client() -> Client:
+    # Clé service_role : aucune session utilisateur, partagé par tout le process
+    return _new_client(st.secrets["SUPABASE"]["SERVICE_ROLE_KEY"])
+
+
+@st.cache_resource
+def get_health_monitor() -> HealthMonitor:
+    # Sonde légère de GoTrue, délai serré, sur le pool partagé
+    def probe():
+        response = get_http_pool().get(
+            f"{SUPABASE_URL}/auth/v1/health",
+            headers={"apikey": SUPABASE_KEY},
+            timeout=PROBE_TIMEOUT,
+        )
+        return response.status_code == 200
+
+    return HealthMonitor(probe)
@@ -0,0 +1,93 @@
+# sync_worker.py
+import random
+import sys
+import threading
+import time
+
+from health import is_connection_error
+from offline_queue import get_queue, flush
+
+# ------------------------
+# CONFIG
+# ------------------------
+IDLE_SECONDS = 10        # intervalle de vérification quand tout va bien
+BACKOFF_BASE = 5         # premier délai après un échec
+BACKOFF_MAX = 5 * 60     # plafond du délai entre deux essais
+
+
+# ------------------------
+# WORKER DE SYNCHRONISATION
+# ------------------------
+class SyncWorker(threading.Thread):
+    """Thread de fond qui vide la file hors ligne vers Supabase, avec backoff exponentiel + jitter."""
+
+    def __init__(self, client, queue, health=None):
+        super().__init__(name="offline-sync", daemon=True)
+        self.client = client
+        self.queue = queue
+        self.health = health
+        self.failures = 0
+        self.last_error = None
+        self.last_sync = None
+        self._wake = threading.Event()
+
+    def notify(self):
+        """Demande un essai immédiat (nouvel enregistrement en file, connexion rétablie…)."""
+        self._wake.set()
+
+    def run(self):
+        while True:
+            self._wake.wait(self._delay())
+            self._wake.clear()
+            # Copies locales inutilisées libérées même sans trafic (seulement si une page d'analyse les a chargées)
+            if "snapshot" in sys.modules:
+                sys.modules["snapshot"].evict_replicas()
+            try:
+                if self.queue.depth() == 0:
+                    continue
+                # Circuit ouvert : inutile de tenter, on réessaiera au prochain réveil
+                if self.health is not None and not self.health.is_online():
+                    continue
+                # Les enregistrements rejoués reçoivent un id (et mettent à jour le rollup) côté serveur :
+                # le prochain delta les voit, dans ce process comme dans les autres. Ici, on avance
+                # seulement la synchronisation si une page d'analyse est chargée (pas d'import de pandas)
+                if flush(self.client, self.queue) and "clinical_data" in sys.modules:
+                    sys.modules["clinical_data"].invalidate_records()
+                self.failures = 0
+                self.last_error = None
+                self.last_sync = time.time()
+            except Exception as e:
+                self.failures += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                if self.health is not None and is_connection_error(e):
+                    self.health.record_failure()
+
+    def _delay(self):
+        if not self.failures:
+            return IDLE_SECONDS
+        # "Full jitter" : évite que plusieurs process relancent tous en même temps
+        return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** self.failures))
+
+    def status(self):
+        return {
+            "depth": self.queue.depth(),
+            "rejected": self.queue.rejected_count(),
+            "oldest_age": self.queue.oldest_age(),
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_sync": self.last_sync,
+        }
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def start_sync_worker(client, health=None):
+    """Démarre le worker une seule fois par process et le renvoie."""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = SyncWorker(client, get_queue(), health)
+            _worker.start()
+    return _worker
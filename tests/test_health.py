@@ -0,0 +1,49 @@
+# tests/test_health.py
+# Disjoncteur de HealthMonitor : un échec isolé ne bascule pas hors ligne, le seuil ouvre le circuit.
+from health import CLOSED, OPEN, HealthMonitor
+
+
+def monitor(results, **kwargs):
+    """Moniteur dont la sonde renvoie successivement results ; probes compte les sondes."""
+    results = iter(results)
+    probes = []
+
+    def probe():
+        probes.append(None)
+        return next(results)
+
+    return HealthMonitor(probe, **kwargs), probes
+
+
+def test_single_failure_keeps_cached_online():
+    health, probes = monitor([True, False], cache_ttl=0)
+    assert health.is_online()
+    assert health.is_online()
+    assert health.state == CLOSED
+    assert health.online
+
+
+def test_failure_below_threshold_is_cached():
+    # Pas de nouvelle sonde (2 s de délai) à chaque rerun tant que le résultat est en cache
+    health, probes = monitor([False], cache_ttl=60)
+    assert health.is_online()
+    assert health.is_online()
+    assert len(probes) == 1
+
+
+def test_opens_at_threshold():
+    health, probes = monitor([False, False, False], cache_ttl=0, failure_threshold=3, open_seconds=60)
+    assert health.is_online()
+    assert health.is_online()
+    assert not health.is_online()
+    assert health.state == OPEN
+    # Circuit ouvert : hors ligne sans sonder
+    assert not health.is_online()
+    assert len(probes) == 3
+
+
+def test_success_resets_failures():
+    health, probes = monitor([False, False, True, False, False], cache_ttl=0, failure_threshold=3)
+    for _ in range(5):
+        assert health.is_online()
+    assert health.state == CLOSED
@@ -0,0 +1,139 @@
+# tests/test_kpi_engine.py
+# compute_kpis(count_records(...)) comparé au calcul historique de objectifs.py (safe_pct / status_threshold).
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from kpi_engine import CONFORME, KPI_TARGETS, KPI_TRENDS, NON_CONFORME, compute_kpis, count_records
+
+CURRENT = "Période actuelle"
+PREVIOUS = "Période précédente"
+EMPTY = "Période vide"
+
+
+# ------------------------
+# CALCUL HISTORIQUE (objectifs.py avant kpi_engine)
+# ------------------------
+def safe_pct(num, den):
+    return (num / den * 100) if den else 0
+
+
+def status_threshold(value, target, mode="lt"):
+    if mode == "lt":  # value < target
+        return "🟢 Conforme" if value < target else "🔴 Non conforme"
+    else:  # value > target
+        return "🟢 Conforme" if value > target else "🔴 Non conforme"
+
+
+def baseline_kpis(df_period):
+    """{kpi: (valeur, statut ou None)} calculés colonne par colonne comme la page d'origine."""
+    total = len(df_period)
+    nb_incidents = df_period["nb_incidents"].fillna(0).sum()
+    nb_ias = df_period["infection_soins"].sum()
+    nb_readm = df_period["readmission"].sum()
+    nb_dossiers_ok = df_period["dossier_complet"].sum()
+    nb_effets_graves = df_period["effets_graves"].sum()
+    delai_moyen = df_period["delai_admission"].mean()
+    nb_diag_ok = df_period["diagnostic_etabli"].sum()
+    nb_plaintes = df_period["plaintes_reclamations"].sum()
+    evol = df_period["evolution_patient"].value_counts()
+    nb_echec = evol.get("Échec de traitement", 0)
+
+    targets = [
+        ("Taux d'incidents (%)", safe_pct(nb_incidents, total), 2, "lt"),
+        ("Taux IAS (%)", safe_pct(nb_ias, total), 3, "lt"),
+        ("Taux de réadmission (%)", safe_pct(nb_readm, total), 10, "lt"),
+        ("Traçabilité dossiers (%)", safe_pct(nb_dossiers_ok, total), 95, "gt"),
+        ("Délai moyen admission (jours)", delai_moyen, 30, "lt"),
+        ("Dossiers complets avec diagnostic (%)", safe_pct(nb_diag_ok, total), 90, "gt"),
+        ("Taux Échec thérapeutique (%)", safe_pct(nb_echec, total), 10, "lt"),
+    ]
+    trends = {
+        "Effets indésirables graves (%)": safe_pct(nb_effets_graves, total),
+        "Rémission (%)": safe_pct(evol.get("Rémission", 0), total),
+        "Échec (%)": safe_pct(nb_echec, total),
+        "Rechute (%)": safe_pct(evol.get("Rechute", 0), total),
+        "Mortalité (%)": safe_pct(evol.get("Mortalité", 0), total),
+        "Taux de plaintes (%)": safe_pct(nb_plaintes, total),
+    }
+    kpis = {name: (value, status_threshold(value, target, mode)) for name, value, target, mode in targets}
+    kpis.update({name: (value, None) for name, value in trends.items()})
+    return kpis
+
+
+# ------------------------
+# DONNÉES
+# ------------------------
+def record(period, incidents=None, ias=False, readmission=False, dossier=True, effets=False, delai=None,
+           diagnostic=True, plaintes=False, evolution=None):
+    return {
+        "period": period,
+        "nb_incidents": incidents,
+        "infection_soins": ias,
+        "readmission": readmission,
+        "dossier_complet": dossier,
+        "effets_graves": effets,
+        "delai_admission": delai,
+        "diagnostic_etabli": diagnostic,
+        "plaintes_reclamations": plaintes,
+        "evolution_patient": evolution,
+    }
+
+
+@pytest.fixture
+def records():
+    return pd.DataFrame([
+        record(CURRENT, incidents=2, delai=10, evolution="Rémission"),
+        record(CURRENT, ias=True, readmission=True, delai=45, evolution="Échec de traitement"),
+        record(CURRENT, dossier=False, diagnostic=False, effets=True, evolution="Rechute"),
+        record(CURRENT, incidents=1, plaintes=True, delai=20, evolution="Mortalité"),
+        record(CURRENT, evolution="Rémission"),
+        # Aucun délai renseigné sur la période précédente : moyenne NaN
+        record(PREVIOUS, readmission=True, evolution="Échec de traitement"),
+        record(PREVIOUS, incidents=3, dossier=False),
+    ])
+
+
+def kpi_frame(records, periods):
+    return compute_kpis(count_records(records), periods=periods).set_index(["period", "kpi"])
+
+
+def assert_same(kpis, period, expected):
+    names = [k[0] for k in KPI_TARGETS] + [k[0] for k in KPI_TRENDS]
+    assert sorted(expected) == sorted(names)
+    for name, (value, status) in expected.items():
+        row = kpis.loc[(period, name)]
+        if isinstance(value, float) and math.isnan(value):
+            assert math.isnan(row["value"]), name
+        else:
+            assert row["value"] == pytest.approx(value), name
+        assert (row["status"] if status is not None else None) == status, name
+
+
+# ------------------------
+# TESTS
+# ------------------------
+def test_matches_baseline(records):
+    kpis = kpi_frame(records, [CURRENT, PREVIOUS])
+    for period in (CURRENT, PREVIOUS):
+        assert_same(kpis, period, baseline_kpis(records[records["period"] == period]))
+
+
+def test_zero_denominator_period(records):
+    # Période sans enregistrement : safe_pct renvoie 0, le délai moyen est NaN
+    kpis = kpi_frame(records, [CURRENT, EMPTY])
+    expected = baseline_kpis(records.iloc[:0])
+    assert_same(kpis, EMPTY, expected)
+    assert kpis.loc[(EMPTY, "Taux d'incidents (%)"), "status"] == CONFORME
+    assert kpis.loc[(EMPTY, "Traçabilité dossiers (%)"), "status"] == NON_CONFORME
+
+
+def test_nan_mean_delay(records):
+    kpis = kpi_frame(records, [CURRENT, PREVIOUS])
+    row = kpis.loc[(PREVIOUS, "Délai moyen admission (jours)")]
+    assert np.isnan(row["value"])
+    # NaN < 30 est faux : non conforme, comme status_threshold
+    assert row["status"] == NON_CONFORME
+    assert kpis.loc[(CURRENT, "Délai moyen admission (jours)"), "value"] == pytest.approx(25)
@@ -0,0 +1,37 @@
+# tests/test_patient_index.py
+# Recherche locale (hors ligne) : mêmes correspondances que la rpc search_patients (sous-chaîne, sans accents).
+import pandas as pd
+
+from patient_index import PatientIndex
+
+
+def index(*names):
+    return PatientIndex(pd.DataFrame(
+        [{"patient_last_name": last, "patient_first_name": first, "patient_age": 40, "patient_sex": "Féminin"}
+         for last, first in names]
+    ))
+
+
+def found(idx, query, limit=20):
+    return list(idx.search(query, limit)["patient_last_name"])
+
+
+def test_substring_in_either_order():
+    idx = index(("CHARFI", "Saïd"), ("BENNANI", "Ali"), ("ALAOUI", "Khadija"))
+    assert found(idx, "arfi") == ["CHARFI"]
+    assert found(idx, "said charf") == ["CHARFI"]
+    assert found(idx, "fi sa") == ["CHARFI"]
+    assert found(idx, "DIJA") == ["ALAOUI"]
+
+
+def test_prefix_matches_first():
+    idx = index(("BALI", "Omar"), ("ALIOUA", "Sara"))
+    assert found(idx, "ali") == ["ALIOUA", "BALI"]
+
+
+def test_limit_and_distinct_patients():
+    idx = index(("TAZI", "Anas"), ("TAZI", "Amina"), ("IDRISSI", "Anas"))
+    # "anas" dans les deux clés d'un même patient : compté une fois
+    assert found(idx, "anas") == ["IDRISSI", "TAZI"]
+    assert len(found(idx, "a", limit=2)) == 2
+    assert found(idx, "  ") == []
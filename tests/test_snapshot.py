@@ -0,0 +1,87 @@
+# tests/test_snapshot.py
+# LocalReplica : delta sur watermark serveur, copie périmée par appel, libération de la copie en mémoire.
+import pandas as pd
+import pytest
+
+import snapshot
+from snapshot import LocalReplica, Snapshot
+
+
+def max_id(df):
+    return int(df["id"].max())
+
+
+@pytest.fixture
+def server():
+    return [{"id": 1, "registration_time": "2026-10-10"}, {"id": 2, "registration_time": "2026-10-12"}]
+
+
+def replica(tmp_path, server, name="t", **kwargs):
+    return LocalReplica(
+        Snapshot(name, directory=str(tmp_path)),
+        fetch_all=lambda client: pd.DataFrame(server),
+        fetch_since=lambda client, watermark: pd.DataFrame([r for r in server if r["id"] >= watermark]),
+        watermark=max_id,
+        refresh_seconds=-1,
+        **kwargs,
+    )
+
+
+def test_late_record_is_synced(tmp_path, server):
+    local = replica(tmp_path, server)
+    local.get("client")
+    version = local.version
+    local.get("client")
+    # La ligne frontière renvoyée par >= watermark n'est pas une nouveauté
+    assert local.version == version
+    # Enregistrement rejoué depuis la file hors ligne : ancien registration_time, nouvel id
+    server.append({"id": 3, "registration_time": "2026-10-01"})
+    assert list(local.get("client")["id"]) == [1, 2, 3]
+    assert local.version == version + 1
+
+
+def test_idle_copy_is_released(tmp_path, server):
+    local = replica(tmp_path, server, idle_seconds=0)
+    local.get("client")
+    snapshot.evict_replicas()
+    assert local.df is None
+    # Relue depuis l'instantané, hors ligne
+    assert list(local.get(None)["id"]) == [1, 2]
+
+
+def test_budget_releases_least_recently_used(tmp_path, server, monkeypatch):
+    monkeypatch.setattr(snapshot, "REPLICA_MAX_BYTES", 0)
+    first, second = replica(tmp_path, server, "a"), replica(tmp_path, server, "b")
+    released = []
+    first.on_close(lambda: released.append("a"))
+    first.get("client")
+    # La réplique servie n'est jamais libérée, même seule au-delà du budget
+    assert first.df is not None
+    second.get("client")
+    assert first.df is None and second.df is not None
+    assert released == ["a"]
+
+
+def test_staleness_is_per_call(tmp_path, server):
+    local = replica(tmp_path, server)
+    assert local.get_with_status("client")[1] is False
+    # Une session hors ligne ne rend pas périmée la copie servie aux sessions en ligne
+    assert local.get_with_status(None)[1] is True
+    assert local.get_with_status("client")[1] is False
+
+
+def test_failed_sync_serves_stale_copy(tmp_path, server):
+    local = replica(tmp_path, server)
+    local.get("client")
+    local.fetch_since = lambda client, watermark: 1 / 0
+    df, stale = local.get_with_status("client")
+    assert stale and list(df["id"]) == [1, 2]
+
+
+def test_widened_column_reads_old_parts(tmp_path):
+    parts = Snapshot("w", directory=str(tmp_path))
+    parts.replace(pd.DataFrame({"id": [1], "duree_sejour": pd.array([5], dtype="Int16")}))
+    parts.append(pd.DataFrame({"id": [2], "duree_sejour": pd.array([40000], dtype="Int32")}))
+    df = parts.read()
+    assert str(df["duree_sejour"].dtype) == "Int32"
+    assert list(df["duree_sejour"]) == [5, 40000]